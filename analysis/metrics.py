@@ -12,41 +12,126 @@ import matplotlib.gridspec as gridspec
 import pandas as pd
 import numpy as np
 import logging
-import seaborn as sns
-from typing import List, Dict
+from typing import Dict, Optional
 
 from config import C
+from core import profiler
 from simulation.road import Road
+from analysis.trajectory_file import TrajectoryWriter, TrajectoryReader
 
 logger = logging.getLogger("WaveBreaker.Analytics")
 
+# Colonnes enregistrables : nom -> (dtype, extraction depuis les colonnes du VehicleFleet)
+RECORDABLE_COLUMNS = {
+    "pos_km": (np.float32, lambda fleet: fleet.x / 1000.0),
+    "speed_kmh": (np.float32, lambda fleet: fleet.v * 3.6),
+    "is_connected": (np.bool_, lambda fleet: fleet.col('is_connected')),
+    "vehicle_id": (np.int32, lambda fleet: fleet.col('id')),
+    "accel": (np.float32, lambda fleet: fleet.col('a')),
+    "target_speed_kmh": (np.float32, lambda fleet: fleet.col('target_speed') * 3.6),
+}
+DEFAULT_COLUMNS = ("pos_km", "speed_kmh", "is_connected", "vehicle_id")
+# Colonnes indispensables au diagramme espace-temps du rapport
+REPORT_COLUMNS = ("pos_km", "speed_kmh")
+
+
+class TrajectoryColumns:
+    """
+    Tampons NumPy typés, à capacité croissante (doublement), une ligne par
+    véhicule échantillonné. `time` (float32) est toujours présent.
+    """
+
+    def __init__(self, columns=DEFAULT_COLUMNS, capacity: int = 65536):
+        self.names = ("time",) + tuple(columns)
+        self.size = 0
+        self._buffers: Dict[str, np.ndarray] = {"time": np.empty(capacity, dtype=np.float32)}
+        for name in columns:
+            self._buffers[name] = np.empty(capacity, dtype=RECORDABLE_COLUMNS[name][0])
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _reserve(self, extra: int):
+        capacity = len(self._buffers["time"])
+        if self.size + extra <= capacity:
+            return
+        while capacity < self.size + extra:
+            capacity *= 2
+        for name, buf in self._buffers.items():
+            grown = np.empty(capacity, dtype=buf.dtype)
+            grown[:self.size] = buf[:self.size]
+            self._buffers[name] = grown
+
+    def append_sample(self, time: float, fleet) -> None:
+        """Une copie vectorielle par colonne pour tout l'état de la route."""
+        n = len(fleet)
+        if n == 0:
+            return
+        self._reserve(n)
+        lo, hi = self.size, self.size + n
+        self._buffers["time"][lo:hi] = time
+        for name in self.names[1:]:
+            self._buffers[name][lo:hi] = RECORDABLE_COLUMNS[name][1](fleet)
+        self.size = hi
+
+    def column(self, name: str) -> np.ndarray:
+        """Vue (sans copie) sur les lignes remplies."""
+        return self._buffers[name][:self.size]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame({name: self.column(name) for name in self.names}, copy=False)
+
+
 class TwinTrafficRecorder:
-    def __init__(self):
-        self.records_chaos = []
-        self.records_wb = []
-        self.sample_rate = 2.0 
+    """
+    Échantillonne les deux routes jumelles. Avec un `writer` (.wbt), les
+    trajectoires partent aussi sur disque ; `keep_in_memory=False` coupe
+    alors les tampons RAM et le rapport relit le fichier (memory-map).
+    """
+
+    def __init__(self, sample_rate: float = 2.0, columns=DEFAULT_COLUMNS,
+                 writer: Optional[TrajectoryWriter] = None, keep_in_memory: bool = True):
+        missing = [name for name in REPORT_COLUMNS if name not in columns]
+        if missing:
+            raise ValueError(f"Colonnes requises pour le rapport absentes : {missing}")
+        if writer is None and not keep_in_memory:
+            raise ValueError("keep_in_memory=False nécessite un writer")
+        self.records_chaos = TrajectoryColumns(columns)
+        self.records_wb = TrajectoryColumns(columns)
+        self.sample_rate = sample_rate
         self.last_record_time = -1.0
+        self.writer = writer
+        self.keep_in_memory = keep_in_memory
 
     def record_step(self, time: float, road_chaos: Road, road_wb: Road):
         if time - self.last_record_time >= self.sample_rate:
+            prof = profiler.active
+            if prof is not None:
+                t = prof.clock()
             self.last_record_time = time
             self._capture_road_state(time, road_chaos, self.records_chaos)
             self._capture_road_state(time, road_wb, self.records_wb)
-
-    def _capture_road_state(self, time: float, road: Road, storage: list):
-        for v in road.vehicles:
-            storage.append({
-                "time": round(time, 1),
-                "pos_km": round(v.x / 1000.0, 3),
-                "speed_kmh": round(v.v * 3.6, 1),
-                "is_connected": v.is_connected
-            })
+            if prof is not None:
+                prof.lap("recorder", t)
+
+    def _capture_road_state(self, time: float, road: Road, storage: TrajectoryColumns):
+        if self.writer is not None:
+            self.writer.write_sample("chaos" if storage is self.records_chaos else "wb", time, road.fleet)
+        if self.keep_in_memory:
+            storage.append_sample(time, road.fleet)
+
+    def _load_dataframes(self):
+        if self.keep_in_memory:
+            # DataFrames adossés aux tampons (pas de copie)
+            return self.records_chaos.to_dataframe(), self.records_wb.to_dataframe()
+        self.writer.close()
+        reader = TrajectoryReader(self.writer.path)
+        return reader.to_dataframe("chaos"), reader.to_dataframe("wb")
 
     def generate_comparison_report(self, road_chaos: Road, road_wb: Road, filename="WaveBreaker_Final_Report.png"):
         logger.info("Generating Final Comparative Report...")
 
-        df_chaos = pd.DataFrame(self.records_chaos)
-        df_wb = pd.DataFrame(self.records_wb)
+        df_chaos, df_wb = self._load_dataframes()
         
         if df_chaos.empty or df_wb.empty:
             logger.warning("Not enough data to generate report.")
@@ -128,15 +213,21 @@ class TwinTrafficRecorder:
                 ax.text(x[i] + width/2, w, txt, ha='center', va='bottom', color='white', fontweight='bold')
 
     def _plot_travel_times(self, ax, r_c: Road, r_w: Road):
-        times_c = r_c.finished_travel_times
-        times_w = r_w.finished_travel_times
+        stats_c = r_c.travel_times
+        stats_w = r_w.travel_times
 
-        if not times_c or not times_w:
+        if not stats_c.count or not stats_w.count:
             ax.text(0.5, 0.5, "Pas assez de véhicules arrivés", ha='center', va='center', transform=ax.transAxes)
             return
 
-        sns.kdeplot(times_c, ax=ax, fill=True, color='red', alpha=0.3, label=f"Chaos (Avg: {np.mean(times_c):.0f}s)")
-        sns.kdeplot(times_w, ax=ax, fill=True, color='green', alpha=0.3, label=f"WaveBreaker (Avg: {np.mean(times_w):.0f}s)")
+        # Distribution issue des histogrammes en flux (normalisés en densité)
+        for stats, color, name in ((stats_c, 'red', "Chaos"), (stats_w, 'green', "WaveBreaker")):
+            hist = stats.histogram
+            density = hist.counts / (max(1, hist.total) * hist.bin_width)
+            label = f"{name} (Avg: {stats.mean:.0f}s | P90: {stats.percentile(90):.0f}s)"
+            ax.stairs(density, hist.edges, fill=True, color=color, alpha=0.3, label=label)
+
+        ax.set_xlim(min(stats_c.min, stats_w.min) - 30, max(stats_c.max, stats_w.max) + 30)
         ax.set_title("Distribution des Temps de Trajet", fontsize=12)
         ax.set_xlabel("Temps de parcours (s)")
-        ax.legend()
\ No newline at end of file
+        ax.legend()
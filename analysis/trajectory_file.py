@@ -0,0 +1,255 @@
+"""
+WAVEBREAKER TRAJECTORY FILE (.wbt)
+----------------------------------
+Format binaire compact, en ajout seul, pour streamer les trajectoires sur
+disque au lieu de les garder en RAM. Lecture par memory-map.
+
+Structure du fichier :
+    b"WBTRAJ01" | uint32 taille_header | header JSON (config, graine, colonnes)
+    puis une suite de chunks (un par échantillon et par scénario) :
+        chunk header  : b"CHNK" | uint32 scénario | uint32 n_lignes | float64 temps
+        colonnes      : pos_km float32[n] | speed_kmh float32[n]
+                        vehicle_id int32[n] | is_connected int32[n]
+    puis, à la fermeture, l'index des chunks (temps, scénario, n, offset)
+    et un trailer : int64 offset_index | int64 n_chunks | b"WBTIDX01".
+
+Le header décrit aussi l'accident ("incident" : instant et position du
+scénario, puis instant et victime observés, réécrits en place dans une
+réserve du header dès qu'ils sont connus) : `incident_window` saute à
+l'accident réellement contenu dans le fichier.
+
+Les deux scénarios jumeaux (0 = chaos, 1 = wb) partagent le même fichier.
+Si le trailer manque (run interrompu), le lecteur reconstruit l'index en
+sautant de chunk en chunk. Dans un chunk, les lignes sont triées par
+position décroissante (ordre du VehicleFleet, retrié à l'écriture s'il
+est momentanément cassé : accident téléporté, entrée dans une autre voie)
+: les fenêtres spatiales se font par recherche dichotomique.
+"""
+
+import json
+import struct
+import dataclasses
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Union
+from numpy.typing import NDArray
+
+from config import C
+
+MAGIC = b"WBTRAJ01"
+INDEX_MAGIC = b"WBTIDX01"
+CHUNK_MAGIC = b"CHNK"
+SCENARIOS = ("chaos", "wb")
+
+_LEN = struct.Struct("<I")
+_CHUNK_HEADER = struct.Struct("<4sIId")
+_TRAILER = struct.Struct("<qq8s")
+
+# Colonnes à largeur fixe, dans l'ordre du fichier
+FILE_COLUMNS = (
+    ("pos_km", np.dtype("<f4")),
+    ("speed_kmh", np.dtype("<f4")),
+    ("vehicle_id", np.dtype("<i4")),
+    ("is_connected", np.dtype("<i4")),
+)
+_ROW_BYTES = sum(dtype.itemsize for _, dtype in FILE_COLUMNS)
+# Réserve du header JSON (octets) pour y réécrire l'accident observé
+_HEADER_SLACK = 256
+
+INDEX_DTYPE = np.dtype([("time", "<f8"), ("scenario", "<u4"), ("n_rows", "<u4"), ("offset", "<i8")])
+
+ScenarioKey = Union[int, str]
+
+
+def _scenario_id(scenario: ScenarioKey) -> int:
+    return SCENARIOS.index(scenario) if isinstance(scenario, str) else int(scenario)
+
+
+class TrajectoryWriter:
+    """Écrivain en flux : un chunk par appel à `write_sample`, index écrit à `close`."""
+
+    def __init__(self, path: str, seed: Optional[int] = None, extra: Optional[dict] = None,
+                 incident_time: Optional[float] = None, incident_pos_km: Optional[float] = None):
+        self.path = path
+        self._file = open(path, "wb")
+        self._header = {
+            "version": 1,
+            "seed": seed,
+            "config": dataclasses.asdict(C),
+            "scenarios": list(SCENARIOS),
+            "columns": [[name, dtype.str] for name, dtype in FILE_COLUMNS],
+            "incident": {"time": incident_time, "pos_km": incident_pos_km,
+                         "observed_time": None, "victim_id": None},
+            **(extra or {}),
+        }
+        payload = json.dumps(self._header).encode("utf-8") + b" " * _HEADER_SLACK
+        payload += b" " * (-(len(MAGIC) + _LEN.size + len(payload)) % 8)
+        self._header_len = len(payload)
+        self._file.write(MAGIC + _LEN.pack(len(payload)) + payload)
+        self._offset = self._file.tell()
+        self._index = []
+
+    def record_incident(self, time: float, victim_id: Optional[int] = None) -> None:
+        """Note l'accident observé dans le header (réécrit en place, taille inchangée)."""
+        self._header["incident"].update(observed_time=float(time),
+                                        victim_id=int(victim_id) if victim_id is not None else None)
+        payload = json.dumps(self._header).encode("utf-8")
+        if len(payload) > self._header_len:
+            raise ValueError(f"{self.path} : réserve du header insuffisante pour l'accident")
+        end = self._file.tell()
+        self._file.seek(len(MAGIC) + _LEN.size)
+        self._file.write(payload.ljust(self._header_len))
+        self._file.seek(end)
+
+    def write_sample(self, scenario: ScenarioKey, time: float, fleet) -> None:
+        """Ajoute l'état courant d'une route (colonnes du VehicleFleet), trié par position décroissante."""
+        n = len(fleet)
+        x = fleet.x
+        order = slice(None) if fleet.is_ordered() else np.argsort(-x, kind="stable")
+        parts = [
+            _CHUNK_HEADER.pack(CHUNK_MAGIC, _scenario_id(scenario), n, time),
+            (x[order] / 1000.0).astype("<f4").tobytes(),
+            (fleet.v[order] * 3.6).astype("<f4").tobytes(),
+            fleet.col('id')[order].astype("<i4").tobytes(),
+            fleet.col('is_connected')[order].astype("<i4").tobytes(),
+        ]
+        self._index.append((time, _scenario_id(scenario), n, self._offset))
+        for part in parts:
+            self._file.write(part)
+        self._offset += _CHUNK_HEADER.size + n * _ROW_BYTES
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        index = np.array(self._index, dtype=INDEX_DTYPE)
+        self._file.write(index.tobytes())
+        self._file.write(_TRAILER.pack(self._offset, len(index), INDEX_MAGIC))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryReader:
+    """Lecteur memory-mappé : seules les pages des chunks demandés sont chargées."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mm = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(self._mm[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} : pas un fichier de trajectoires WaveBreaker")
+        (header_len,) = _LEN.unpack_from(self._mm, len(MAGIC))
+        start = len(MAGIC) + _LEN.size
+        self.header = json.loads(bytes(self._mm[start:start + header_len]).decode("utf-8"))
+        self._data_start = start + header_len
+        self.index = self._load_index()
+
+    @property
+    def seed(self) -> Optional[int]:
+        return self.header.get("seed")
+
+    @property
+    def config(self) -> dict:
+        return self.header["config"]
+
+    @property
+    def incident_time(self) -> float:
+        """Instant de l'accident : observé, sinon celui du scénario, sinon `sim.perturbation_time`."""
+        incident = self.header.get("incident") or {}
+        for key in ("observed_time", "time"):
+            if incident.get(key) is not None:
+                return float(incident[key])
+        return float(self.config["sim"]["perturbation_time"])
+
+    def _load_index(self) -> NDArray:
+        size = len(self._mm)
+        if size >= self._data_start + _TRAILER.size:
+            index_offset, count, magic = _TRAILER.unpack_from(self._mm, size - _TRAILER.size)
+            if magic == INDEX_MAGIC:
+                raw = self._mm[index_offset:index_offset + count * INDEX_DTYPE.itemsize]
+                return np.frombuffer(raw, dtype=INDEX_DTYPE)
+        return self._scan_index(size)
+
+    def _scan_index(self, size: int) -> NDArray:
+        """Reconstruction de l'index (fichier non fermé proprement)."""
+        entries = []
+        offset = self._data_start
+        while offset + _CHUNK_HEADER.size <= size:
+            magic, scenario, n, time = _CHUNK_HEADER.unpack_from(self._mm, offset)
+            end = offset + _CHUNK_HEADER.size + n * _ROW_BYTES
+            if magic != CHUNK_MAGIC or end > size:
+                break
+            entries.append((time, scenario, n, offset))
+            offset = end
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+    # ------------------------------------------------------------------
+    # Accès aux chunks
+    # ------------------------------------------------------------------
+    def _entries(self, scenario: ScenarioKey) -> NDArray:
+        return self.index[self.index["scenario"] == _scenario_id(scenario)]
+
+    def chunk_times(self, scenario: ScenarioKey) -> NDArray[np.float64]:
+        return self._entries(scenario)["time"]
+
+    def _read_chunk(self, entry) -> Dict[str, NDArray]:
+        n = int(entry["n_rows"])
+        offset = int(entry["offset"]) + _CHUNK_HEADER.size
+        chunk = {}
+        for name, dtype in FILE_COLUMNS:
+            nbytes = n * dtype.itemsize
+            chunk[name] = self._mm[offset:offset + nbytes].view(dtype)
+            offset += nbytes
+        return chunk
+
+    def _gather(self, entries, x_range=None) -> Dict[str, NDArray]:
+        parts = {name: [] for name, _ in FILE_COLUMNS}
+        times = []
+        for entry in entries:
+            chunk = self._read_chunk(entry)
+            lo, hi = 0, int(entry["n_rows"])
+            if x_range is not None:
+                # Positions décroissantes dans le chunk : dichotomie sur -pos
+                neg_pos = -chunk["pos_km"]
+                lo = int(np.searchsorted(neg_pos, -x_range[1], side="left"))
+                hi = int(np.searchsorted(neg_pos, -x_range[0], side="right"))
+            for name in parts:
+                parts[name].append(chunk[name][lo:hi])
+            times.append(np.full(hi - lo, entry["time"], dtype=np.float32))
+        out = {"time": np.concatenate(times) if times else np.empty(0, dtype=np.float32)}
+        for name, dtype in FILE_COLUMNS:
+            out[name] = np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=dtype)
+        out["is_connected"] = out["is_connected"].astype(bool)
+        return out
+
+    # ------------------------------------------------------------------
+    # Fenêtres
+    # ------------------------------------------------------------------
+    def time_window(self, scenario: ScenarioKey, t0: float, t1: float) -> Dict[str, NDArray]:
+        entries = self._entries(scenario)
+        lo, hi = np.searchsorted(entries["time"], [t0, t1], side="left")
+        return self._gather(entries[lo:hi])
+
+    def position_window(self, scenario: ScenarioKey, x0_km: float, x1_km: float,
+                        t0: float = -np.inf, t1: float = np.inf) -> Dict[str, NDArray]:
+        entries = self._entries(scenario)
+        lo, hi = np.searchsorted(entries["time"], [t0, t1], side="left")
+        return self._gather(entries[lo:hi], x_range=(x0_km, x1_km))
+
+    def incident_window(self, scenario: ScenarioKey, before: float = 60.0, after: float = 600.0) -> Dict[str, NDArray]:
+        """Saut direct à la fenêtre de l'accident (`incident_time`)."""
+        t_incident = self.incident_time
+        return self.time_window(scenario, t_incident - before, t_incident + after)
+
+    def to_dataframe(self, scenario: ScenarioKey, t0: float = -np.inf, t1: float = np.inf) -> pd.DataFrame:
+        return pd.DataFrame(self.time_window(scenario, t0, t1), copy=False)
+
+    def close(self) -> None:
+        # Le mapping est libéré quand plus aucune vue n'y fait référence
+        self._mm = None
@@ -2,132 +2,167 @@
 WAVEBREAKER MONTE-CARLO RUNNER (HEADLESS)
 -----------------------------------------
 Module d'exécution batch pour validation statistique (Industrial Grade).
-Lance N simulations en parallèle sans interface graphique pour générer
-des intervalles de confiance sur les gains (CO2, Fuel, Temps).
+Lance un balayage de scénarios × graines en parallèle sans interface
+graphique pour générer des intervalles de confiance sur les gains
+(CO2, Fuel, Temps).
 
 Fonctionnalités :
-- Multiprocessing (Utilisation de tous les cœurs CPU).
+- Balayage (simulation.sweep) : grille d'axes en ligne de commande ou liste
+  de scénarios JSON, une seule file de tâches sur le pool de processus.
+- Table de résultats JSON Lines écrite run par run ; une relance reprend
+  là où le balayage s'est arrêté (--fresh pour repartir de zéro).
 - Mode Headless (Pas de Pygame, pur calcul physique).
-- Agrégation statistique (Pandas/Seaborn).
+- Agrégation statistique par scénario (Pandas/Seaborn).
 - Visualisation de la robustesse (Boxplots).
 
+Exemple : python batch_run.py --runs 20 --rates 0.1 0.2 0.4 --flows 600 900
+
 Auteur: WaveBreaker Lead Architect
-Version: 1.0.0 (Monte-Carlo)
+Version: 2.0.0 (Sweep)
 """
 
+import os
+import argparse
 import multiprocessing
 import time
 import logging
-import random
-import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from typing import Dict, List
 from tqdm import tqdm
 
 # Imports Core (Sans UI)
 from config import C
-from core.controller import WaveBreakerBrain
-from simulation.road import Road
-from simulation.generator import TrafficGenerator
-
-# Configuration du Batch
-SIMULATION_COUNT = 50       # Nombre de simulations à lancer
-WB_PENETRATION_RATE = 0.20  # On teste la robustesse à 20%
-MAX_DURATION_SEC = 2500.0   # Durée max d'une run (simulée)
-
-def run_single_simulation(sim_id: int) -> Dict[str, float]:
-    """
-    Exécute une simulation complète en mode silencieux.
-    Retourne les deltas de performance (Chaos vs WB).
-    """
-    # 1. Isolation de l'aléatoire
-    # Chaque processus doit avoir une graine unique pour être reproductible
-    random.seed(sim_id * 12345)
-    np.random.seed(sim_id * 12345)
-    
-    # 2. Setup (Copie de main.py sans le Rendu)
-    road_chaos = Road(f"Sim{sim_id}_Chaos")
-    road_wb = Road(f"Sim{sim_id}_WB")
-    brain = WaveBreakerBrain(active_scenario=True)
-    generator = TrafficGenerator(road_chaos, road_wb, brain)
-    generator.set_penetration_rate(WB_PENETRATION_RATE)
-    
-    # 3. Boucle Rapide (Pure Physique)
-    current_time = 0.0
-    dt = C.sim.dt
-    
-    while current_time < MAX_DURATION_SEC:
-        generator.update(dt)
-        road_chaos.update(dt)
-        road_wb.update(dt)
-        brain.process(road_wb.sensors.snapshot, road_wb.vehicles)
-        current_time += dt
-
-    # 4. Extraction des KPIs finaux
-    m_chaos = road_chaos.metrics
-    m_wb = road_wb.metrics
-    
-    # Calcul des gains relatifs (%)
-    gain_co2 = 0.0
-    gain_fuel = 0.0
-    gain_time = 0.0
-    
-    if m_chaos['total_co2_kg'] > 0:
-        gain_co2 = (m_chaos['total_co2_kg'] - m_wb['total_co2_kg']) / m_chaos['total_co2_kg'] * 100
-        gain_fuel = (m_chaos['total_fuel_liters'] - m_wb['total_fuel_liters']) / m_chaos['total_fuel_liters'] * 100
-    
-    if m_chaos['avg_travel_time'] > 0:
-        gain_time = (m_chaos['avg_travel_time'] - m_wb['avg_travel_time']) / m_chaos['avg_travel_time'] * 100
-        
-    return {
-        "sim_id": sim_id,
-        "gain_co2_pct": gain_co2,
-        "gain_fuel_pct": gain_fuel,
-        "gain_time_pct": gain_time,
-        "vehicle_count": m_chaos['vehicle_count']
-    }
+from core import kernels
+from core.profiler import PhaseProfiler
+from simulation.road import INTEGRATORS
+from simulation.sweep import Scenario, ResultsTable, scenario_grid, load_scenarios, run_key, run_sweep
+from simulation.baseline import BaselineCache
+from core.stats import StreamingStats
+
+GAIN_COLUMNS = ['gain_co2_pct', 'gain_fuel_pct', 'gain_time_pct']
+
 
 def main_batch():
-    print(f"\n🚀 LANCEMENT DU BATCH MONTE-CARLO ({SIMULATION_COUNT} Runs)")
-    print(f"   Target WB Rate: {WB_PENETRATION_RATE*100}%")
+    defaults = Scenario()
+    parser = argparse.ArgumentParser(description="WaveBreaker Monte-Carlo (headless)")
+    parser.add_argument("--runs", type=int, default=50, help="Graines par scénario (sim_id 0..N-1)")
+    parser.add_argument("--rates", type=float, nargs="+", default=[defaults.penetration_rate],
+                        help="Taux de pénétration WB (0-1)")
+    parser.add_argument("--flows", type=float, nargs="+", default=[defaults.nominal_flow], help="Flux nominal (veh/h)")
+    parser.add_argument("--incident-km", type=float, nargs="+", default=[defaults.incident_pos_km])
+    parser.add_argument("--incident-time", type=float, nargs="+", default=[defaults.incident_time])
+    parser.add_argument("--incident-duration", type=float, nargs="+", default=[defaults.incident_duration])
+    parser.add_argument("--preshot", type=float, nargs="+", default=[defaults.preshot_duration],
+                        help="Durée PRESHOT du Brain (s)")
+    parser.add_argument("--headway", type=float, nargs="+", default=[defaults.time_headway],
+                        help="Temps inter-véhiculaire IDM (s)")
+    parser.add_argument("--duration", type=float, nargs="+", default=[defaults.duration], help="Durée simulée (s)")
+    parser.add_argument("--scenarios", metavar="JSON", help="Liste de scénarios (remplace la grille)")
+    parser.add_argument("--out", default="sweep_results.jsonl", help="Table de résultats (reprise automatique)")
+    parser.add_argument("--fresh", action="store_true", help="Efface la table existante au lieu de la reprendre")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--backend", default=C.sim.kernel_backend,
+                        help="Noyau IDM/émissions : auto, numpy, numba, python")
+    parser.add_argument("--ensemble", type=int, default=1, metavar="R",
+                        help="Nombre de répliques avancées ensemble par worker (1 = une simulation par tâche)")
+    parser.add_argument("--integrator", default=C.sim.integrator, choices=INTEGRATORS,
+                        help="Intégrateur des runs unitaires : fixed ou multirate (l'ensemble reste à pas fixe)")
+    parser.add_argument("--warm-start", choices=("exact", "shared"), default=None,
+                        help="Un remplissage pré-accident par graine, variantes bifurquées depuis son checkpoint "
+                             "(exact : par taux de pénétration ; shared : commun à tous les taux)")
+    parser.add_argument("--chaos-cache", nargs="?", const=".wavebreaker_cache/chaos", default=None, metavar="DIR",
+                        help="Référence Chaos simulée une fois par (graine, config, demande, accident) et "
+                             "mise en cache disque ; seule la route WB tourne par taux/PRESHOT")
+    parser.add_argument("--chaos-cache-mb", type=float, default=256.0, help="Taille max du cache Chaos (Mo)")
+    parser.add_argument("--chaos-trajectories", action="store_true",
+                        help="Stocke aussi les trajectoires Chaos (.wbt) dans le cache")
+    parser.add_argument("--telemetry", type=int, default=None, metavar="PORT",
+                        help="Télémétrie en direct : un serveur TCP local par worker à partir de PORT "
+                             "(python -m simulation.telemetry watch --port PORT)")
+    parser.add_argument("--profile", type=float, nargs="?", const=0.0, default=None, metavar="SECONDES",
+                        help="Chronométrage par phase dans les workers, agrégé sur le pool "
+                             "(rapport final et JSON ; SECONDES : rapport intermédiaire périodique)")
+    args = parser.parse_args()
+    kernels.set_default_backend(args.backend)
+    if sum((args.ensemble > 1, args.warm_start is not None, args.chaos_cache is not None)) > 1:
+        parser.error("--ensemble, --warm-start et --chaos-cache sont exclusifs")
+
+    if args.scenarios:
+        scenarios = load_scenarios(args.scenarios)
+    else:
+        scenarios = scenario_grid(penetration_rate=args.rates, nominal_flow=args.flows,
+                                  incident_pos_km=args.incident_km, incident_time=args.incident_time,
+                                  incident_duration=args.incident_duration, preshot_duration=args.preshot,
+                                  time_headway=args.headway, duration=args.duration)
+    sim_ids = list(range(args.runs))
+    table = ResultsTable(args.out, fresh=args.fresh)
+
+    print(f"\n🚀 LANCEMENT DU BALAYAGE MONTE-CARLO ({len(scenarios)} scénario(s) x {args.runs} graines)")
+    for scenario in scenarios:
+        print(f"   [{scenario.scenario_id}] {scenario.label}")
+    print(f"   Noyau de calcul: {kernels.get_backend().name}")
     print(f"   CPUs disponibles: {multiprocessing.cpu_count()}")
+    print(f"   Table de résultats: {args.out} ({len(table.rows)} runs existants)")
     print("=" * 60)
 
-    # Préparation des IDs
-    sim_ids = list(range(SIMULATION_COUNT))
-    results = []
     start_time = time.time()
+    cache = None
+    if args.warm_start:
+        engine = "warm" if args.warm_start == "exact" else "warm-shared"
+    elif args.chaos_cache:
+        engine = "cached"
+        cache = BaselineCache(args.chaos_cache, int(args.chaos_cache_mb * 2**20))
+        print(f"   Cache Chaos: {args.chaos_cache} ({cache.size / 2**20:.1f} Mo)")
+    else:
+        engine = "ensemble" if args.ensemble > 1 else "single"
+    integrator = "fixed" if engine == "ensemble" else args.integrator
+    profile = PhaseProfiler(report_every=args.profile or None) if args.profile is not None else None
+    executed = run_sweep(scenarios, sim_ids, table, integrator=integrator, engine=engine, ensemble=args.ensemble,
+                         processes=args.workers, backend=args.backend,
+                         baseline_cache=cache, baseline_trajectories=args.chaos_trajectories,
+                         telemetry_port=args.telemetry,
+                         progress=lambda it, total: tqdm(it, total=total), profile=profile)
+    duration = time.time() - start_time
+    print(f"\n✅ Balayage terminé en {duration:.1f}s ({executed} runs exécutés)")
+    if profile is not None and executed:
+        profile_path = os.path.splitext(args.out)[0] + "_profile.json"
+        profile.save(profile_path)
+        print(f"\n--- PROFIL PAR PHASE (cumul des workers) ---\n{profile.report()}\n   -> {profile_path}")
 
-    # Exécution Parallèle
-    num_workers = max(1, multiprocessing.cpu_count() - 1)
-    
-    with multiprocessing.Pool(processes=num_workers) as pool:
-        # imap_unordered pour le reporting temps réel avec tqdm
-        for res in tqdm(pool.imap_unordered(run_single_simulation, sim_ids), total=SIMULATION_COUNT):
-            results.append(res)
+    # Lignes du balayage demandé (la table peut en contenir d'autres)
+    wanted = {(s.scenario_id, integrator, engine, i) for s in scenarios for i in sim_ids}
+    results = [row for row in table.rows if run_key(row) in wanted]
+    labels = {s.scenario_id: s.label for s in scenarios}
 
-    duration = time.time() - start_time
-    print(f"\n✅ Batch terminé en {duration:.1f}s")
-    
     # --- ANALYSE & VISUALISATION ---
     if not results:
         print("Erreur: Aucun résultat généré.")
         return
 
-    df = pd.DataFrame(results)
-    
-    print("\n--- RÉSULTATS STATISTIQUES ---")
-    print(df[['gain_co2_pct', 'gain_fuel_pct', 'gain_time_pct']].describe())
+    df = pd.DataFrame([{k: v for k, v in row.items() if k not in ('travel_times_chaos', 'travel_times_wb')}
+                       for row in results])
+    df['scenario'] = df['scenario_id'].map(labels)
+
+    for scenario_id, group in df.groupby('scenario_id', sort=False):
+        print(f"\n--- RÉSULTATS STATISTIQUES [{scenario_id}] {labels[scenario_id]} ---")
+        print(group[GAIN_COLUMNS].describe())
+
+        # Fusion des distributions de temps de parcours (sans listes brutes)
+        rows = [row for row in results if row['scenario_id'] == scenario_id]
+        print("   Temps de parcours (ensemble des runs) :")
+        for name, key in (("Chaos", 'travel_times_chaos'), ("WaveBreaker", 'travel_times_wb')):
+            stats = StreamingStats.merged(row[key] for row in rows)
+            print(f"   {name:<12} N={stats.count:<7} moy={stats.mean:7.1f}s  σ={stats.std:6.1f}s  "
+                  f"P50={stats.percentile(50):7.1f}s  P90={stats.percentile(90):7.1f}s  P99={stats.percentile(99):7.1f}s")
     
     # Génération du Boxplot
     plt.style.use('dark_background')
     plt.figure(figsize=(10, 6))
     
     df_melt = df.melt(
-        id_vars=['sim_id'], 
-        value_vars=['gain_co2_pct', 'gain_fuel_pct', 'gain_time_pct'],
+        id_vars=['sim_id', 'scenario'], 
+        value_vars=GAIN_COLUMNS,
         var_name='Métrique', value_name='Gain (%)'
     )
     
@@ -138,10 +173,14 @@ def main_batch():
     }
     df_melt['Métrique'] = df_melt['Métrique'].map(name_map)
     
-    sns.boxplot(x='Métrique', y='Gain (%)', data=df_melt, palette="viridis")
-    sns.swarmplot(x='Métrique', y='Gain (%)', data=df_melt, color=".9", size=4, alpha=0.5)
-    
-    plt.title(f"Robustesse WaveBreaker (N={SIMULATION_COUNT}, Taux={WB_PENETRATION_RATE*100}%)", fontsize=14)
+    if len(scenarios) > 1:
+        # Un groupe de boîtes par métrique, une couleur par scénario
+        sns.boxplot(x='Métrique', y='Gain (%)', hue='scenario', data=df_melt, palette="viridis")
+        plt.title(f"Robustesse WaveBreaker ({len(scenarios)} scénarios, N={args.runs})", fontsize=14)
+    else:
+        sns.boxplot(x='Métrique', y='Gain (%)', data=df_melt, palette="viridis")
+        sns.swarmplot(x='Métrique', y='Gain (%)', data=df_melt, color=".9", size=4, alpha=0.5)
+        plt.title(f"Robustesse WaveBreaker (N={args.runs}, {labels[scenarios[0].scenario_id]})", fontsize=14)
     plt.axhline(0, color='red', linestyle='--', alpha=0.5)
     plt.grid(True, axis='y', alpha=0.2)
     
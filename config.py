@@ -33,6 +33,15 @@ class PhysicsParams:
     accel_boost_factor: float = 1.0       
     fuel_conversion_factor: float = 1.0 / 2.3
 
+    # Changement de voie (MOBIL) : politesse, seuil d'incitation (m/s²),
+    # freinage max imposé au nouveau suiveur (m/s²), délai entre deux changements (s)
+    mobil_politeness: float = 0.2
+    mobil_threshold: float = 0.2
+    mobil_safe_decel: float = 4.0
+    lane_change_cooldown: float = 3.0
+    # Ligne continue après l'entrée (m) : pas de changement de voie devant les véhicules injectés
+    lane_change_min_x: float = 300.0
+
 @dataclass(frozen=True)
 class SimSettings:
     dt: float = 0.25           
@@ -40,12 +49,24 @@ class SimSettings:
     time_scale_default: float = 60.0 
     # --- MODIF ICI : DENSITÉ ---
     nominal_flow: float = 600.0 # On réduit le flux global
+    # Arrivées : "regular" (intervalle constant, historique) ou "poisson"
+    arrival_process: str = "regular"
     
     perturbation_time: float = 1200.0 
     
     # --- MODIF ICI : POSITION ACCIDENT ---
     perturbation_pos: float = 30.0   # Accident repoussé au Km 30
 
+    # Intégrateur : "fixed" (dt unique, référence) ou "multirate" (macro-pas + sous-pas dt)
+    integrator: str = "fixed"
+    macro_dt: float = 1.0
+
+    # Noyau de calcul IDM/émissions : "auto", "numpy", "numba" ou "python" (référence)
+    kernel_backend: str = "auto"
+
+    # Debug : Road.metrics recalcule tout et vérifie les accumulateurs incrémentaux
+    debug_metrics: bool = False
+
 @dataclass(frozen=True)
 class VehicleSpecs:
     length: float = 5.0
@@ -74,6 +95,8 @@ class WaveBreakerConfig:
     sensor_range: float = 1000.0
     target_density: float = 30.0
     look_ahead_distance: float = 3000.0
+    # Période du cycle de contrôle V2X (s) : le Brain ne recalcule/diffuse qu'à ce rythme
+    control_period: float = 1.0
 
 @dataclass(frozen=True)
 
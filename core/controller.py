@@ -2,30 +2,144 @@
 WAVEBREAKER INTELLIGENCE CORE (DYNAMIC BOQ EDITION - FIXED)
 ---------------------------------------------------
 Stratégie : Eco-Glide Adaptatif avec détection de queue de bouchon (BOQ).
-Correction : Gestion dynamique de l'attribut de vitesse du SensorSnapshot.
+Correction : la BOQ lit `SensorSnapshot.mean_speeds` (l'ancien fallback
+`speeds`/`avg_speeds` ne trouvait jamais l'attribut : la BOQ ne tournait pas).
+Détection BOQ et dispatch des consignes sont vectoriels : le coût par tick
+ne dépend plus du nombre de véhicules sur la route.
+
+Cycle de contrôle : le Brain tourne à sa propre période
+(`C.wavebreaker.control_period`, comme un cycle de diffusion V2X) et non à
+chaque tick physique. À chaque cycle, seules sont renvoyées les consignes
+des segments dont la vitesse recommandée a changé, plus celles des
+véhicules entrés dans un nouveau segment depuis leur dernière consigne.
+Loi de commande (`update_speed_map`) et diffusion (`dispatch_orders`) sont
+séparées : un corridor découpé calcule la carte une fois sur la vue
+globale et chaque partition diffuse à ses propres véhicules.
 """
 
 import numpy as np
 import logging
-from typing import List
+from typing import Iterable, Optional, Union
+from numpy.typing import ArrayLike, NDArray
 from config import C
+from core import profiler
 from core.vehicle import Vehicle
+from core.fleet import VehicleFleet
 from core.infrastructure import SensorSnapshot
 
 logger = logging.getLogger("WaveBreaker.Brain")
 
+JAM_SPEED = 20.0 / 3.6       # En dessous : segment bouché
+FREE_SPEED = 60.0 / 3.6      # Au-dessus : fin de la queue (trafic fluide)
+V_MAX_CRISIS = 80.0 / 3.6    # Bride haute (WAW effect : passage immédiat au VERT NÉON)
+V_MIN_SAFETY = 25.0 / 3.6    # Bride basse
+
+
+def find_back_of_queue(mean_speeds: NDArray[np.float64], incident_pos_m: ArrayLike) -> NDArray[np.float64]:
+    """
+    Position de la queue du bouchon (BOQ) en amont de l'incident.
+
+    Équivalent vectoriel du parcours inverse des segments situés avant
+    l'incident : la queue démarre au premier segment bouché rencontré en
+    remontant, s'étend tant qu'on ne croise pas de segment fluide, et la BOQ
+    est le segment bouché le plus en amont de ce tronçon. Sans bouchon, la
+    BOQ est l'incident lui-même.
+
+    Accepte des vitesses (S,) ou (R, S) et une position d'incident scalaire
+    ou (R,) (moteur d'ensemble).
+    """
+    mean_speeds = np.asarray(mean_speeds)
+    incident = np.asarray(incident_pos_m, dtype=np.float64)
+    n_segments = mean_speeds.shape[-1]
+    idx = np.arange(n_segments)
+    upstream = (idx * C.road.sensor_spacing) < incident[..., None]
+    jam = upstream & (mean_speeds < JAM_SPEED)
+    fast = upstream & (mean_speeds > FREE_SPEED)
+
+    # Premier segment bouché en remontant depuis l'incident
+    j_top = np.where(jam, idx, -1).max(axis=-1)
+    # Premier segment fluide en amont de celui-ci : arrêt du parcours
+    stop = np.where(fast & (idx < j_top[..., None]), idx, -1).max(axis=-1)
+    # Segment bouché le plus en amont entre l'arrêt et j_top
+    boq_idx = np.where(jam & (idx > stop[..., None]), idx, n_segments).min(axis=-1)
+    return np.where(j_top >= 0, boq_idx * C.road.sensor_spacing, incident)
+
+
+def eco_glide_speed_map(boq_pos: ArrayLike, time_left: ArrayLike,
+                        num_segments: Optional[int] = None) -> NDArray[np.float64]:
+    """
+    Carte des vitesses cibles par segment : arrivée "ballistique" à la BOQ
+    en `time_left` secondes pour les segments en amont, vitesse libre ailleurs.
+    Diffuse sur une dimension réplique si les entrées sont des tableaux (R,).
+    """
+    boq = np.asarray(boq_pos, dtype=np.float64)[..., None]
+    t_left = np.asarray(time_left, dtype=np.float64)[..., None]
+    n_segments = num_segments if num_segments is not None else C.road.num_segments
+    segment_positions = np.arange(n_segments) * C.road.sensor_spacing
+    distances_to_target = boq - segment_positions
+    # Vitesse ballistique optimale, bridée (sécurité et effet visuel)
+    v_clamped = np.clip(distances_to_target / t_left, V_MIN_SAFETY, V_MAX_CRISIS)
+    return np.where(distances_to_target > 0, v_clamped, C.physics.desired_speed)
+
+
+def dispatch_orders(vehicles: Union[VehicleFleet, Iterable[Vehicle]], speed_map: NDArray[np.float64],
+                    dirty: NDArray[np.bool_]) -> int:
+    """
+    Diffusion différentielle : un véhicule connecté reçoit une consigne si
+    la vitesse de son segment a changé depuis le cycle précédent (`dirty`),
+    ou s'il a changé de segment depuis sa dernière consigne (`order_segment`).
+    Retourne le nombre de consignes envoyées.
+    """
+    seg_len = C.road.sensor_spacing
+    num_segments = len(speed_map)
+
+    if isinstance(vehicles, VehicleFleet):
+        # Une seule lecture indexée de la carte pour les véhicules concernés
+        idx = (vehicles.x / seg_len).astype(np.int64)
+        in_range = vehicles.col('is_connected') & (idx >= 0) & (idx < num_segments)
+        np.clip(idx, 0, num_segments - 1, out=idx)
+        last_segment = vehicles.col('order_segment')
+        orders = in_range & (dirty[idx] | (idx != last_segment))
+        targets = idx[orders]
+        vehicles.col('target_speed')[orders] = speed_map[targets]
+        last_segment[orders] = targets
+        return len(targets)
+
+    sent = 0
+    for v in vehicles:
+        if v.is_connected:
+            idx = int(v.x / seg_len)
+            if 0 <= idx < num_segments and (dirty[idx] or idx != v.order_segment):
+                # Application immédiate de la consigne IA
+                v.set_wavebreaker_order(speed_map[idx])
+                v.order_segment = idx
+                sent += 1
+    return sent
+
+
 class WaveBreakerBrain:
-    def __init__(self, active_scenario: bool = True):
+    def __init__(self, active_scenario: bool = True, num_segments: Optional[int] = None,
+                 preshot_duration: float = 400.0):
         self.active = active_scenario 
         self.incident_active = False
         self.incident_pos_m = 0.0
-        self.preshot_duration = 400.0 
+        self.preshot_duration = preshot_duration
         self.trigger_time = 0.0
-        self.num_segments = C.road.num_segments
+        self.num_segments = num_segments if num_segments is not None else C.road.num_segments
         self._current_speed_map = np.full(self.num_segments, C.physics.desired_speed, dtype=np.float64)
 
+        # Ordonnancement du cycle de contrôle (latence V2X)
+        self.control_period = C.wavebreaker.control_period
+        self._next_control_time = 0.0
+        # Carte diffusée au cycle précédent (NaN : rien encore diffusé)
+        self._dispatched_map = np.full(self.num_segments, np.nan, dtype=np.float64)
+        self._dirty_segments = np.zeros(self.num_segments, dtype=bool)
+        self.control_cycles = 0
+        self.orders_sent = 0
+
         if self.active:
-            logger.info(f"WaveBreaker Brain online (PRESHOT {self.preshot_duration}s).")
+            logger.info(f"WaveBreaker Brain online (PRESHOT {self.preshot_duration}s, "
+                        f"cycle {self.control_period}s).")
 
     def set_incident_state(self, active: bool, end_time: float, pos_m: float):
         if active and not self.incident_active:
@@ -33,11 +147,42 @@ class WaveBreakerBrain:
         self.incident_active = active
         self.incident_pos_m = pos_m
 
-    def process(self, sensor_data: SensorSnapshot, vehicles: List[Vehicle], current_time: float) -> None:
+    def _control_due(self, current_time: float) -> bool:
+        """Vrai si un cycle de contrôle doit tourner à `current_time` (sans rafale de rattrapage)."""
+        if current_time < self._next_control_time - 1e-9:
+            return False
+        self._next_control_time += self.control_period
+        if self._next_control_time <= current_time:
+            self._next_control_time = current_time + self.control_period
+        return True
+
+    def process(self, sensor_data: SensorSnapshot, vehicles: Union[VehicleFleet, Iterable[Vehicle]],
+                current_time: float) -> None:
+        if not self._control_due(current_time):
+            return
+        prof = profiler.active
+        if prof is not None:
+            t = prof.clock()
+            sent = self.orders_sent
+        self.control_cycles += 1
+        self.update_speed_map(sensor_data, current_time)
+        if prof is not None:
+            t = prof.lap("brain.control", t)
+        self._dispatch_orders(vehicles)
+        if prof is not None:
+            prof.lap("brain.dispatch", t)
+            prof.count("orders_dispatched", self.orders_sent - sent)
+
+    @property
+    def speed_map(self) -> NDArray[np.float64]:
+        """Vitesses cibles par segment du dernier cycle (lecture seule)."""
+        return self._current_speed_map
+
+    def update_speed_map(self, sensor_data: SensorSnapshot, current_time: float) -> None:
+        """Loi de commande seule (sans diffusion) : recalcule la carte des vitesses cibles."""
         if not self.active or not self.incident_active:
             self._current_speed_map.fill(C.physics.desired_speed)
             self.trigger_time = 0.0
-            self._dispatch_orders(vehicles)
             return
 
         if self.trigger_time == 0.0:
@@ -48,51 +193,16 @@ class WaveBreakerBrain:
         elapsed = current_time - self.trigger_time
         time_left = max(1.0, self.preshot_duration - elapsed)
 
-        # 2. DÉTECTION DE LA QUEUE DU BOUCHON (BOQ) - FIX ATTRIBUTE ERROR
-        # On vérifie quel attribut est disponible dans SensorSnapshot
-        speeds = getattr(sensor_data, 'speeds', getattr(sensor_data, 'avg_speeds', None))
-        
-        if speeds is None:
-            # Fallback si aucun attribut n'est trouvé pour éviter le crash
-            boq_pos = self.incident_pos_m
-        else:
-            jam_threshold = 20.0 / 3.6
-            boq_pos = self.incident_pos_m 
-            
-            # Parcours inverse pour trouver la queue du bouchon
-            for i in range(len(speeds) - 1, -1, -1):
-                seg_pos = i * C.road.sensor_spacing
-                if seg_pos < self.incident_pos_m:
-                    if speeds[i] < jam_threshold:
-                        boq_pos = seg_pos
-                    elif speeds[i] > (60.0/3.6) and boq_pos < self.incident_pos_m:
-                        break
+        # 2. DÉTECTION DE LA QUEUE DU BOUCHON (BOQ) - scan vectoriel de mean_speeds
+        boq_pos = float(find_back_of_queue(sensor_data.mean_speeds, self.incident_pos_m))
 
         # 3. CALCUL DES VITESSES CIBLES
-        segment_positions = np.arange(self.num_segments) * C.road.sensor_spacing
-        distances_to_target = boq_pos - segment_positions
-        upstream_mask = distances_to_target > 0
-
-        # Vitesse ballistique optimale
-        v_optimal = distances_to_target[upstream_mask] / time_left
-        
-        # BRIDES DE SÉCURITÉ ET EFFET VISUEL (WAW EFFECT)
-        # On bride à 80 km/h (au lieu de 130) pour que le passage au VERT NÉON soit immédiat
-        v_max_crisis = 80.0 / 3.6 
-        v_min_safety = 25.0 / 3.6 
-        
-        v_clamped = np.clip(v_optimal, v_min_safety, v_max_crisis)
-
-        self._current_speed_map.fill(C.physics.desired_speed) 
-        self._current_speed_map[upstream_mask] = v_clamped 
-        
-        self._dispatch_orders(vehicles)
+        self._current_speed_map[:] = eco_glide_speed_map(boq_pos, time_left, self.num_segments)
 
-    def _dispatch_orders(self, vehicles: List[Vehicle]):
-        seg_len = C.road.sensor_spacing
-        for v in vehicles:
-            if v.is_connected:
-                idx = int(v.x / seg_len)
-                if 0 <= idx < self.num_segments:
-                    # Application immédiate de la consigne IA
-                    v.set_wavebreaker_order(self._current_speed_map[idx])
\ No newline at end of file
+    def _dispatch_orders(self, vehicles: Union[VehicleFleet, Iterable[Vehicle]]):
+        """Diffuse la carte courante (segments modifiés depuis le cycle précédent, voir `dispatch_orders`)."""
+        speed_map = self._current_speed_map
+        dirty = self._dirty_segments
+        np.not_equal(speed_map, self._dispatched_map, out=dirty)
+        self._dispatched_map[:] = speed_map
+        self.orders_sent += dispatch_orders(vehicles, speed_map, dirty)
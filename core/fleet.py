@@ -0,0 +1,619 @@
+"""
+WAVEBREAKER VEHICLE FLEET (STRUCT-OF-ARRAYS)
+--------------------------------------------
+Stockage colonnaire de tous les véhicules d'une route.
+
+Chaque attribut physique de `Vehicle` (x, v, a, params_T/a/b, vitesses
+désirée/cible, CO2, carburant...) vit dans une colonne NumPy contiguë.
+Le pas physique (IDM + cinématique + émissions) est ainsi calculé pour
+toute la route en une poignée d'opérations vectorielles par tick.
+
+Compatibilité :
+- `VehicleView` expose la même interface que `Vehicle` (attributs et
+  `set_wavebreaker_order`) mais lit/écrit directement dans les colonnes.
+  Renderer, Recorder, Controller et Generator fonctionnent sans changement.
+
+Précision vs chemin scalaire (`Vehicle.update_dynamics`) :
+- Le chemin scalaire met à jour les véhicules un par un (Gauss-Seidel) :
+  le suiveur voit la position *déjà avancée* de son leader.
+- Le moteur vectoriel utilise l'état du leader au début du tick (Jacobi).
+- L'écart est d'ordre O(dt) sur les trajectoires. Sur le scénario de
+  référence (2500s, 600 veh/h, seed fixe), les totaux CO2/Fuel et le temps
+  de parcours moyen restent à moins de 0.5% du chemin scalaire.
+"""
+
+import numpy as np
+from collections import deque
+from typing import Deque, Dict, List, Mapping, Optional
+from numpy.typing import NDArray
+
+from config import C
+from core.vehicle import Vehicle
+from core.kernels import KernelBackend, get_backend
+
+# Colonnes flottantes : mêmes noms (et même sémantique) que les slots de Vehicle
+FLOAT_COLUMNS = (
+    'x', 'v', 'a',
+    'desired_speed', 'target_speed',
+    'params_T', 'params_a', 'params_b',
+    'co2_total', 'co2_instant',
+    'fuel_total', 'fuel_instant',
+    'distance_traveled', 'entry_time',
+    'last_lane_change',
+)
+INT_COLUMNS = ('id', 'lane', 'order_segment')
+# Valeurs initiales des colonnes absentes de `Vehicle` / des valeurs d'injection
+COLUMN_DEFAULTS = {'order_segment': -1, 'last_lane_change': -np.inf}
+BOOL_COLUMNS = ('is_connected',)
+# Ordre des colonnes de `columns` (et des lignes emballées par `pack_front`)
+COLUMN_NAMES = FLOAT_COLUMNS + INT_COLUMNS + BOOL_COLUMNS
+
+_INITIAL_CAPACITY = 256
+
+# Distance au-delà de laquelle le leader est ignoré (identique au chemin scalaire)
+LEADER_CUTOFF_M = 1000.0
+
+# Intégrateur multi-pas : seuils d'équilibre (|accélération|, |écart de vitesse au leader|)
+QUIET_ACCEL = 0.02
+QUIET_DV = 0.2
+
+
+def _column_property(name: str, cast):
+    def fget(self):
+        return cast(self._fleet.columns[name][self._row])
+
+    def fset(self, value):
+        self._fleet.columns[name][self._row] = value
+
+    return property(fget, fset)
+
+
+def _position_property():
+    """Comme `_column_property('x')`, mais une écriture externe peut casser l'ordre de la file."""
+    def fget(self):
+        return float(self._fleet.columns['x'][self._row])
+
+    def fset(self, value):
+        self._fleet.columns['x'][self._row] = value
+        self._fleet.order_dirty = True
+
+    return property(fget, fset)
+
+
+class VehicleView:
+    """
+    Vue compatible `Vehicle` sur une ligne du `VehicleFleet`.
+    Valide tant que le véhicule est sur la route : une fois archivé, la vue
+    est détachée (tout accès lève une AttributeError) puis recyclée pour un
+    prochain véhicule. Ne pas conserver de vue au-delà de la sortie.
+    """
+    __slots__ = ('_fleet', '_row')
+
+    def __init__(self, fleet: 'VehicleFleet', row: int):
+        self._fleet = fleet
+        self._row = row
+
+    def set_wavebreaker_order(self, speed_limit: float):
+        if self.is_connected:
+            self.target_speed = speed_limit
+        else:
+            self.target_speed = self.desired_speed
+
+    def __repr__(self) -> str:
+        return f"VehicleView(id={self.id}, x={self.x:.1f}, v={self.v:.2f})"
+
+
+for _name in FLOAT_COLUMNS:
+    setattr(VehicleView, _name, _column_property(_name, float))
+VehicleView.x = _position_property()
+for _name in INT_COLUMNS:
+    setattr(VehicleView, _name, _column_property(_name, int))
+for _name in BOOL_COLUMNS:
+    setattr(VehicleView, _name, _column_property(_name, bool))
+
+
+class VehicleFleet:
+    """
+    Colonnes NumPy gérées en file ordonnée (fenêtre glissante).
+
+    Sur une route à une voie, les véhicules ne se dépassent pas, entrent
+    à x=0 et sortent au bout de la route : l'ordre d'insertion EST l'ordre
+    des positions. Les lignes vivantes [head:tail) restent donc triées du
+    leader au dernier par construction, sans tri par tick :
+    - entrée : O(1) amorti en queue (`append`),
+    - sortie : O(k) en tête pour les k véhicules sortis (`pop_front`),
+    - contrôle : `is_ordered` (O(n) vectoriel) détecte toute violation
+      (ex: téléportation du véhicule accidenté) et `restore_order` répare.
+
+    Plusieurs voies (`lanes` > 1) : les lignes restent triées par position
+    (toutes voies confondues), les dépassements entre voies sont réparés
+    par `restore_order` (tri stable, O(n log n) au pire). Le leader de
+    chaque véhicule dans sa voie vient d'un tri stable par voie
+    (`leader_rows`), et les changements de voie (`change_lanes`, MOBIL)
+    sont évalués en lot par recherche dichotomique dans l'index (voie, -x).
+
+    Index de requêtes :
+    - id -> vue (`get`) : dictionnaire tenu à l'entrée et à la sortie, O(1),
+    - "véhicules ayant franchi P" (`count_past`) : dichotomie sur les
+      positions triées, O(log n). Une écriture de `x` via une vue marque la
+      file `order_dirty` : elle est retriée avant la requête suivante.
+    """
+
+    def __init__(self, capacity: int = _INITIAL_CAPACITY, backend: Optional[str] = None,
+                 lanes: Optional[int] = None):
+        self.kernels: KernelBackend = get_backend(backend)
+        self.lanes = lanes or C.road.lanes
+        self.lane_changes = 0
+        self.head = 0
+        self.tail = 0
+        self.columns: Dict[str, NDArray] = {}
+        for name in COLUMN_NAMES:
+            dtype = np.int64 if name in INT_COLUMNS else bool if name in BOOL_COLUMNS else np.float64
+            self.columns[name] = np.zeros(capacity, dtype=dtype)
+        self._views: Deque[VehicleView] = deque()
+        self._by_id: Dict[int, VehicleView] = {}
+        # Vues détachées, recyclées à l'entrée suivante (pas d'allocation par véhicule)
+        self._view_pool: List[VehicleView] = []
+        self.order_violations = 0
+        self.order_dirty = False
+
+        # Cumuls émis depuis le début (véhicules présents + sortis), tenus par advance()
+        self.emitted_co2_kg = 0.0
+        self.emitted_fuel_liters = 0.0
+
+    # ------------------------------------------------------------------
+    # Accès colonnes (vues NumPy sans copie sur les lignes vivantes)
+    # ------------------------------------------------------------------
+    @property
+    def size(self) -> int:
+        return self.tail - self.head
+
+    def col(self, name: str) -> NDArray:
+        return self.columns[name][self.head:self.tail]
+
+    @property
+    def x(self) -> NDArray[np.float64]:
+        return self.columns['x'][self.head:self.tail]
+
+    @property
+    def v(self) -> NDArray[np.float64]:
+        return self.columns['v'][self.head:self.tail]
+
+    @property
+    def views(self) -> Deque[VehicleView]:
+        return self._views
+
+    def __len__(self) -> int:
+        return self.tail - self.head
+
+    # ------------------------------------------------------------------
+    # Entrées / sorties
+    # ------------------------------------------------------------------
+    def append(self, vehicle: Vehicle) -> VehicleView:
+        """Copie l'état d'un `Vehicle` en queue de file et renvoie sa vue."""
+        if self.tail == len(self.columns['x']):
+            self._make_room()
+        row = self.tail
+        for name, column in self.columns.items():
+            column[row] = getattr(vehicle, name, COLUMN_DEFAULTS.get(name, 0))
+        self.tail += 1
+        return self._attach_view(row, int(vehicle.id))
+
+    def spawn(self, uid: int, values: Mapping[str, float]) -> VehicleView:
+        """Écrit directement une ligne (sans objet `Vehicle`) ; colonnes absentes à leur défaut."""
+        if self.tail == len(self.columns['x']):
+            self._make_room()
+        row = self.tail
+        for name, column in self.columns.items():
+            column[row] = values.get(name, COLUMN_DEFAULTS.get(name, 0))
+        self.columns['id'][row] = uid
+        self.tail += 1
+        return self._attach_view(row, uid)
+
+    def _attach_view(self, row: int, uid: int) -> VehicleView:
+        if self._view_pool:
+            view = self._view_pool.pop()
+            view._fleet = self
+            view._row = row
+        else:
+            view = VehicleView(self, row)
+        self._views.append(view)
+        self._by_id[uid] = view
+        return view
+
+    def pack_front(self, count: int, out: NDArray[np.float64]) -> None:
+        """
+        Copie les `count` véhicules de tête dans `out[:count]` : une ligne par
+        véhicule, une colonne par attribut (ordre `COLUMN_NAMES`, tout en
+        float64, exact pour les entiers et booléens). Transfert entre routes.
+        """
+        h = self.head
+        for j, column in enumerate(self.columns.values()):
+            out[:count, j] = column[h:h + count]
+
+    def extend_packed(self, rows: NDArray[np.float64]) -> None:
+        """Ajoute en queue des véhicules emballés par `pack_front` (ordre rétabli au tick suivant)."""
+        count = len(rows)
+        if count == 0:
+            return
+        if self.tail + count > len(self.columns['x']):
+            self._make_room(count)
+        t = self.tail
+        for j, column in enumerate(self.columns.values()):
+            column[t:t + count] = rows[:, j]
+        ids = self.columns['id']
+        for row in range(t, t + count):
+            self._attach_view(row, int(ids[row]))
+        self.tail += count
+        self.order_dirty = True
+
+    def _make_room(self, extra: int = 1):
+        """Recale la fenêtre en début de buffer (et double la capacité si elle est pleine)."""
+        size = self.size
+        capacity = len(self.columns['x'])
+        if size > capacity // 2:
+            capacity *= 2
+        while size + extra > capacity:
+            capacity *= 2
+        for name, column in self.columns.items():
+            moved = np.zeros(capacity, dtype=column.dtype)
+            moved[:size] = column[self.head:self.tail]
+            self.columns[name] = moved
+        for row, view in enumerate(self._views):
+            view._row = row
+        self.head = 0
+        self.tail = size
+
+    def count_exited(self, limit_m: float) -> int:
+        """Nombre de véhicules de tête ayant franchi `limit_m` (O(k))."""
+        x = self.columns['x']
+        k = self.head
+        while k < self.tail and x[k] >= limit_m:
+            k += 1
+        return k - self.head
+
+    def pop_front(self, count: int) -> None:
+        """Retire les `count` véhicules de tête et détache leurs vues."""
+        ids = self.columns['id']
+        for row in range(self.head, self.head + count):
+            del self._by_id[int(ids[row])]
+            view = self._views.popleft()
+            view._fleet = None
+            self._view_pool.append(view)
+        self.head += count
+        if self.head == self.tail:
+            self.head = self.tail = 0
+
+    # ------------------------------------------------------------------
+    # Checkpoint (pickle)
+    # ------------------------------------------------------------------
+    def __getstate__(self) -> dict:
+        """
+        État compact : fenêtre vivante seulement, backend par son nom, index
+        et vues reconstruits au chargement (voir simulation.checkpoint).
+        """
+        state = self.__dict__.copy()
+        state['kernels'] = self.kernels.name
+        state['columns'] = {name: column[self.head:self.tail].copy() for name, column in self.columns.items()}
+        state['head'], state['tail'] = 0, self.tail - self.head
+        for key in ('_views', '_by_id', '_view_pool'):
+            del state[key]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.kernels = get_backend(state['kernels'])
+        capacity = _INITIAL_CAPACITY
+        while capacity < 2 * self.tail:
+            capacity *= 2
+        for name, window in state['columns'].items():
+            column = np.zeros(capacity, dtype=window.dtype)
+            column[:self.tail] = window
+            self.columns[name] = column
+        self._views = deque()
+        self._by_id = {}
+        self._view_pool = []
+        ids = self.columns['id']
+        for row in range(self.tail):
+            self._attach_view(row, int(ids[row]))
+
+    # ------------------------------------------------------------------
+    # Requêtes indexées
+    # ------------------------------------------------------------------
+    def get(self, uid: int) -> Optional[VehicleView]:
+        """Vue du véhicule `uid` s'il est sur la route (O(1))."""
+        return self._by_id.get(uid)
+
+    def lane_tails(self, out: Optional[NDArray[np.float64]] = None) -> NDArray[np.float64]:
+        """
+        Dernier véhicule de chaque voie (file triée) : tableau (voies, 2) de
+        (x, v), (inf, 0) si la voie est vide. `out` : tampon réutilisé.
+        """
+        if out is None:
+            out = np.empty((self.lanes, 2))
+        out[:, 0] = np.inf
+        out[:, 1] = 0.0
+        n = self.size
+        if n == 0:
+            return out
+        if self.lanes == 1:
+            out[0, 0] = self.columns['x'][self.tail - 1]
+            out[0, 1] = self.columns['v'][self.tail - 1]
+            return out
+        last = np.full(self.lanes, -1, dtype=np.int64)
+        np.maximum.at(last, self.col('lane'), np.arange(n))
+        present = last >= 0
+        out[present, 0] = self.x[last[present]]
+        out[present, 1] = self.v[last[present]]
+        return out
+
+    def count_past(self, pos_m: float) -> int:
+        """Nombre de véhicules avec x >= pos_m, i.e. les `count` premières lignes (O(log n))."""
+        self.ensure_ordered()
+        x = self.columns['x']
+        lo, hi = self.head, self.tail
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if x[mid] >= pos_m:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo - self.head
+
+    def view_at(self, rank: int) -> VehicleView:
+        """Vue du `rank`-ième véhicule de la file (0 = leader)."""
+        return self._views[rank]
+
+    # ------------------------------------------------------------------
+    # Invariant d'ordre
+    # ------------------------------------------------------------------
+    def ensure_ordered(self) -> None:
+        """Retrie la file seulement si une écriture externe de `x` a pu casser l'ordre."""
+        if self.order_dirty:
+            if not self.is_ordered():
+                self.restore_order()
+            self.order_dirty = False
+
+    def is_ordered(self) -> bool:
+        x = self.x
+        return bool(np.all(x[:-1] >= x[1:]))
+
+    def restore_order(self) -> None:
+        """Tri stable par position décroissante (réparation après violation)."""
+        self.order_violations += 1
+        h, t = self.head, self.tail
+        order = np.argsort(-self.x, kind='stable')
+        for name, column in self.columns.items():
+            column[h:t] = column[h:t][order]
+        # Seules les vues des lignes déplacées sont réaffectées (dépassements locaux)
+        moved = np.flatnonzero(order != np.arange(t - h))
+        moved_views = [self._views[i] for i in order[moved]]
+        for pos, view in zip(moved.tolist(), moved_views):
+            self._views[pos] = view
+            view._row = h + pos
+        self.order_dirty = False
+
+    # ------------------------------------------------------------------
+    # Physique vectorielle
+    # ------------------------------------------------------------------
+    def leader_rows(self) -> NDArray[np.int64]:
+        """
+        Ligne (relative à `head`) du leader de chaque véhicule dans sa voie,
+        -1 pour le premier de chaque voie. Suppose la file triée par position.
+        Une voie : ligne précédente. Plusieurs : tri stable par voie (O(n log n)),
+        qui garde dans chaque voie l'ordre des positions décroissantes.
+        """
+        n = self.size
+        if self.lanes == 1 or n == 0:
+            return np.arange(-1, n - 1)
+        lane = self.col('lane')
+        perm = np.argsort(lane, kind='stable')
+        same_lane = lane[perm[1:]] == lane[perm[:-1]]
+        leader = np.full(n, -1, dtype=np.int64)
+        leader[perm[1:][same_lane]] = perm[:-1][same_lane]
+        return leader
+
+    @staticmethod
+    def _leader_state(x: NDArray[np.float64], v: NDArray[np.float64], leader: NDArray[np.int64],
+                      lane: Optional[NDArray[np.int64]] = None, boundary: Optional[NDArray[np.float64]] = None):
+        """
+        État du leader de voie, pris en compte s'il est à moins de LEADER_CUTOFF_M.
+        `boundary` (voies × (x, v)) : leader des premiers de chaque voie, situé
+        hors de la route (route partielle d'un corridor découpé).
+        """
+        lead_x = np.full(len(x), np.inf)
+        lead_v = np.zeros(len(x))
+        with_leader = leader >= 0
+        lead_x[with_leader] = x[leader[with_leader]]
+        lead_v[with_leader] = v[leader[with_leader]]
+        if boundary is not None:
+            front = ~with_leader
+            lead_x[front] = boundary[lane[front], 0]
+            lead_v[front] = boundary[lane[front], 1]
+        has_leader = (lead_x - x) < LEADER_CUTOFF_M
+        return lead_x, lead_v, has_leader
+
+    # ------------------------------------------------------------------
+    # Changements de voie (MOBIL vectoriel)
+    # ------------------------------------------------------------------
+    def _lead_state(self, leader: NDArray[np.int64], leader_lane: NDArray[np.int64],
+                    boundary: Optional[NDArray[np.float64]]):
+        """(x, v) des leaders `leader` ; -1 : leader hors route de la voie (`boundary`) ou aucun."""
+        with_leader = leader >= 0
+        if boundary is None:
+            return np.where(with_leader, self.x[leader], np.inf), np.where(with_leader, self.v[leader], 0.0)
+        return (np.where(with_leader, self.x[leader], boundary[leader_lane, 0]),
+                np.where(with_leader, self.v[leader], boundary[leader_lane, 1]))
+
+    def _idm_pairs(self, follower: NDArray[np.int64], lead_x: NDArray[np.float64],
+                   lead_v: NDArray[np.float64]) -> NDArray[np.float64]:
+        """Accélération IDM de `follower` s'il suivait un leader en (lead_x, lead_v), en lot."""
+        x, v = self.x, self.v
+        xf = x[follower]
+        return self.kernels.idm_acceleration(
+            xf, v[follower], self.col('target_speed')[follower],
+            self.col('params_T')[follower], self.col('params_a')[follower], self.col('params_b')[follower],
+            lead_x, lead_v, (lead_x - xf) < LEADER_CUTOFF_M,
+        )
+
+    def change_lanes(self, direction: int, current_time: float, start_m: float = 0.0,
+                     boundary: Optional[NDArray[np.float64]] = None) -> int:
+        """
+        Évalue en lot le passage de chaque véhicule vers la voie `lane + direction`
+        (modèle MOBIL, symétrique) et applique les changements retenus.
+
+        - Index : lignes triées par (voie, -x) ; nouveau leader/suiveur dans la
+          voie cible par `searchsorted`, O(n log n) pour toute la flotte.
+        - Sécurité : pas de chevauchement, le nouveau suiveur ne freine pas
+          au-delà de `mobil_safe_decel`, et aucun changement à moins de
+          `lane_change_min_x` du début `start_m` de la route (sinon le véhicule
+          bloque l'entrée de sa voie ; route partielle : suiveurs amont invisibles).
+        - `boundary` : leaders hors route par voie (voir `_leader_state`).
+        - Incitation : gain propre + politesse × (gains des suiveurs ancien et
+          nouveau) > `mobil_threshold` (accélérations actuelles = colonne `a`).
+        - Un seul véhicule par trou de la voie cible et par appel ; un seul
+          sens par appel (l'appelant alterne), ce qui évite les croisements.
+        Retourne le nombre de changements.
+        """
+        n = self.size
+        if self.lanes < 2 or n == 0:
+            return 0
+        phys = C.physics
+        length = C.vehicle.length
+        x, lane, acc = self.x, self.col('lane'), self.col('a')
+
+        # Index (voie, -x) : tri stable par voie d'une file déjà triée par position
+        perm = np.argsort(lane, kind='stable')
+        x_max = float(x[0])
+        span = x_max - float(x[-1]) + 1.0
+        keys = lane[perm] * span + (x_max - x[perm])
+        rank = np.empty(n, dtype=np.int64)
+        rank[perm] = np.arange(n)
+        # Sentinelles (-1) aux deux bouts : rang -1 et n valides sans test de bornes
+        rows_pad = np.concatenate(([-1], perm, [-1]))
+        lane_pad = np.concatenate(([-1], lane[perm], [-1]))
+
+        def neighbour(pos, lane_id):
+            return np.where(lane_pad[pos + 1] == lane_id, rows_pad[pos + 1], -1)
+
+        target_lane = lane + direction
+        candidates = np.flatnonzero((target_lane >= 0) & (target_lane < self.lanes) & (x >= start_m + phys.lane_change_min_x)
+                                    & (current_time - self.col('last_lane_change') >= phys.lane_change_cooldown))
+        if len(candidates) == 0:
+            return 0
+        tl = target_lane[candidates]
+        slot = np.searchsorted(keys, tl * span + (x_max - x[candidates]), side='left')
+        new_follower = neighbour(slot, tl)
+        new_leader = neighbour(slot - 1, tl)
+        old_leader = neighbour(rank[candidates] - 1, lane[candidates])
+        old_follower = neighbour(rank[candidates] + 1, lane[candidates])
+
+        # --- Sécurité ---
+        xc = x[candidates]
+        new_lead_x, new_lead_v = self._lead_state(new_leader, tl, boundary)
+        gap_ahead = new_lead_x - xc - length
+        gap_behind = np.where(new_follower >= 0, xc - x[new_follower] - length, np.inf)
+        has_nf = new_follower >= 0
+        nf = np.flatnonzero(has_nf)
+        acc_nf_new = np.zeros(len(candidates))
+        acc_nf_new[nf] = self._idm_pairs(new_follower[nf], xc[nf], self.v[candidates[nf]])
+        safe = (gap_ahead > 0) & (gap_behind > 0) & (acc_nf_new >= -phys.mobil_safe_decel)
+
+        # --- Incitation ---
+        own_gain = self._idm_pairs(candidates, new_lead_x, new_lead_v) - acc[candidates]
+        nf_gain = np.where(has_nf, acc_nf_new - acc[np.maximum(new_follower, 0)], 0.0)
+        has_of = old_follower >= 0
+        of = np.flatnonzero(has_of)
+        of_gain = np.zeros(len(candidates))
+        old_lead_x, old_lead_v = self._lead_state(old_leader[of], lane[candidates[of]], boundary)
+        of_gain[of] = self._idm_pairs(old_follower[of], old_lead_x, old_lead_v) - acc[old_follower[of]]
+        incentive = own_gain + phys.mobil_politeness * (nf_gain + of_gain)
+        chosen = np.flatnonzero(safe & (incentive > phys.mobil_threshold))
+        if len(chosen) == 0:
+            return 0
+
+        # Un véhicule par trou (voie cible, position d'insertion) : le plus avancé
+        _, first = np.unique(slot[chosen], return_index=True)
+        rows = candidates[chosen[first]]
+        lane[rows] = target_lane[rows]
+        self.col('last_lane_change')[rows] = current_time
+        self.lane_changes += len(rows)
+        return len(rows)
+
+    def advance(self, dt: float, emission_factor: float = 1.0,
+                boundary: Optional[NDArray[np.float64]] = None) -> None:
+        """
+        IDM + cinématique + émissions pour toute la flotte (état Jacobi, backend `self.kernels`).
+        `boundary` : leaders hors route par voie (voir `_leader_state`).
+        """
+        n = self.size
+        if n == 0:
+            return
+        h, t = self.head, self.tail
+        cols = self.columns
+        x = cols['x'][h:t]
+        v = cols['v'][h:t]
+
+        lead_x, lead_v, has_leader = self._leader_state(x, v, self.leader_rows(), cols['lane'][h:t], boundary)
+        acc = self.kernels.idm_acceleration(
+            x, v, cols['target_speed'][h:t],
+            cols['params_T'][h:t], cols['params_a'][h:t], cols['params_b'][h:t],
+            lead_x, lead_v, has_leader,
+        )
+
+        # --- Mouvement ---
+        v_new = v + acc * dt
+        stopped = v_new < 0
+        v_new[stopped] = 0.0
+        acc[stopped] = 0.0
+
+        step_dist = v_new * dt + 0.5 * acc * dt * dt
+        v[:] = v_new
+        cols['a'][h:t] = acc
+        x += step_dist
+        cols['distance_traveled'][h:t] += step_dist
+
+        # --- Consommation ---
+        co2_instant = self.kernels.emissions(v, acc, dt, emission_factor)
+        fuel_instant = co2_instant * C.physics.fuel_conversion_factor
+        cols['co2_instant'][h:t] = co2_instant
+        cols['co2_total'][h:t] += co2_instant
+        cols['fuel_instant'][h:t] = fuel_instant
+        cols['fuel_total'][h:t] += fuel_instant
+        self.emitted_co2_kg += float(co2_instant.sum())
+        self.emitted_fuel_liters += float(fuel_instant.sum())
+
+
+    def advance_multirate(self, macro_dt: float, fine_dt: float, emission_factor: float = 1.0) -> int:
+        """
+        Pas multi-cadence sur `macro_dt` (noyau `multirate_step` du backend) :
+        les véhicules à l'équilibre (accélération et écart de vitesse au leader
+        négligeables, leader et leader du leader aussi) avancent en un seul pas
+        en forme close ; les autres (bouchon, accident, leader proche qui
+        freine) sont sous-échantillonnés à `fine_dt`. Sans véhicule à
+        l'équilibre, le résultat est celui de `advance(fine_dt)` répété.
+        Retourne le nombre de véhicules sous-échantillonnés.
+        """
+        n = self.size
+        if n == 0:
+            return 0
+        n_sub = max(1, int(round(macro_dt / fine_dt)))
+        h, t = self.head, self.tail
+        cols = self.columns
+        acc, distance, co2_step, n_active = self.kernels.multirate_step(
+            cols['x'][h:t], cols['v'][h:t], cols['target_speed'][h:t],
+            cols['params_T'][h:t], cols['params_a'][h:t], cols['params_b'][h:t], self.leader_rows(),
+            macro_dt, n_sub, emission_factor, LEADER_CUTOFF_M, QUIET_ACCEL, QUIET_DV,
+        )
+
+        # --- Cumuls (co2/fuel_instant = émis pendant ce macro-pas) ---
+        fuel_step = co2_step * C.physics.fuel_conversion_factor
+        cols['a'][h:t] = acc
+        cols['distance_traveled'][h:t] += distance
+        cols['co2_instant'][h:t] = co2_step
+        cols['co2_total'][h:t] += co2_step
+        cols['fuel_instant'][h:t] = fuel_step
+        cols['fuel_total'][h:t] += fuel_step
+        self.emitted_co2_kg += float(co2_step.sum())
+        self.emitted_fuel_liters += float(fuel_step.sum())
+        return int(n_active)
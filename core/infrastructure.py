@@ -5,31 +5,44 @@ Module d'infrastructure intelligente (IoT).
 Simule un réseau de capteurs inductifs ou de caméras le long de la route.
 
 Optimisations :
-- Agrégation vectorielle via NumPy (bincount) pour performance O(1) relative au nombre de segments.
+- Agrégation vectorielle en place (np.add.at) pour performance O(1) relative au nombre de segments.
 - Gestion robuste des divisions par zéro (segments vides).
-- Architecture 'Snapshot' immuable pour thread-safety potentiel.
+- Double tampon de Snapshots préalloués : aucune allocation par tick,
+  publication par simple échange de références (jamais d'état à moitié écrit).
+- Lecture directe des colonnes du VehicleFleet (pas de list comprehension).
+- Multi-voies : agrégation par (voie, segment) en un seul passage ; les
+  métriques globales sont la somme des voies (vues directes en voie unique).
 
 Auteur: WaveBreaker Lead Architect
-Version: 3.0.0 (Vectorized IoT)
+Version: 3.1.0 (Zero-Alloc IoT)
 """
 
 import numpy as np
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 from numpy.typing import NDArray
 
 from config import C
 from core.vehicle import Vehicle
 
-@dataclass(frozen=True)
+@dataclass
 class SensorSnapshot:
     """
-    DTO (Data Transfer Object) immuable représentant l'état de la route à l'instant T.
+    DTO (Data Transfer Object) représentant l'état de la route à l'instant T.
     Utilisé par le Contrôleur (IA) et le Dashboard (UI).
+
+    En lecture seule pour les consommateurs : seul SensorNetwork écrit, et
+    uniquement dans le tampon arrière. Un snapshot publié reste intact
+    jusqu'à la publication suivante incluse (il est réutilisé au tick d'après).
     """
     densities: NDArray[np.float64]   # Densité (veh/km) par segment
     mean_speeds: NDArray[np.float64] # Vitesse moyenne (m/s) par segment
     occupancy: NDArray[np.int64]     # Nombre brut de véhicules par segment
+    lane_densities: NDArray[np.float64]   # (voies, segments)
+    lane_mean_speeds: NDArray[np.float64] # (voies, segments)
+    lane_occupancy: NDArray[np.int64]     # (voies, segments)
+    mean_density: float = 0.0        # Densité moyenne sur la route (veh/km), calculée une fois par tick
+    tick: int = 0                    # Numéro de publication (détection d'un snapshot périmé)
 
 class SensorNetwork:
     """
@@ -37,82 +50,146 @@ class SensorNetwork:
     Mappe les positions continues (float) vers des segments discrets (bins).
     """
 
-    def __init__(self):
-        # Configuration topologique récupérée de C.road
-        self.num_segments = C.road.num_segments
+    def __init__(self, lanes: Optional[int] = None, num_segments: Optional[int] = None, first_segment: int = 0):
+        # Configuration topologique récupérée de C.road ; une route partielle
+        # (corridor découpé) ne couvre que les segments [first_segment, first_segment + num_segments)
+        self.lanes = lanes if lanes is not None else C.road.lanes
+        self.num_segments = num_segments if num_segments is not None else C.road.num_segments
+        self.first_segment = first_segment
         self.segment_len = C.road.sensor_spacing
-        
-        # Initialisation de l'état vide (Zero-State)
-        self._snapshot = SensorSnapshot(
-            densities=np.zeros(self.num_segments, dtype=np.float64),
-            mean_speeds=np.full(self.num_segments, C.vehicle.max_speed_ms, dtype=np.float64),
-            occupancy=np.zeros(self.num_segments, dtype=np.int64)
+        self._segment_km = self.segment_len / 1000.0
+        self._road_start = first_segment * self.segment_len
+        self._road_end = self._road_start + self.num_segments * self.segment_len
+
+        # Double tampon : _front est publié, _back reçoit le calcul en cours
+        self._front = self._new_snapshot()
+        self._back = self._new_snapshot()
+        self._tick = 0
+
+        # Tampons de travail (agrandis par doublement, jamais par tick)
+        self._has_vehicles = np.zeros((self.lanes, self.num_segments), dtype=bool)
+        self._empty_segments = np.zeros((self.lanes, self.num_segments), dtype=bool)
+        # Idem pour les totaux de la chaussée (routes à plusieurs voies)
+        self._road_has_vehicles = np.zeros(self.num_segments, dtype=bool)
+        self._road_empty_segments = np.zeros(self.num_segments, dtype=bool)
+        self._scratch_f = np.empty(1024, dtype=np.float64)
+        self._scratch_i = np.empty(1024, dtype=np.int64)
+
+    def _new_snapshot(self) -> SensorSnapshot:
+        """Initialisation de l'état vide (Zero-State)."""
+        shape = (self.lanes, self.num_segments)
+        lane_densities = np.zeros(shape, dtype=np.float64)
+        lane_mean_speeds = np.full(shape, C.vehicle.max_speed_ms, dtype=np.float64)
+        lane_occupancy = np.zeros(shape, dtype=np.int64)
+        if self.lanes == 1:
+            # Voie unique : les métriques globales sont des vues de la voie 0
+            aggregates = (lane_densities[0], lane_mean_speeds[0], lane_occupancy[0])
+        else:
+            aggregates = (np.zeros(self.num_segments, dtype=np.float64),
+                          np.full(self.num_segments, C.vehicle.max_speed_ms, dtype=np.float64),
+                          np.zeros(self.num_segments, dtype=np.int64))
+        return SensorSnapshot(
+            densities=aggregates[0],
+            mean_speeds=aggregates[1],
+            occupancy=aggregates[2],
+            lane_densities=lane_densities,
+            lane_mean_speeds=lane_mean_speeds,
+            lane_occupancy=lane_occupancy,
         )
 
+    def __setstate__(self, state: dict) -> None:
+        """Checkpoint (pickle) : en voie unique, les agrégats redeviennent des vues de la voie 0."""
+        self.__dict__.update(state)
+        if self.lanes == 1:
+            for snap in (self._front, self._back):
+                snap.densities = snap.lane_densities[0]
+                snap.mean_speeds = snap.lane_mean_speeds[0]
+                snap.occupancy = snap.lane_occupancy[0]
+
     def update(self, vehicles: List[Vehicle]) -> None:
         """
-        Scan de la route et mise à jour des métriques.
-        Cette méthode doit être ultra-rapide (appelée à chaque tick physique).
+        Scan d'une liste d'objets `Vehicle` (chemin de compatibilité).
+        Les routes à colonnes appellent directement `update_from_arrays`.
         """
-        if not vehicles:
-            self._reset_state()
-            return
-
-        # 1. EXTRACTION VECTORIELLE (Bottleneck potentiel en Python pur -> List Comp est le plus rapide)
-        # On extrait les scalaires des objets Vehicle
         positions = np.array([v.x for v in vehicles], dtype=np.float64)
         speeds = np.array([v.v for v in vehicles], dtype=np.float64)
+        lanes = np.array([v.lane for v in vehicles], dtype=np.int64)
+        self.update_from_arrays(positions, speeds, lanes)
 
-        # 2. DISCRÉTISATION SPATIALE (Binning)
-        # On calcule l'index du segment pour chaque véhicule : idx = floor(x / segment_len)
-        segment_indices = (positions // self.segment_len).astype(np.int64)
-
-        # Filtrage des hors-limites (Sécurité)
-        # Au cas où un véhicule dépasse légèrement 50km avant d'être garbage collected
-        valid_mask = (segment_indices >= 0) & (segment_indices < self.num_segments)
-        segment_indices = segment_indices[valid_mask]
-        speeds = speeds[valid_mask]
-
-        if len(segment_indices) == 0:
-            self._reset_state()
-            return
-
-        # 3. AGRÉGATION (NumPy Magic)
-        # np.bincount compte le nombre d'occurrences de chaque index -> Occupancy
-        counts = np.bincount(segment_indices, minlength=self.num_segments)
+    def update_from_arrays(self, positions: NDArray[np.float64], speeds: NDArray[np.float64],
+                           lanes: Optional[NDArray[np.int64]] = None) -> None:
+        """
+        Scan de la route et mise à jour des métriques.
+        Cette méthode doit être ultra-rapide (appelée à chaque tick physique).
+        `lanes` (voie de chaque véhicule) est ignoré sur une route à voie unique.
+        """
+        snap = self._back
+        snap.lane_occupancy.fill(0)
+        snap.lane_mean_speeds.fill(0.0)
+        multi_lane = self.lanes > 1 and lanes is not None
+        n = len(positions)
+
+        if n:
+            # Filtrage des hors-limites (Sécurité) : rare, seul ce cas alloue
+            if positions.min() < self._road_start or positions.max() >= self._road_end:
+                valid_mask = (positions >= self._road_start) & (positions < self._road_end)
+                positions = positions[valid_mask]
+                speeds = speeds[valid_mask]
+                if multi_lane:
+                    lanes = lanes[valid_mask]
+                n = len(positions)
+
+        if n:
+            if n > len(self._scratch_f):
+                size = max(n, 2 * len(self._scratch_f))
+                self._scratch_f = np.empty(size, dtype=np.float64)
+                self._scratch_i = np.empty(size, dtype=np.int64)
+
+            # 1. DISCRÉTISATION SPATIALE (Binning) : idx = floor(x / segment_len)
+            idx = self._scratch_i[:n]
+            np.floor_divide(positions, self.segment_len, out=self._scratch_f[:n])
+            np.copyto(idx, self._scratch_f[:n], casting='unsafe')
+            if self.first_segment:
+                idx -= self.first_segment
+            if multi_lane:
+                # Case aplatie (voie, segment) = voie * S + segment
+                idx += lanes * self.num_segments
+
+            # 2. AGRÉGATION EN PLACE : occupation et somme des vitesses
+            np.add.at(snap.lane_occupancy.reshape(-1), idx, 1)
+            np.add.at(snap.lane_mean_speeds.reshape(-1), idx, speeds)
+
+        if self.lanes > 1:
+            # Totaux de la chaussée avant normalisation par voie
+            np.sum(snap.lane_occupancy, axis=0, out=snap.occupancy)
+            np.sum(snap.lane_mean_speeds, axis=0, out=snap.mean_speeds)
+            np.greater(snap.occupancy, 0, out=self._road_has_vehicles)
+            np.logical_not(self._road_has_vehicles, out=self._road_empty_segments)
+            np.divide(snap.mean_speeds, snap.occupancy, out=snap.mean_speeds, where=self._road_has_vehicles)
+            np.copyto(snap.mean_speeds, C.vehicle.max_speed_ms, where=self._road_empty_segments)
+            np.divide(snap.occupancy, self._segment_km, out=snap.densities)
+
+        # 3. CALCUL DES MOYENNES (Gestion division par zéro)
+        # Là où count > 0 : Mean = Sum / Count ; sinon V_free (Vitesse limite)
+        np.greater(snap.lane_occupancy, 0, out=self._has_vehicles)
+        np.logical_not(self._has_vehicles, out=self._empty_segments)
+        np.divide(snap.lane_mean_speeds, snap.lane_occupancy, out=snap.lane_mean_speeds, where=self._has_vehicles)
+        np.copyto(snap.lane_mean_speeds, C.vehicle.max_speed_ms, where=self._empty_segments)
 
         # Calcul des densités : (N / L_km)
-        # segment_len est en mètres, on divise par 1000 pour avoir des km
-        densities = counts / (self.segment_len / 1000.0)
-
-        # Somme des vitesses par segment (Weighted bincount)
-        speed_sums = np.bincount(segment_indices, weights=speeds, minlength=self.num_segments)
-
-        # 4. CALCUL DES MOYENNES (Gestion division par zéro)
-        # Là où count > 0 : Mean = Sum / Count
-        # Là où count == 0 : Mean = V_free (Vitesse limite)
-        
-        with np.errstate(divide='ignore', invalid='ignore'):
-            calculated_means = speed_sums / counts
-            # On remplace les NaNs (0/0) par la vitesse libre
-            mean_speeds = np.where(counts > 0, calculated_means, C.vehicle.max_speed_ms)
-
-        # 5. PUBLICATION DU SNAPSHOT
-        self._snapshot = SensorSnapshot(
-            densities=densities,
-            mean_speeds=mean_speeds,
-            occupancy=counts
-        )
+        np.divide(snap.lane_occupancy, self._segment_km, out=snap.lane_densities)
+        snap.mean_density = n / (self._segment_km * self.num_segments)
+
+        # 4. PUBLICATION (échange atomique des références)
+        self._tick += 1
+        snap.tick = self._tick
+        self._front, self._back = snap, self._front
 
     def _reset_state(self):
         """Remet les capteurs à zéro (route vide)."""
-        self._snapshot = SensorSnapshot(
-            densities=np.zeros(self.num_segments),
-            mean_speeds=np.full(self.num_segments, C.vehicle.max_speed_ms),
-            occupancy=np.zeros(self.num_segments, dtype=np.int64)
-        )
+        self.update_from_arrays(self._scratch_f[:0], self._scratch_f[:0])
 
     @property
     def snapshot(self) -> SensorSnapshot:
         """Accès en lecture seule à l'état courant."""
-        return self._snapshot
\ No newline at end of file
+        return self._front
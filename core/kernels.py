@@ -0,0 +1,467 @@
+"""
+WAVEBREAKER COMPUTE KERNELS
+---------------------------
+Registre des noyaux de calcul (IDM + émissions) utilisés par le moteur.
+
+Backends fournis :
+- "python" : référence pure Python (boucle sur les formules scalaires de
+             `Vehicle`), lente mais lisible. Sert d'étalon.
+- "numpy"  : noyau vectoriel par lots (défaut portable).
+- "numba"  : boucles compilées JIT, enregistré uniquement si `numba` est
+             installé. Sinon, repli silencieux (warning) sur "numpy".
+- "auto"   : le plus rapide disponible (numba > numpy).
+
+Chaque backend fournit aussi `multirate_step` (macro-pas de l'intégrateur
+multirate) : version générique construite sur ses deux noyaux, ou boucle
+unique compilée pour "numba".
+
+Sélection : `C.sim.kernel_backend`, ou `--backend` en ligne de commande
+(main.py / batch_run.py). Vérification de cohérence de tous les backends
+contre la référence : `python -m core.kernels --check`.
+"""
+
+import math
+import logging
+import numpy as np
+from typing import Callable, Dict, List, NamedTuple, Optional
+from numpy.typing import NDArray
+
+from config import C
+
+logger = logging.getLogger("WaveBreaker.Kernels")
+
+
+class KernelBackend(NamedTuple):
+    name: str
+    # (x, v, target_speed, params_T, params_a, params_b, lead_x, lead_v, has_leader) -> acc
+    idm_acceleration: Callable[..., NDArray[np.float64]]
+    # (v, acc, dt, factor) -> co2 instantané (kg) par véhicule
+    emissions: Callable[..., NDArray[np.float64]]
+    # (x, v, target_speed, params_T, params_a, params_b, leader, macro_dt, n_sub, factor, cutoff,
+    #  quiet_accel, quiet_dv) -> (acc, distance, co2, n_actifs) ; x et v avancés en place (intégrateur multirate)
+    multirate_step: Callable[..., tuple]
+
+
+_BACKENDS: Dict[str, KernelBackend] = {}
+_default_name: str = C.sim.kernel_backend
+
+
+def register_backend(backend: KernelBackend) -> None:
+    _BACKENDS[backend.name] = backend
+
+
+def available_backends() -> List[str]:
+    return list(_BACKENDS)
+
+
+def set_default_backend(name: str) -> None:
+    """Fixe le backend utilisé par les routes créées ensuite (CLI, workers batch)."""
+    global _default_name
+    get_backend(name)  # Validation immédiate du nom
+    _default_name = name
+
+
+def get_backend(name: Optional[str] = None) -> KernelBackend:
+    name = name or _default_name
+    if name == "auto":
+        return _BACKENDS.get("numba", _BACKENDS["numpy"])
+    if name in _BACKENDS:
+        return _BACKENDS[name]
+    if name == "numba":
+        logger.warning("Backend 'numba' indisponible (module non installé) : repli sur 'numpy'.")
+        return _BACKENDS["numpy"]
+    raise ValueError(f"Backend inconnu '{name}' (disponibles : {', '.join(_BACKENDS)}, auto)")
+
+
+# ======================================================================
+# RÉFÉRENCE SCALAIRE (partagée avec core.vehicle.Vehicle)
+# ======================================================================
+def idm_scalar(v: float, target_speed: float, params_T: float, params_a: float, params_b: float,
+               has_leader: bool, d_net: float, dv: float) -> float:
+    v_ratio = v / target_speed if target_speed > 0.1 else 1000.0
+    acc_free = params_a * (1.0 - math.pow(v_ratio, C.physics.accel_exponent))
+
+    acc_interaction = 0.0
+    if has_leader:
+        s_star = (C.physics.min_spacing +
+                  (v * params_T) +
+                  ((v * dv) / (2.0 * math.sqrt(params_a * params_b))))
+        d_safe = max(d_net, 0.1)
+        acc_interaction = -params_a * math.pow(s_star / d_safe, 2)
+
+    return acc_free + acc_interaction
+
+
+def co2_scalar(v: float, acc: float, dt: float, factor: float) -> float:
+    power_demand = max(0.0, acc * v)
+
+    # On applique le boost spécifiquement sur le terme lié à l'accélération
+    accel_cost = C.physics.co2_accel_factor * power_demand * C.physics.accel_boost_factor
+
+    base_rate = C.physics.co2_idle_emission
+    base_rate += C.physics.co2_speed_factor * v
+    base_rate += accel_cost
+
+    final_rate = base_rate * factor
+    co2_step = max(0.0, final_rate * dt)
+    return co2_step / 1000.0
+
+
+def _python_idm(x, v, target_speed, params_T, params_a, params_b, lead_x, lead_v, has_leader):
+    out = np.empty(len(x))
+    length = C.vehicle.length
+    for i in range(len(x)):
+        out[i] = idm_scalar(float(v[i]), float(target_speed[i]),
+                            float(params_T[i]), float(params_a[i]), float(params_b[i]),
+                            bool(has_leader[i]),
+                            float(lead_x[i] - x[i] - length), float(v[i] - lead_v[i]))
+    return out
+
+
+def _python_emissions(v, acc, dt, factor):
+    out = np.empty(len(v))
+    for i in range(len(v)):
+        out[i] = co2_scalar(float(v[i]), float(acc[i]), dt, factor)
+    return out
+
+
+def make_generic_multirate(idm_acceleration, emissions):
+    """
+    Macro-pas multirate construit sur `idm_acceleration` et `emissions`.
+    `leader[i]` : ligne du leader de i dans sa voie (-1 si aucun), pris en
+    compte s'il est à moins de `cutoff`.
+
+    1. Classification sur l'état initial : un véhicule est "à l'équilibre" si
+       |acc| < quiet_accel, |v - v_leader| < quiet_dv, et si son leader (et le
+       leader de celui-ci) le sont aussi.
+    2. Les autres font `n_sub` sous-pas Jacobi de macro_dt / n_sub ; un leader
+       à l'équilibre y suit sa trajectoire balistique.
+    3. Les véhicules à l'équilibre avancent en un pas, accélération initiale.
+    """
+    def multirate_step(x, v, target_speed, params_T, params_a, params_b, leader,
+                       macro_dt, n_sub, factor, cutoff, quiet_accel, quiet_dv):
+        n = len(x)
+        dt = macro_dt / n_sub
+        lead_x = np.full(n, np.inf)
+        lead_v = np.zeros(n)
+        with_leader = leader >= 0
+        lead_x[with_leader] = x[leader[with_leader]]
+        lead_v[with_leader] = v[leader[with_leader]]
+        has_leader = (lead_x - x) < cutoff
+        acc0 = idm_acceleration(x, v, target_speed, params_T, params_a, params_b, lead_x, lead_v, has_leader)
+
+        calm = (np.abs(acc0) < quiet_accel) & (~has_leader | (np.abs(v - lead_v) < quiet_dv))
+        quiet = calm
+        for _ in range(2):
+            lead_quiet = np.ones(n, dtype=bool)
+            lead_quiet[with_leader] = quiet[leader[with_leader]]
+            quiet = calm & (~has_leader | lead_quiet)
+
+        acc = acc0.copy()
+        distance = np.empty(n)
+        co2 = np.empty(n)
+        active = np.flatnonzero(~quiet)
+        m = len(active)
+        if m:
+            xa, va = x[active], v[active]
+            leader_row = leader[active]
+            # Leader actif (position dans `active`) ou à l'équilibre (trajectoire balistique)
+            slot = np.full(n + 1, -1, dtype=np.int64)
+            slot[active] = np.arange(m)
+            leader_slot = slot[leader_row]
+            follows_active = leader_slot >= 0
+            follows_quiet = (leader_row >= 0) & ~follows_active
+            src = leader_slot[follows_active]
+            q_rows = leader_row[follows_quiet]
+            tk = (np.arange(n_sub) * dt)[:, None]
+            lead_x_all = np.full((n_sub, m), np.inf)
+            lead_v_all = np.zeros((n_sub, m))
+            lead_x_all[:, follows_quiet] = x[q_rows] + v[q_rows] * tk + 0.5 * acc0[q_rows] * tk * tk
+            lead_v_all[:, follows_quiet] = v[q_rows] + acc0[q_rows] * tk
+
+            dist_a = np.zeros(m)
+            co2_a = np.zeros(m)
+            for k in range(n_sub):
+                lx, lv = lead_x_all[k], lead_v_all[k]
+                lx[follows_active] = xa[src]
+                lv[follows_active] = va[src]
+                acc_a = idm_acceleration(xa, va, target_speed[active], params_T[active], params_a[active],
+                                         params_b[active], lx, lv, (lx - xa) < cutoff)
+                va = va + acc_a * dt
+                stopped = va < 0
+                va[stopped] = 0.0
+                acc_a[stopped] = 0.0
+                step = va * dt + 0.5 * acc_a * dt * dt
+                xa = xa + step
+                dist_a += step
+                co2_a += emissions(va, acc_a, dt, factor)
+            x[active] = xa
+            v[active] = va
+            acc[active] = acc_a
+            distance[active] = dist_a
+            co2[active] = co2_a
+
+        if m < n:
+            a_q = acc0[quiet]
+            v_q = np.maximum(v[quiet] + a_q * macro_dt, 0.0)
+            step_q = v_q * macro_dt + 0.5 * a_q * macro_dt * macro_dt
+            x[quiet] += step_q
+            v[quiet] = v_q
+            distance[quiet] = step_q
+            co2[quiet] = emissions(v_q, a_q, macro_dt, factor)
+        return acc, distance, co2, m
+
+    return multirate_step
+
+
+register_backend(KernelBackend("python", _python_idm, _python_emissions,
+                               make_generic_multirate(_python_idm, _python_emissions)))
+
+
+# ======================================================================
+# NUMPY (lots vectoriels)
+# ======================================================================
+def _numpy_idm(x, v, target_speed, params_T, params_a, params_b, lead_x, lead_v, has_leader):
+    safe_target = np.where(target_speed > 0.1, target_speed, 1.0)
+    v_ratio = np.where(target_speed > 0.1, v / safe_target, 1000.0)
+    acc = params_a * (1.0 - v_ratio ** C.physics.accel_exponent)
+
+    d_net = lead_x - x - C.vehicle.length
+    dv = v - lead_v
+    s_star = (C.physics.min_spacing
+              + v * params_T
+              + (v * dv) / (2.0 * np.sqrt(params_a * params_b)))
+    d_safe = np.maximum(d_net, 0.1)
+    acc_interaction = -params_a * (s_star / d_safe) ** 2
+    return acc + np.where(has_leader, acc_interaction, 0.0)
+
+
+def _numpy_emissions(v, acc, dt, factor):
+    power_demand = np.maximum(0.0, acc * v)
+    accel_cost = C.physics.co2_accel_factor * power_demand * C.physics.accel_boost_factor
+    base_rate = C.physics.co2_idle_emission + C.physics.co2_speed_factor * v + accel_cost
+    co2_step = np.maximum(0.0, base_rate * factor * dt)
+    return co2_step / 1000.0
+
+
+register_backend(KernelBackend("numpy", _numpy_idm, _numpy_emissions,
+                               make_generic_multirate(_numpy_idm, _numpy_emissions)))
+
+
+# ======================================================================
+# NUMBA (optionnel)
+# ======================================================================
+try:
+    import numba
+except ImportError:
+    numba = None
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _jit_idm_loop(x, v, target_speed, params_T, params_a, params_b, lead_x, lead_v, has_leader,
+                      delta, s0, length):
+        out = np.empty(x.shape[0])
+        for i in range(x.shape[0]):
+            v_ratio = v[i] / target_speed[i] if target_speed[i] > 0.1 else 1000.0
+            acc = params_a[i] * (1.0 - v_ratio ** delta)
+            if has_leader[i]:
+                s_star = (s0 + v[i] * params_T[i]
+                          + (v[i] * (v[i] - lead_v[i])) / (2.0 * math.sqrt(params_a[i] * params_b[i])))
+                d_safe = max(lead_x[i] - x[i] - length, 0.1)
+                acc -= params_a[i] * (s_star / d_safe) ** 2
+            out[i] = acc
+        return out
+
+    @numba.njit(cache=True)
+    def _jit_emissions_loop(v, acc, dt, factor, idle, speed_factor, accel_factor):
+        out = np.empty(v.shape[0])
+        for i in range(v.shape[0]):
+            rate = idle + speed_factor * v[i] + accel_factor * max(0.0, acc[i] * v[i])
+            out[i] = max(0.0, rate * factor * dt) / 1000.0
+        return out
+
+    @numba.njit(cache=True, inline='always')
+    def _jit_idm_one(v, target_speed, params_T, params_a, params_b, has_leader, d_net, dv, delta, s0):
+        v_ratio = v / target_speed if target_speed > 0.1 else 1000.0
+        acc = params_a * (1.0 - v_ratio ** delta)
+        if has_leader:
+            s_star = s0 + v * params_T + (v * dv) / (2.0 * math.sqrt(params_a * params_b))
+            d_safe = max(d_net, 0.1)
+            acc -= params_a * (s_star / d_safe) ** 2
+        return acc
+
+    @numba.njit(cache=True)
+    def _jit_multirate(x, v, target_speed, params_T, params_a, params_b, leader, macro_dt, n_sub, factor, cutoff,
+                       quiet_accel, quiet_dv, delta, s0, length, idle, speed_factor, accel_factor):
+        n = x.shape[0]
+        dt = macro_dt / n_sub
+        acc = np.empty(n)
+        distance = np.zeros(n)
+        co2 = np.zeros(n)
+
+        # 1. Classification (état initial)
+        has_leader = np.zeros(n, dtype=np.bool_)
+        calm = np.empty(n, dtype=np.bool_)
+        for i in range(n):
+            dv = 0.0
+            d_net = 0.0
+            j = leader[i]
+            if j >= 0 and x[j] - x[i] < cutoff:
+                has_leader[i] = True
+                dv = v[i] - v[j]
+                d_net = x[j] - x[i] - length
+            acc[i] = _jit_idm_one(v[i], target_speed[i], params_T[i], params_a[i], params_b[i],
+                                  has_leader[i], d_net, dv, delta, s0)
+            calm[i] = abs(acc[i]) < quiet_accel and abs(dv) < quiet_dv
+        quiet = calm.copy()
+        for _ in range(2):
+            prev = quiet.copy()
+            for i in range(n):
+                if has_leader[i] and not prev[leader[i]]:
+                    quiet[i] = False
+        active = np.flatnonzero(~quiet)
+        m = active.shape[0]
+
+        # 2. Sous-pas Jacobi des véhicules actifs
+        if m > 0:
+            slot = np.full(n, -1, dtype=np.int64)
+            for s in range(m):
+                slot[active[s]] = s
+            xa = np.empty(m)
+            va = np.empty(m)
+            for s in range(m):
+                xa[s] = x[active[s]]
+                va[s] = v[active[s]]
+            lead_x = np.empty(m)
+            lead_v = np.empty(m)
+            acc_a = np.empty(m)
+            for k in range(n_sub):
+                tk = k * dt
+                for s in range(m):
+                    r = leader[active[s]]
+                    if r < 0:
+                        lead_x[s] = np.inf
+                        lead_v[s] = 0.0
+                    elif slot[r] >= 0:
+                        lead_x[s] = xa[slot[r]]
+                        lead_v[s] = va[slot[r]]
+                    else:
+                        lead_x[s] = x[r] + v[r] * tk + 0.5 * acc[r] * tk * tk
+                        lead_v[s] = v[r] + acc[r] * tk
+                for s in range(m):
+                    i = active[s]
+                    a_s = _jit_idm_one(va[s], target_speed[i], params_T[i], params_a[i], params_b[i],
+                                       lead_x[s] - xa[s] < cutoff, lead_x[s] - xa[s] - length,
+                                       va[s] - lead_v[s], delta, s0)
+                    v_s = va[s] + a_s * dt
+                    if v_s < 0:
+                        v_s = 0.0
+                        a_s = 0.0
+                    step = v_s * dt + 0.5 * a_s * dt * dt
+                    va[s] = v_s
+                    xa[s] += step
+                    acc_a[s] = a_s
+                    distance[i] += step
+                    rate = idle + speed_factor * v_s + accel_factor * max(0.0, a_s * v_s)
+                    co2[i] += max(0.0, rate * factor * dt) / 1000.0
+
+        # 3. Forme close pour les véhicules à l'équilibre (après les sous-pas :
+        #    les leaders balistiques ont été lus dans leur état initial)
+        for i in range(n):
+            if quiet[i]:
+                a_i = acc[i]
+                v_i = max(v[i] + a_i * macro_dt, 0.0)
+                step = v_i * macro_dt + 0.5 * a_i * macro_dt * macro_dt
+                x[i] += step
+                v[i] = v_i
+                distance[i] = step
+                rate = idle + speed_factor * v_i + accel_factor * max(0.0, a_i * v_i)
+                co2[i] = max(0.0, rate * factor * macro_dt) / 1000.0
+        if m > 0:
+            for s in range(m):
+                i = active[s]
+                x[i] = xa[s]
+                v[i] = va[s]
+                acc[i] = acc_a[s]
+        return acc, distance, co2, m
+
+    def _numba_idm(x, v, target_speed, params_T, params_a, params_b, lead_x, lead_v, has_leader):
+        return _jit_idm_loop(x, v, target_speed, params_T, params_a, params_b, lead_x, lead_v, has_leader,
+                             C.physics.accel_exponent, C.physics.min_spacing, C.vehicle.length)
+
+    def _numba_emissions(v, acc, dt, factor):
+        return _jit_emissions_loop(v, acc, dt, factor,
+                                   C.physics.co2_idle_emission, C.physics.co2_speed_factor,
+                                   C.physics.co2_accel_factor * C.physics.accel_boost_factor)
+
+    def _numba_multirate(x, v, target_speed, params_T, params_a, params_b, leader,
+                         macro_dt, n_sub, factor, cutoff, quiet_accel, quiet_dv):
+        return _jit_multirate(x, v, target_speed, params_T, params_a, params_b, leader,
+                              macro_dt, n_sub, factor, cutoff, quiet_accel, quiet_dv,
+                              C.physics.accel_exponent, C.physics.min_spacing, C.vehicle.length,
+                              C.physics.co2_idle_emission, C.physics.co2_speed_factor,
+                              C.physics.co2_accel_factor * C.physics.accel_boost_factor)
+
+    register_backend(KernelBackend("numba", _numba_idm, _numba_emissions, _numba_multirate))
+
+
+# ======================================================================
+# VÉRIFICATION DE COHÉRENCE
+# ======================================================================
+def check_consistency(seed: int = 7, duration: float = 1500.0, rtol: float = 1e-9,
+                      integrator: str = "fixed") -> Dict[str, float]:
+    """
+    Rejoue le même scénario jumeau (seed fixe, accident inclus) avec chaque
+    backend et compare l'état final à la référence "python".
+    `integrator="multirate"` vérifie aussi les noyaux `multirate_step`.
+    Retourne l'écart relatif max par backend ; lève AssertionError au-delà de `rtol`.
+    """
+    from core.controller import WaveBreakerBrain
+    from simulation.road import Road
+    from simulation.generator import TrafficGenerator
+
+    def run(backend_name: str):
+        road_chaos = Road("Check_Chaos", backend=backend_name, integrator=integrator)
+        road_wb = Road("Check_WB", backend=backend_name, integrator=integrator)
+        brain = WaveBreakerBrain(active_scenario=True)
+        generator = TrafficGenerator(road_chaos, road_wb, brain, seed=seed)
+        generator.set_penetration_rate(0.2)
+        dt = road_chaos.step_dt
+        while road_chaos.time < duration:
+            generator.update(dt)
+            road_chaos.update(dt)
+            road_wb.update(dt)
+            brain.process(road_wb.sensors.snapshot, road_wb.fleet, road_wb.time)
+        return np.concatenate([
+            road.fleet.col(name)
+            for road in (road_chaos, road_wb)
+            for name in ('x', 'v', 'co2_total', 'fuel_total')
+        ])
+
+    reference = run("python")
+    errors = {}
+    for name in available_backends():
+        state = run(name)
+        if state.shape != reference.shape:
+            raise AssertionError(f"Backend '{name}' : nombre de véhicules différent de la référence")
+        scale = np.maximum(np.abs(reference), 1.0)
+        errors[name] = float(np.max(np.abs(state - reference) / scale)) if len(state) else 0.0
+        if errors[name] > rtol:
+            raise AssertionError(f"Backend '{name}' diverge de la référence (écart relatif {errors[name]:.2e})")
+    return errors
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Noyaux de calcul WaveBreaker")
+    parser.add_argument("--check", action="store_true", help="Compare tous les backends à la référence")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format='[%(name)s] %(levelname)s: %(message)s')
+    print(f"Backends disponibles : {', '.join(available_backends())} (auto -> {get_backend('auto').name})")
+    if args.check:
+        for integrator in ("fixed", "multirate"):
+            print(f"Intégrateur {integrator} :")
+            for backend_name, err in check_consistency(integrator=integrator).items():
+                print(f"  {backend_name:<8} OK (écart relatif max {err:.2e})")
@@ -0,0 +1,248 @@
+"""
+WAVEBREAKER PHASE PROFILER
+--------------------------
+Chronométrage par phase de la boucle de simulation et compteurs associés :
+- phases : Generator, Road (ordre, voies, dynamique, archivage, capteurs),
+  Brain (loi de commande, diffusion), enregistreur, télémétrie, rendu ;
+- compteurs : pas véhicule (`vehicle_steps`, en pas `C.sim.dt`
+  équivalents : comparables d'un intégrateur à l'autre), consignes
+  diffusées, véhicules archivés.
+
+Désactivé par défaut (`active` vaut None) : un point de mesure se réduit à
+un test `if prof is not None` sur une variable locale, sans appel. Activé
+(`enable()`), une mesure coûte deux lectures d'horloge et un ajout à un
+tampon ; les tampons sont versés par lots dans un histogramme à pas
+logarithmique (log10 de la durée en µs, de 0,1 µs à 10 s).
+
+Fusion (`merge`) : les workers de batch_run renvoient leur profil avec
+chaque tâche, le processus parent les additionne. Export : `report()`
+(table texte : appels, total, part, moyenne, p50/p99/max, débit en pas
+véhicule par seconde), `to_dict()` / `save()` (JSON, histogrammes
+compris), journal périodique
+(`report_every`, voir `tick`).
+
+Dans le code chaud :
+    prof = profiler.active
+    if prof is not None:
+        t = prof.clock()
+    ...
+    if prof is not None:
+        t = prof.lap("road.dynamics", t)
+"""
+
+import json
+import math
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from core.stats import FixedBinHistogram
+
+logger = logging.getLogger("WaveBreaker.Profiler")
+
+# Découpage de l'histogramme : log10(µs) dans [-1, 7), classes de 0,05 décade
+LOG_LOW, LOG_HIGH, LOG_BIN = -1.0, 7.0, 0.05
+# Mesures tamponnées avant versement dans l'histogramme
+_FLUSH = 4096
+# Préfixes des phases qui avancent les véhicules (dénominateur du débit physique)
+PHYSICS_PHASES = ("road.", "ensemble.roads")
+
+# Profileur du processus courant (None : instrumentation désactivée)
+active: Optional['PhaseProfiler'] = None
+
+
+class PhaseStats:
+    """Durées d'une phase : nombre, total et max exacts, histogramme log pour les percentiles."""
+    __slots__ = ('count', 'total_ns', 'max_ns', 'histogram', '_pending')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.histogram = FixedBinHistogram(LOG_LOW, LOG_HIGH, LOG_BIN)
+        self._pending: List[int] = []
+
+    def push(self, ns: int) -> None:
+        self._pending.append(ns)
+        if len(self._pending) >= _FLUSH:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        values = np.asarray(self._pending, dtype=np.int64)
+        self._pending.clear()
+        self.count += len(values)
+        self.total_ns += int(values.sum())
+        self.max_ns = max(self.max_ns, int(values.max()))
+        self.histogram.push_many(np.log10(np.maximum(values, 1) / 1e3))
+
+    def merge(self, other: 'PhaseStats') -> None:
+        self.flush()
+        other.flush()
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+        self.histogram.merge(other.histogram)
+
+    def percentile_us(self, p: float) -> float:
+        """Percentile (0-100) de la durée en µs, borné par le max exact."""
+        self.flush()
+        if self.count == 0:
+            return 0.0
+        return min(self.max_ns / 1e3, 10.0 ** self.histogram.quantile(p / 100.0))
+
+    def __getstate__(self):
+        self.flush()
+        return (self.count, self.total_ns, self.max_ns, self.histogram)
+
+    def __setstate__(self, state):
+        self.count, self.total_ns, self.max_ns, self.histogram = state
+        self._pending = []
+
+
+class PhaseProfiler:
+    """
+    Chronomètres par phase nommée et compteurs, fusionnables entre processus.
+    `running` : le temps mural de ce processus est compté (profileur actif) ;
+    sinon le profileur est figé (copie, ou agrégat des workers d'un pool).
+    """
+
+    clock = staticmethod(time.perf_counter_ns)
+
+    def __init__(self, report_every: Optional[float] = None, running: bool = False):
+        self.phases: Dict[str, PhaseStats] = {}
+        self.counters: Dict[str, int] = {}
+        # Temps mural couvert (somme des processus après fusion)
+        self.wall_ns = 0
+        self._started: Optional[int] = time.perf_counter_ns() if running else None
+        self.report_every = report_every
+        self._next_report = time.monotonic() + report_every if report_every else math.inf
+
+    def _stats(self, name: str) -> PhaseStats:
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = PhaseStats()
+        return stats
+
+    def lap(self, name: str, start_ns: int) -> int:
+        """Impute à `name` le temps écoulé depuis `start_ns` ; retourne l'instant courant (phase suivante)."""
+        now = time.perf_counter_ns()
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self._stats(name)
+        stats.push(now - start_ns)
+        return now
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def tick(self) -> None:
+        """Fin d'un pas de boucle : journalise le rapport si `report_every` est écoulé."""
+        if time.monotonic() >= self._next_report:
+            self._next_report = time.monotonic() + self.report_every
+            logger.info("Profil intermédiaire :\n" + self.report())
+
+    # --- Agrégation et export ---
+
+    @property
+    def elapsed_ns(self) -> int:
+        """Temps mural couvert : fusionné, plus l'écoulé depuis le dernier `reset` si actif."""
+        if self._started is None:
+            return self.wall_ns
+        return self.wall_ns + time.perf_counter_ns() - self._started
+
+    def snapshot(self) -> 'PhaseProfiler':
+        """Copie figée des mesures depuis le dernier `reset` (à envoyer au parent), puis remise à zéro."""
+        part = PhaseProfiler(self.report_every)
+        part.phases, part.counters, part.wall_ns = self.phases, self.counters, self.elapsed_ns
+        for stats in part.phases.values():
+            stats.flush()
+        self.reset()
+        return part
+
+    def reset(self) -> None:
+        self.phases, self.counters = {}, {}
+        self.wall_ns = 0
+        if self._started is not None:
+            self._started = time.perf_counter_ns()
+
+    def merge(self, other: 'PhaseProfiler') -> None:
+        """Ajoute les mesures d'un autre profileur (temps mural compris)."""
+        for name, stats in other.phases.items():
+            self._stats(name).merge(stats)
+        for name, n in other.counters.items():
+            self.count(name, n)
+        self.wall_ns += other.wall_ns
+
+    def __getstate__(self):
+        # Copie figée : le temps écoulé est arrêté à l'instant du pickle
+        return {"phases": self.phases, "counters": self.counters, "wall_ns": self.elapsed_ns,
+                "report_every": self.report_every}
+
+    def __setstate__(self, state):
+        self.__init__(state["report_every"])
+        self.phases, self.counters, self.wall_ns = state["phases"], state["counters"], state["wall_ns"]
+
+    def vehicle_steps_per_second(self) -> float:
+        """Pas véhicule par seconde passée dans les phases physiques (PHYSICS_PHASES)."""
+        busy = sum(s.total_ns for name, s in self.phases.items() if name.startswith(PHYSICS_PHASES))
+        return self.counters.get("vehicle_steps", 0) / (busy / 1e9) if busy else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        phases = {}
+        for name, stats in sorted(self.phases.items()):
+            stats.flush()
+            phases[name] = {
+                "count": stats.count, "total_s": stats.total_ns / 1e9,
+                "mean_us": stats.total_ns / stats.count / 1e3 if stats.count else 0.0,
+                "p50_us": stats.percentile_us(50), "p99_us": stats.percentile_us(99),
+                "max_us": stats.max_ns / 1e3,
+                "histogram": {"low": LOG_LOW, "bin_width": LOG_BIN,
+                              "bins": np.flatnonzero(stats.histogram.counts).tolist(),
+                              "counts": stats.histogram.counts[stats.histogram.counts > 0].tolist()},
+            }
+        wall_s = self.elapsed_ns / 1e9
+        steps = self.counters.get("vehicle_steps", 0)
+        return {
+            "wall_s": wall_s, "phases": phases, "counters": dict(self.counters),
+            "vehicle_steps_per_s": self.vehicle_steps_per_second(),
+            "vehicle_steps_per_wall_s": steps / wall_s if wall_s > 0 else 0.0,
+        }
+
+    def report(self) -> str:
+        """Table texte, phases triées par temps total décroissant."""
+        data = self.to_dict()
+        wall = data["wall_s"]
+        lines = [f"{'phase':<18} {'appels':>9} {'total s':>9} {'part':>6} {'moy µs':>9} "
+                 f"{'p50 µs':>9} {'p99 µs':>9} {'max µs':>10}"]
+        for name, p in sorted(data["phases"].items(), key=lambda item: -item[1]["total_s"]):
+            share = p["total_s"] / wall * 100.0 if wall > 0 else 0.0
+            lines.append(f"{name:<18} {p['count']:>9} {p['total_s']:>9.3f} {share:>5.1f}% {p['mean_us']:>9.1f} "
+                         f"{p['p50_us']:>9.1f} {p['p99_us']:>9.1f} {p['max_us']:>10.1f}")
+        counters = "  ".join(f"{name}={n}" for name, n in sorted(data["counters"].items()))
+        lines.append(f"compteurs : {counters or '-'}")
+        lines.append(f"temps mural {wall:.2f} s | {data['vehicle_steps_per_s'] / 1e6:.2f} M pas véhicule/s (physique), "
+                     f"{data['vehicle_steps_per_wall_s'] / 1e6:.2f} M/s (mural)")
+        return "\n".join(lines)
+
+    def save(self, path: str) -> None:
+        """Écrit `to_dict()` (histogrammes compris) en JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+
+def enable(report_every: Optional[float] = None) -> PhaseProfiler:
+    """Active l'instrumentation dans ce processus (remplace un profileur existant)."""
+    global active
+    active = PhaseProfiler(report_every, running=True)
+    return active
+
+
+def disable() -> Optional[PhaseProfiler]:
+    """Désactive l'instrumentation ; retourne le profileur qui était actif."""
+    global active
+    profiler, active = active, None
+    return profiler
@@ -0,0 +1,214 @@
+"""
+WAVEBREAKER STREAMING STATISTICS
+--------------------------------
+Statistiques en flux à mémoire bornée (O(1) quel que soit le nombre
+d'échantillons), fusionnables entre processus.
+
+- `RunningMoments`   : moyenne/variance de Welford (fusion de Chan).
+- `FixedBinHistogram`: histogramme à pas fixe + débordements, pour les
+                       percentiles et la distribution (rapport final).
+- `StreamingStats`   : les deux réunis + min/max. Objet picklable et
+                       compact : c'est lui qui voyage entre les workers
+                       de batch_run, pas les listes brutes. `to_dict` /
+                       `from_dict` : forme JSON (table de résultats d'un
+                       balayage, reprise après interruption).
+"""
+
+import math
+import numpy as np
+from typing import Any, Dict, Iterable, Optional
+from numpy.typing import NDArray
+
+
+class RunningMoments:
+    """Moyenne et variance en une passe (Welford), fusionnables (Chan et al.)."""
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def push_many(self, values: NDArray[np.float64]) -> None:
+        if len(values) == 0:
+            return
+        batch = RunningMoments()
+        batch.count = len(values)
+        batch.mean = float(np.mean(values))
+        batch.m2 = float(np.sum((values - batch.mean) ** 2))
+        self.merge(batch)
+
+    def merge(self, other: 'RunningMoments') -> None:
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class FixedBinHistogram:
+    """
+    Histogramme [low, high) à pas `bin_width`, plus compteurs de débordement.
+    Deux histogrammes ne fusionnent que s'ils partagent le même découpage.
+    """
+
+    def __init__(self, low: float, high: float, bin_width: float):
+        self.low = low
+        self.high = high
+        self.bin_width = bin_width
+        self.counts = np.zeros(int(math.ceil((high - low) / bin_width)), dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    @property
+    def edges(self) -> NDArray[np.float64]:
+        return self.low + self.bin_width * np.arange(len(self.counts) + 1)
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum()) + self.underflow + self.overflow
+
+    def push(self, value: float) -> None:
+        if value < self.low:
+            self.underflow += 1
+        elif value >= self.high:
+            self.overflow += 1
+        else:
+            self.counts[int((value - self.low) / self.bin_width)] += 1
+
+    def push_many(self, values: NDArray[np.float64]) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        below = values < self.low
+        above = values >= self.high
+        self.underflow += int(below.sum())
+        self.overflow += int(above.sum())
+        inside = values[~(below | above)]
+        idx = ((inside - self.low) / self.bin_width).astype(np.int64)
+        self.counts += np.bincount(idx, minlength=len(self.counts))
+
+    def merge(self, other: 'FixedBinHistogram') -> None:
+        if (other.low, other.high, other.bin_width) != (self.low, self.high, self.bin_width):
+            raise ValueError("Histogrammes incompatibles (découpages différents)")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+
+    def quantile(self, q: float) -> float:
+        """Quantile approché (interpolation linéaire dans la classe), bornes incluses."""
+        total = self.total
+        if total == 0:
+            return 0.0
+        rank = q * total
+        if rank <= self.underflow:
+            return self.low
+        cumulative = self.underflow + np.cumsum(self.counts)
+        i = int(np.searchsorted(cumulative, rank))
+        if i >= len(self.counts):
+            return self.high
+        before = cumulative[i] - self.counts[i]
+        fraction = (rank - before) / self.counts[i] if self.counts[i] else 0.0
+        return self.low + (i + fraction) * self.bin_width
+
+
+class StreamingStats:
+    """Moments exacts + histogramme pour les percentiles, en mémoire constante."""
+
+    def __init__(self, low: float = 0.0, high: float = 7200.0, bin_width: float = 5.0):
+        self.moments = RunningMoments()
+        self.histogram = FixedBinHistogram(low, high, bin_width)
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def count(self) -> int:
+        return self.moments.count
+
+    @property
+    def mean(self) -> float:
+        return self.moments.mean
+
+    @property
+    def std(self) -> float:
+        return self.moments.std
+
+    def __len__(self) -> int:
+        return self.moments.count
+
+    def push(self, value: float) -> None:
+        self.moments.push(value)
+        self.histogram.push(value)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def push_many(self, values: NDArray[np.float64]) -> None:
+        if len(values) == 0:
+            return
+        self.moments.push_many(values)
+        self.histogram.push_many(values)
+        self.min = min(self.min, float(np.min(values)))
+        self.max = max(self.max, float(np.max(values)))
+
+    def merge(self, other: 'StreamingStats') -> None:
+        self.moments.merge(other.moments)
+        self.histogram.merge(other.histogram)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p: float) -> float:
+        """Percentile (0-100), borné par les min/max exacts observés."""
+        if self.count == 0:
+            return 0.0
+        return min(self.max, max(self.min, self.histogram.quantile(p / 100.0)))
+
+    @classmethod
+    def merged(cls, parts: Iterable['StreamingStats']) -> Optional['StreamingStats']:
+        result = None
+        for part in parts:
+            if result is None:
+                h = part.histogram
+                result = cls(h.low, h.high, h.bin_width)
+            result.merge(part)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """État complet sous forme JSON (histogramme creux : classes non vides seulement)."""
+        h = self.histogram
+        bins = np.flatnonzero(h.counts)
+        return {
+            "count": self.moments.count, "mean": self.moments.mean, "m2": self.moments.m2,
+            "min": self.min if self.count else None, "max": self.max if self.count else None,
+            "low": h.low, "high": h.high, "bin_width": h.bin_width,
+            "bins": bins.tolist(), "counts": h.counts[bins].tolist(),
+            "underflow": h.underflow, "overflow": h.overflow,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'StreamingStats':
+        stats = cls(state["low"], state["high"], state["bin_width"])
+        stats.moments.count = state["count"]
+        stats.moments.mean = state["mean"]
+        stats.moments.m2 = state["m2"]
+        if state["count"]:
+            stats.min = state["min"]
+            stats.max = state["max"]
+        h = stats.histogram
+        h.counts[np.asarray(state["bins"], dtype=np.int64)] = state["counts"]
+        h.underflow = state["underflow"]
+        h.overflow = state["overflow"]
+        return stats
@@ -5,9 +5,9 @@ Gère la physique et applique le facteur de consommation reçu.
 """
 
 import random
-import math
 from typing import Optional
 from config import C
+from core.kernels import idm_scalar, co2_scalar
 
 # Type hints
 Meters = float
@@ -16,6 +16,22 @@ Seconds = float
 Kilograms = float
 Liters = float
 
+def driver_params(desired_speed: MetersPerSecond, variability, time_headway: Optional[Seconds] = None):
+    """
+    Paramètres IDM d'un conducteur selon son facteur de variabilité
+    (1.0 = conduite nominale, véhicule connecté). Scalaires ou tableaux NumPy.
+    `time_headway` : temps inter-véhiculaire nominal (défaut C.physics.time_headway).
+    """
+    headway = time_headway if time_headway is not None else C.physics.time_headway
+    return {
+        'params_T': headway * variability,
+        'params_a': C.physics.max_accel * (1.0 / variability),
+        'params_b': C.physics.comfort_decel * variability,
+        'desired_speed': desired_speed * variability,
+        'target_speed': desired_speed * variability,
+    }
+
+
 class Vehicle:
     __slots__ = (
         'id', 'x', 'v', 'a', 'lane',
@@ -23,25 +39,31 @@ class Vehicle:
         'params_T', 'params_a', 'params_b',
         'co2_total', 'co2_instant',
         'fuel_total', 'fuel_instant',
-        'distance_traveled', 'entry_time'
+        'distance_traveled', 'entry_time',
+        'order_segment'
     )
 
-    def __init__(self, uid: int, x: Meters, v: MetersPerSecond, desired_speed: MetersPerSecond, is_connected: bool = False):
+    def __init__(self, uid: int, x: Meters, v: MetersPerSecond, desired_speed: MetersPerSecond, is_connected: bool = False,
+                 variability: Optional[float] = None):
         self.id = uid
         self.x = x
         self.v = v
         self.a = 0.0
         self.lane = 0
         
-        # Variabilité humaine
-        variability = random.uniform(0.90, 1.10) if not is_connected else 1.0
-        
-        self.params_T = C.physics.time_headway * variability
-        self.params_a = C.physics.max_accel * (1.0 / variability)
-        self.params_b = C.physics.comfort_decel * variability
+        # Variabilité humaine (tirée ici si l'appelant ne la fournit pas)
+        if is_connected:
+            variability = 1.0
+        elif variability is None:
+            variability = random.uniform(0.90, 1.10)
+
+        params = driver_params(desired_speed, variability)
+        self.params_T = params['params_T']
+        self.params_a = params['params_a']
+        self.params_b = params['params_b']
         
-        self.desired_speed = desired_speed * variability
-        self.target_speed = self.desired_speed 
+        self.desired_speed = params['desired_speed']
+        self.target_speed = params['target_speed']
         self.is_connected = is_connected
         
         self.co2_total: Kilograms = 0.0
@@ -51,26 +73,20 @@ class Vehicle:
         
         self.distance_traveled = 0.0
         self.entry_time = 0.0 
+        # Segment de la dernière consigne V2X reçue (-1 : aucune)
+        self.order_segment = -1
 
     def update_dynamics(self, dt: Seconds, leader: Optional['Vehicle'], emission_factor: float = 1.0) -> None:
         """
         Mise à jour physique + Calcul consommation avec Facteur.
         """
         # --- 1. IDM (Accélération) ---
-        v_ratio = self.v / self.target_speed if self.target_speed > 0.1 else 1000.0
-        acc_free = self.params_a * (1.0 - math.pow(v_ratio, C.physics.accel_exponent))
-
-        acc_interaction = 0.0
         if leader is not None:
-            d_net = leader.x - self.x - C.vehicle.length
-            dv = self.v - leader.v 
-            s_star = (C.physics.min_spacing + 
-                      (self.v * self.params_T) + 
-                      ((self.v * dv) / (2.0 * math.sqrt(self.params_a * self.params_b))))
-            d_safe = max(d_net, 0.1)
-            acc_interaction = -self.params_a * math.pow(s_star / d_safe, 2)
-
-        self.a = acc_free + acc_interaction
+            self.a = idm_scalar(self.v, self.target_speed, self.params_T, self.params_a, self.params_b,
+                                True, leader.x - self.x - C.vehicle.length, self.v - leader.v)
+        else:
+            self.a = idm_scalar(self.v, self.target_speed, self.params_T, self.params_a, self.params_b,
+                                False, 0.0, 0.0)
         
         # --- 2. Mouvement ---
         self.v += self.a * dt
@@ -89,20 +105,7 @@ class Vehicle:
         """
         Calcule la conso instantanée et applique le facteur multiplicatif (ex: 1.3).
         """
-        power_demand = max(0.0, self.a * self.v)
-        
-        # On applique le boost spécifiquement sur le terme lié à l'accélération
-        accel_cost = C.physics.co2_accel_factor * power_demand * C.physics.accel_boost_factor
-        
-        base_rate = C.physics.co2_idle_emission
-        base_rate += C.physics.co2_speed_factor * self.v
-        base_rate += accel_cost # L'accélération coûte maintenant "boost" fois plus cher
-        
-        final_rate = base_rate * factor
-        
-        co2_step = max(0.0, final_rate * dt)
-        
-        self.co2_instant = co2_step / 1000.0
+        self.co2_instant = co2_scalar(self.v, self.a, dt, factor)
         self.co2_total += self.co2_instant
 
         self.fuel_instant = self.co2_instant * C.physics.fuel_conversion_factor
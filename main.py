@@ -5,6 +5,7 @@ Point d'entrée corrigé avec gestion DPI Windows pour éviter le zoom flou.
 """
 
 import pygame
+import argparse
 import logging
 import sys
 import os
@@ -21,12 +22,11 @@ except Exception:
         pass
 
 from config import C
-from core.controller import WaveBreakerBrain
-from simulation.road import Road
-from simulation.generator import TrafficGenerator
+from core import kernels, profiler
+from simulation.road import INTEGRATORS
+from simulation.live import LiveConfig, LiveTwin
 from ui.renderer import TwinRenderer
 from ui.dashboard import Dashboard
-from analysis.metrics import TwinTrafficRecorder
 
 logging.basicConfig(level=logging.INFO, format='[%(name)s] %(levelname)s: %(message)s')
 logger = logging.getLogger("Main")
@@ -53,24 +53,46 @@ def get_user_input() -> float:
         except ValueError:
             print("Erreur : Entrée invalide.")
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="WaveBreaker Twin-Run (interactif)")
+    parser.add_argument("--backend", default=C.sim.kernel_backend,
+                        help="Noyau IDM/émissions : auto, numpy, numba, python")
+    parser.add_argument("--integrator", default=C.sim.integrator, choices=INTEGRATORS,
+                        help="Intégrateur : fixed (dt unique) ou multirate (macro-pas + sous-pas)")
+    parser.add_argument("--seed", type=int, default=None, help="Graine du calendrier d'arrivées (reproductibilité)")
+    parser.add_argument("--trajectory", metavar="FICHIER.wbt", default=None,
+                        help="Streame les trajectoires sur disque au lieu de la RAM")
+    parser.add_argument("--telemetry", type=int, default=None, metavar="PORT",
+                        help="Diffuse capteurs et KPIs en direct sur tcp://127.0.0.1:PORT")
+    parser.add_argument("--warp", type=float, default=C.sim.time_scale_default,
+                        help="Secondes simulées par seconde réelle visées par la physique (0 : au plus vite)")
+    parser.add_argument("--profile", type=float, nargs="?", const=0.0, default=None, metavar="SECONDES",
+                        help="Chronométrage par phase (physique et rendu), rapport en fin de session "
+                             "(SECONDES : rapport intermédiaire périodique)")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    kernels.set_default_backend(args.backend)
+    logger.info(f"Noyau de calcul : {kernels.get_backend().name}")
     wb_rate = get_user_input()
     
-    # SETUP
-    road_chaos = Road("Scenario_Chaos")
-    road_wb = Road("Scenario_WaveBreaker")
-    brain = WaveBreakerBrain(active_scenario=True)
-    generator = TrafficGenerator(road_chaos, road_wb, brain)
-    generator.set_penetration_rate(wb_rate)
-    recorder = TwinTrafficRecorder()
+    # PHYSIQUE : processus dédié, publie ses trames en mémoire partagée
+    live = LiveTwin(LiveConfig(
+        penetration_rate=wb_rate, duration=MAX_SIMULATION_TIME, seed=args.seed,
+        backend=args.backend, integrator=args.integrator, trajectory=args.trajectory,
+        telemetry_port=args.telemetry, warp=args.warp, profile=args.profile,
+    )).start()
+    prof = profiler.enable(args.profile or None) if args.profile is not None else None
 
     # UI
-    renderer = TwinRenderer(road_chaos, road_wb)
+    renderer = TwinRenderer()
     dashboard = Dashboard(C.display.screen_size)
     clock = pygame.time.Clock()
 
     running = True
-    STEPS_PER_FRAME = 4
+    warp = 0.0
+    last_sample = (pygame.time.get_ticks(), 0.0)
 
     while running:
         clock.tick(C.sim.fps) 
@@ -79,40 +101,49 @@ def main():
             if event.type == pygame.QUIT:
                 running = False
         
-        # Auto-Stop
-        if road_chaos.time >= MAX_SIMULATION_TIME:
-            logger.info("⏱️  Fin de la session (3000s).")
+        # Auto-Stop (fin de la durée prévue côté physique)
+        if live.done:
+            logger.info(f"⏱️  Fin de la session ({MAX_SIMULATION_TIME:.0f}s).")
             running = False
 
-        # Boucle Physique Calibrée
-        sim_step = C.sim.dt
-        for _ in range(STEPS_PER_FRAME):
-            generator.update(sim_step)
-            road_chaos.update(sim_step)
-            road_wb.update(sim_step)
-            brain.process(road_wb.sensors.snapshot, road_wb.vehicles, road_wb.time)
-            recorder.record_step(road_chaos.time, road_chaos, road_wb)
+        # Dernière trame complète ; la physique avance à son propre rythme
+        if prof is not None:
+            t = prof.clock()
+        frame = live.frame
+        if live.poll():
+            dashboard.update(frame.chaos.metrics, frame.wb.metrics)
+            # Warp mesuré (temps simulé / temps réel), lissé sur ~1 s
+            ticks = pygame.time.get_ticks()
+            elapsed = (ticks - last_sample[0]) / 1000.0
+            if elapsed >= 1.0:
+                warp = (frame.time - last_sample[1]) / elapsed
+                last_sample = (ticks, frame.time)
+
+        if prof is not None:
+            t = prof.lap("ui.poll", t)
 
         # UI
-        dashboard.update(road_chaos.metrics, road_wb.metrics)
         real_fps = clock.get_fps()
-        renderer.render(real_fps, 60.0) 
+        renderer.render(frame, real_fps, warp) 
+        if prof is not None:
+            t = prof.lap("ui.render", t)
         dashboard.draw(renderer.screen)
+        if prof is not None:
+            t = prof.lap("ui.dashboard", t)
         
         pygame.display.flip()
+        if prof is not None:
+            prof.lap("ui.flip", t)
+            prof.tick()
 
     pygame.quit()
     
-    logger.info("Génération du rapport...")
-    try:
-        recorder.generate_comparison_report(road_chaos, road_wb)
-        logger.info("✅ RAPPORT GÉNÉRÉ : 'WaveBreaker_Final_Report.png'")
-        
-        if sys.platform == 'win32':
-            os.system("start WaveBreaker_Final_Report.png")
-            
-    except Exception as e:
-        logger.error(f"Erreur rapport: {e}")
+    # Le processus physique termine son pas, génère le rapport puis s'arrête
+    exitcode = live.stop()
+    if prof is not None:
+        logger.info("Profil du rendu :\n" + prof.report())
+    if exitcode == 0 and sys.platform == 'win32':
+        os.system("start WaveBreaker_Final_Report.png")
 
     sys.exit()
 
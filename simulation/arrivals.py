@@ -0,0 +1,282 @@
+"""
+WAVEBREAKER ARRIVAL SCHEDULE
+----------------------------
+Calendrier d'arrivées et attributs des véhicules, tirés par blocs
+(horizon de `block` arrivées) au lieu d'un tirage par véhicule.
+
+Flux aléatoires indépendants par usage (`numpy.random.Generator`,
+dérivés d'une même `SeedSequence`) :
+- "headway"      : intervalles entre arrivées (processus "poisson"),
+- "variability"  : facteur humain, partagé par les deux jumeaux,
+- "connectivity" : tirage uniforme comparé au taux de pénétration
+                   *au moment de l'injection*,
+- "lane"         : voie d'entrée, partagée par les jumeaux. Processus
+                   "poisson" : uniforme sur `C.road.lanes` (chaque voie reçoit
+                   un Poisson de taux flux/voies) ; "regular" : tourniquet
+                   (rang modulo voies), sinon deux entrées rapprochées dans
+                   la même voie saturent l'entrée.
+
+Conséquences :
+- la route Chaos ne dépend plus du taux de pénétration (même graine =
+  mêmes conducteurs, quel que soit le taux),
+- un véhicule connecté à 10% l'est aussi à 20% (nombres aléatoires communs),
+- le résultat d'une graine ne dépend ni du nombre de workers ni de
+  l'ordre d'exécution.
+
+Entrée sur la route (dosage) : une arrivée entre au plus tôt à son instant,
+et au plus tôt `entry_gap / v0` après l'entrée précédente de sa voie
+(espacement d'équilibre IDM à vitesse libre), jamais avant l'entrée
+précédente toutes voies confondues (file triée). À l'instant `t` du pas qui
+la consomme, elle est placée à `v0 * (t - entrée)`. Plusieurs arrivées d'un
+même pas (processus "poisson", macro-pas "multirate", flux élevé) ne
+s'empilent donc plus en x=0.
+
+Garde d'insertion : si la queue de la voie (dernier véhicule de la route de
+référence) est trop proche, l'arrivée entre à la vitesse de cette queue et
+à son espacement d'équilibre derrière elle ; s'il n'y a pas la place avant
+x=0 (bouchon d'entrée), elle reste en file avec les suivantes. Les jumeaux
+reçoivent les mêmes entrées (garde sur la route Chaos) ; une route WB seule
+rejoue les entrées de la route Chaos (`EntryLog`, voir simulation.baseline).
+"""
+
+import numpy as np
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from numpy.typing import NDArray
+
+from config import C
+
+# Ordre figé : le i-ème flux dérive toujours du i-ème enfant de la SeedSequence
+STREAMS = ("headway", "variability", "connectivity", "lane")
+
+
+def entry_gap(time_headway: Optional[float] = None) -> float:
+    """
+    Distance minimale (avant à avant) entre deux entrants successifs d'une
+    voie : espacement d'équilibre IDM à vitesse libre (longueur + s0 + v0*T),
+    donc pas de freinage brutal à l'entrée. Borne le débit d'entrée par voie.
+    """
+    headway = time_headway if time_headway is not None else C.physics.time_headway
+    return C.vehicle.length + C.physics.min_spacing + C.physics.desired_speed * headway
+
+
+def _gap_at(speed: float, time_headway: float) -> float:
+    """Espacement d'équilibre IDM (avant à avant) à la vitesse `speed`."""
+    return C.vehicle.length + C.physics.min_spacing + speed * time_headway
+
+
+class Arrivals(NamedTuple):
+    """Arrivées échues : rang de la première, puis un attribut par arrivée."""
+    rank: int
+    variability: NDArray[np.float64]
+    connect_draw: NDArray[np.float64]
+    lane: NDArray[np.int64]
+    # Instant d'entrée (<= instant du pas), position (m) et vitesse (m/s) d'entrée
+    entry_time: NDArray[np.float64]
+    x: NDArray[np.float64]
+    v: NDArray[np.float64]
+
+
+class EntryLog:
+    """
+    Entrées admises sur la route de référence, dans l'ordre des rangs :
+    instant du pas d'admission, instant d'entrée, position et vitesse.
+    Une route rejouée seule (`ArrivalSchedule.replay_due`) admet ainsi les
+    mêmes véhicules aux mêmes pas, aux mêmes places.
+    """
+
+    FIELDS = ("step_time", "entry_time", "x", "v")
+
+    def __init__(self):
+        self.step_time: List[float] = []
+        self.entry_time: List[float] = []
+        self.x: List[float] = []
+        self.v: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.step_time)
+
+    def record(self, step_time: float, due: Arrivals) -> None:
+        count = len(due.x)
+        self.step_time.extend([step_time] * count)
+        self.entry_time.extend(due.entry_time.tolist())
+        self.x.extend(due.x.tolist())
+        self.v.extend(due.v.tolist())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: list(getattr(self, name)) for name in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "EntryLog":
+        log = cls()
+        for name in cls.FIELDS:
+            setattr(log, name, [float(value) for value in state[name]])
+        return log
+
+
+class Prefill(NamedTuple):
+    """Véhicules présents à t=0, de l'aval vers l'amont (ids négatifs)."""
+    uid: NDArray[np.int64]
+    x: NDArray[np.float64]
+    lane: NDArray[np.int64]
+    variability: NDArray[np.float64]
+    connect_draw: NDArray[np.float64]
+    entry_time: NDArray[np.float64]
+
+
+def prefill_road(seed: Optional[int], flow: float, length_m: float, lanes: int) -> Prefill:
+    """
+    Route [0, length_m) chargée à la densité du flux `flow` à vitesse libre,
+    bornée par la densité d'équilibre (`entry_gap` par voie), voies en
+    tourniquet. Tirages d'un flux dédié de la graine (après ceux de
+    STREAMS) : indépendants du calendrier et du découpage de la route.
+    Entrée virtuelle à vitesse libre (temps de parcours).
+    """
+    v0 = C.physics.desired_speed
+    # Écart entre véhicules successifs toutes voies confondues (flux total `flow`)
+    spacing = max(v0 * 3600.0 / flow, entry_gap() / lanes)
+    count = int(length_m / spacing)
+    rng = np.random.default_rng(np.random.SeedSequence(seed).spawn(len(STREAMS) + 1)[-1])
+    variability = rng.uniform(0.90, 1.10, count)
+    connect_draw = rng.random(count)
+    rank = np.arange(count)
+    x = length_m - (rank + 0.5) * spacing
+    return Prefill(-(rank + 1), x, rank % lanes, variability, connect_draw, -x / v0)
+
+
+class ArrivalSchedule:
+    """
+    Arrivées numérotées 0, 1, 2... (id véhicule = rang + 1) avec leur instant,
+    leur facteur de variabilité et leur tirage de connectivité.
+    Seule la fenêtre non consommée est gardée en mémoire.
+    """
+
+    def __init__(self, seed: Optional[int] = None, nominal_flow: Optional[float] = None,
+                 process: Optional[str] = None, block: int = 4096, lanes: Optional[int] = None,
+                 gap: Optional[float] = None, time_headway: Optional[float] = None):
+        self.nominal_flow = nominal_flow if nominal_flow is not None else C.sim.nominal_flow
+        self.process = process if process is not None else C.sim.arrival_process
+        if self.process not in ("regular", "poisson"):
+            raise ValueError(f"Processus d'arrivée inconnu : {self.process!r}")
+        self.block = block
+        self.lanes = lanes if lanes is not None else C.road.lanes
+
+        seed_seq = np.random.SeedSequence(seed)
+        self.seed = seed_seq.entropy
+        self._rngs = {name: np.random.default_rng(child) for name, child in zip(STREAMS, seed_seq.spawn(len(STREAMS)))}
+
+        # Fenêtre [0:len) non consommée ; `first_rank` = rang de sa première arrivée
+        self.first_rank = 0
+        self.times = np.empty(0)
+        self.variability = np.empty(0)
+        self.connect_draw = np.empty(0)
+        self.lane = np.empty(0, dtype=np.int64)
+        self._last_time = None
+        self._draw_block()
+
+        # Dosage de l'entrée : intervalle minimal par voie, dernières entrées
+        self.time_headway = time_headway if time_headway is not None else C.physics.time_headway
+        self.entry_interval = (gap if gap is not None else entry_gap()) / C.physics.desired_speed
+        self._lane_free_at = np.full(self.lanes, -np.inf)
+        self._last_entry = -np.inf
+
+    def _draw_block(self) -> None:
+        n = self.block
+        mean_headway = 3600.0 / self.nominal_flow
+        if self.process == "poisson":
+            headways = self._rngs["headway"].exponential(mean_headway, n)
+        else:
+            headways = np.full(n, mean_headway)
+        if self._last_time is None:
+            # Première arrivée à t=0 (comportement historique)
+            headways[0] = 0.0
+            start = 0.0
+        else:
+            start = self._last_time
+        times = start + np.cumsum(headways)
+        self._last_time = times[-1]
+
+        self.times = np.concatenate([self.times, times])
+        self.variability = np.concatenate([self.variability, self._rngs["variability"].uniform(0.90, 1.10, n)])
+        self.connect_draw = np.concatenate([self.connect_draw, self._rngs["connectivity"].random(n)])
+        if self.process == "poisson":
+            lanes = self._rngs["lane"].integers(0, self.lanes, n)
+        else:
+            first = self.first_rank + len(self.times) - n
+            lanes = (first + np.arange(n)) % self.lanes
+        self.lane = np.concatenate([self.lane, lanes])
+
+    def pop_due(self, current_time: float, tails: Optional[NDArray[np.float64]] = None) -> Arrivals:
+        """
+        Consomme les arrivées qui peuvent entrer à `current_time` (voir le
+        dosage en tête de module), dans l'ordre des rangs. `tails` : (x, v) du
+        dernier véhicule de chaque voie de la route de référence, forme
+        (voies, 2), x=inf si vide (`VehicleFleet.lane_tails`) ; None = dosage seul. Retourne (rang de la première,
+        variabilités, tirages de connectivité, voies, instants, positions et
+        vitesses d'entrée).
+        """
+        while self.times[-1] <= current_time:
+            self._draw_block()
+        due = int(np.searchsorted(self.times, current_time, side="right"))
+        v0 = C.physics.desired_speed
+        free_gap = _gap_at(v0, self.time_headway)
+        if tails is not None:
+            tail_x, tail_v = tails[:, 0].copy(), tails[:, 1].copy()
+        entry_time = np.empty(due)
+        x = np.empty(due)
+        v = np.empty(due)
+        count = 0
+        while count < due:
+            lane = self.lane[count]
+            entry = max(self.times[count], self._lane_free_at[lane], self._last_entry)
+            if entry > current_time:
+                break
+            position, speed = v0 * (current_time - entry), v0
+            if tails is not None:
+                if tail_x[lane] - position < free_gap:
+                    # Queue de voie trop proche : on s'y cale, ou on attend la place
+                    speed = min(v0, float(tail_v[lane]))
+                    position = min(position, tail_x[lane] - _gap_at(speed, self.time_headway))
+                    if position < 0.0:
+                        break
+                    entry = current_time - position / v0
+                tail_x[lane], tail_v[lane] = position, speed
+            entry_time[count] = self._last_entry = entry
+            self._lane_free_at[lane] = entry + self.entry_interval
+            x[count], v[count] = position, speed
+            count += 1
+        return Arrivals(*self._consume(count), entry_time[:count], x[:count], v[:count])
+
+    def replay_due(self, log: EntryLog, current_time: float) -> Arrivals:
+        """Consomme les arrivées admises au plus tard à `current_time` selon `log` (route rejouée)."""
+        start = self.first_rank
+        end = start
+        while end < len(log) and log.step_time[end] <= current_time:
+            end += 1
+        while len(self.times) < end - start:
+            self._draw_block()
+        entries = (np.array(getattr(log, name)[start:end]) for name in ("entry_time", "x", "v"))
+        return Arrivals(*self._consume(end - start), *entries)
+
+    def _consume(self, count: int) -> Tuple[int, NDArray, NDArray, NDArray]:
+        """Retire les `count` premières arrivées de la fenêtre : (rang, variabilités, tirages, voies)."""
+        rank = self.first_rank
+        variability = self.variability[:count]
+        connect_draw = self.connect_draw[:count]
+        lane = self.lane[:count]
+        if count:
+            self.times = self.times[count:]
+            self.variability = self.variability[count:]
+            self.connect_draw = self.connect_draw[count:]
+            self.lane = self.lane[count:]
+            self.first_rank += count
+        return rank, variability, connect_draw, lane
+
+    @property
+    def next_arrival_time(self) -> float:
+        """Instant où la prochaine arrivée pourra entrer (arrivée et dosage, hors garde)."""
+        return max(float(self.times[0]), float(self._lane_free_at[self.lane[0]]), self._last_entry)
+
+    @staticmethod
+    def next_replay_time(log: EntryLog, rank: int) -> float:
+        """Pas d'admission de l'arrivée `rank` dans `log` (inf au-delà)."""
+        return log.step_time[rank] if rank < len(log) else float("inf")
@@ -0,0 +1,237 @@
+"""
+WAVEBREAKER CHAOS BASELINE CACHE
+--------------------------------
+La route Chaos d'un scénario jumeau ne dépend pas du taux de pénétration
+ni du Brain : elle est simulée seule (`TrafficGenerator(road_chaos, None,
+None)`), une fois par clé (graine, configuration physique/route/pas de
+temps, backend, demande, accident, durée), puis réutilisée par toutes les
+variantes WB de cette clé.
+
+La route WB est simulée seule et rejoue l'accident de la référence
+(victime et instant, `IncidentRecord`) et ses entrées (garde d'insertion
+évaluée sur Chaos, `EntryLog`) : elle voit exactement la même suite
+d'événements qu'en jumeau. Les gains calculés contre la référence
+sont donc identiques au bit près à ceux d'un run jumeau complet.
+
+Cache disque (`BaselineCache`) : un fichier JSON par clé (KPIs, temps de
+parcours `StreamingStats`, accident, entrées), plus en option les trajectoires
+Chaos (.wbt, voir analysis.trajectory_file). Écritures atomiques (fichier
+temporaire puis `os.replace`) : plusieurs workers peuvent partager le
+cache. Taille bornée : les entrées les moins récemment utilisées sont
+évincées après chaque ajout.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import dataclasses
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import C
+from core import kernels, profiler
+from core.stats import StreamingStats
+from simulation.road import Road
+from simulation.arrivals import EntryLog
+from simulation.generator import TrafficGenerator, IncidentRecord
+
+logger = logging.getLogger("WaveBreaker.Baseline")
+
+BASELINE_VERSION = 2
+# Paramètres de scénario dont dépend la route Chaos (ni taux ni PRESHOT)
+BASELINE_FIELDS = ("nominal_flow", "time_headway", "incident_pos_km", "incident_time",
+                   "incident_duration", "duration")
+SEED_STRIDE = 12345
+
+
+def baseline_key(scenario, sim_id: int, integrator: str, backend: Optional[str] = None) -> str:
+    """Empreinte de tout ce qui détermine la route Chaos (backend résolu inclus : arrondis)."""
+    content = {
+        "version": BASELINE_VERSION,
+        "seed": sim_id * SEED_STRIDE,
+        "integrator": integrator,
+        "backend": kernels.get_backend(backend).name,
+        "scenario": {name: getattr(scenario, name) for name in BASELINE_FIELDS},
+        "physics": dataclasses.asdict(C.physics),
+        "vehicle": dataclasses.asdict(C.vehicle),
+        "road": dataclasses.asdict(C.road),
+        "sim": dataclasses.asdict(C.sim),
+    }
+    blob = json.dumps(content, sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+@dataclass
+class ChaosBaseline:
+    """KPIs finaux de la route Chaos, accident observé (None : jamais déclenché) et entrées admises."""
+    key: str
+    metrics: Dict[str, float]
+    travel_times: StreamingStats
+    incident: Optional[IncidentRecord]
+    trajectory_path: Optional[str] = None
+    entries: Optional[EntryLog] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "metrics": self.metrics,
+            "travel_times": self.travel_times.to_dict(),
+            "incident": list(self.incident) if self.incident is not None else None,
+            "entries": self.entries.to_dict() if self.entries is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'ChaosBaseline':
+        incident = state["incident"]
+        return cls(
+            key=state["key"],
+            metrics=state["metrics"],
+            travel_times=StreamingStats.from_dict(state["travel_times"]),
+            incident=IncidentRecord(int(incident[0]), float(incident[1])) if incident is not None else None,
+            entries=EntryLog.from_dict(state["entries"]) if state.get("entries") is not None else None,
+        )
+
+
+def run_chaos_baseline(scenario, sim_id: int, integrator: str = C.sim.integrator,
+                       trajectory_path: Optional[str] = None, sample_rate: float = 2.0) -> ChaosBaseline:
+    """
+    Simule la route Chaos seule. Avec `trajectory_path`, échantillonne ses
+    trajectoires toutes les `sample_rate` secondes (même règle que
+    `TwinTrafficRecorder`) ; le header du .wbt porte la clé, les paramètres
+    de scénario (BASELINE_FIELDS) et l'accident observé.
+    """
+    road = Road(f"Sim{sim_id}_Chaos", integrator=integrator)
+    generator = TrafficGenerator(road, None, None, seed=sim_id * SEED_STRIDE,
+                                 nominal_flow=scenario.nominal_flow,
+                                 incident_pos_km=scenario.incident_pos_km,
+                                 incident_time=scenario.incident_time,
+                                 incident_duration=scenario.incident_duration,
+                                 time_headway=scenario.time_headway)
+    writer = None
+    if trajectory_path is not None:
+        from analysis.trajectory_file import TrajectoryWriter
+        writer = TrajectoryWriter(trajectory_path, seed=sim_id * SEED_STRIDE,
+                                  incident_time=scenario.incident_time,
+                                  incident_pos_km=scenario.incident_pos_km,
+                                  extra={"baseline": baseline_key(scenario, sim_id, integrator),
+                                         "scenario": {name: getattr(scenario, name) for name in BASELINE_FIELDS},
+                                         "integrator": integrator})
+    last_sample = -1.0
+    dt = road.step_dt
+    prof = profiler.active
+    try:
+        while road.time < scenario.duration:
+            generator.update(dt)
+            road.update(dt)
+            if writer is not None and road.time - last_sample >= sample_rate:
+                last_sample = road.time
+                writer.write_sample("chaos", road.time, road.fleet)
+            if prof is not None:
+                prof.tick()
+        if writer is not None and generator.incident_record is not None:
+            writer.record_incident(generator.incident_record.time, generator.incident_record.victim_id)
+    finally:
+        if writer is not None:
+            writer.close()
+    return ChaosBaseline(baseline_key(scenario, sim_id, integrator), road.metrics,
+                         road.travel_times, generator.incident_record, trajectory_path,
+                         entries=generator.entry_log)
+
+
+class BaselineCache:
+    """Références Chaos sur disque, bornées à `max_bytes` (éviction LRU)."""
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, key + suffix)
+
+    def get(self, key: str) -> Optional[ChaosBaseline]:
+        """Entrée `key` si présente (et marquée comme récemment utilisée)."""
+        path = self._path(key, ".json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                baseline = ChaosBaseline.from_dict(json.load(f))
+            os.utime(path)
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+        trajectory = self._path(key, ".wbt")
+        if os.path.exists(trajectory):
+            baseline.trajectory_path = trajectory
+        return baseline
+
+    def put(self, baseline: ChaosBaseline) -> ChaosBaseline:
+        """
+        Enregistre une référence (trajectoires éventuelles déplacées dans le
+        cache), puis évince les entrées les plus anciennes au-delà de la limite.
+        """
+        if baseline.trajectory_path is not None:
+            target = self._path(baseline.key, ".wbt")
+            os.replace(baseline.trajectory_path, target)
+            baseline.trajectory_path = target
+        tmp = self._path(baseline.key, f".json.tmp{os.getpid()}")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(baseline.to_dict(), f)
+        os.replace(tmp, self._path(baseline.key, ".json"))
+        self.evict(keep=baseline.key)
+        return baseline
+
+    def get_or_run(self, scenario, sim_id: int, integrator: str = C.sim.integrator,
+                   trajectories: bool = False) -> ChaosBaseline:
+        """Référence en cache, sinon simulée puis stockée (avec trajectoires si demandées)."""
+        key = baseline_key(scenario, sim_id, integrator)
+        baseline = self.get(key)
+        if baseline is not None and (baseline.trajectory_path is not None or not trajectories):
+            self.hits += 1
+            return baseline
+        self.misses += 1
+        tmp = self._path(key, f".wbt.tmp{os.getpid()}") if trajectories else None
+        return self.put(run_chaos_baseline(scenario, sim_id, integrator, trajectory_path=tmp))
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """(dernière utilisation, octets, clé) de chaque entrée complète."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-len(".json")]
+            try:
+                stat = os.stat(self._path(key, ".json"))
+                size = stat.st_size
+                if os.path.exists(self._path(key, ".wbt")):
+                    size += os.path.getsize(self._path(key, ".wbt"))
+            except FileNotFoundError:
+                continue   # évincée entre-temps par un autre processus
+            entries.append((stat.st_mtime, size, key))
+        return entries
+
+    @property
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Supprime les entrées LRU jusqu'à repasser sous `max_bytes` ; retourne le nombre évincé."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for suffix in (".json", ".wbt"):
+                try:
+                    os.remove(self._path(key, suffix))
+                except FileNotFoundError:
+                    pass
+            total -= size
+            evicted += 1
+        if evicted:
+            logger.info(f"Cache Chaos : {evicted} entrée(s) évincée(s), {total / 2**20:.1f} Mo")
+        return evicted
@@ -0,0 +1,484 @@
+"""
+WAVEBREAKER BENCHMARK SUITE
+---------------------------
+Mesure de performance reproductible du moteur headless (Road,
+TrafficGenerator, WaveBreakerBrain) sur des scénarios jumeaux figés
+(graine fixe) :
+- axes : flux nominal (300 -> 6000 veh/h), longueur de route (50 -> 500 km),
+  taux de pénétration, accident activé ou non ;
+- suites ("quick", "full") : point de référence puis chaque axe varié seul
+  (un facteur à la fois) ; grille complète possible en ligne de commande ;
+- routes préchargées à t=0 (densité du flux nominal, bornée par la densité
+  d'équilibre IDM ; `arrivals.prefill_road`, comme le corridor) : la
+  charge dépend de la longueur dès le premier pas ;
+- au-delà de la capacité d'une voie (~1100 veh/h à T=3 s), l'entrée est
+  dosée (simulation.arrivals) : la route tourne à capacité, le surplus de
+  demande attend en file au lieu de s'empiler à l'entrée ;
+- accident tôt dans le run (BENCH_INCIDENT_TIME) pour que la phase
+  perturbée soit mesurée même sur une durée courte.
+
+Chaque scénario tourne dans un processus neuf ("spawn") : pic de mémoire
+résidente propre au scénario, noyaux compilés hors chronométrage. Passes
+chronométrées sans instrumentation (la meilleure est retenue), puis une
+passe profilée (core.profiler) pour la ventilation par phase.
+
+Résultats (JSON) : débit en pas de boucle/s et pas véhicule/s (en pas
+`C.sim.dt` équivalents, comparables entre intégrateurs), pic RSS, phases,
+plus l'environnement (backend, intégrateur, machine, commit).
+`compare` signale les régressions par rapport à un fichier de référence.
+
+Usage :
+    python -m simulation.benchmark run --suite quick -o bench.json
+    python -m simulation.benchmark run --flows 600 6000 --lengths 50 500
+    python -m simulation.benchmark compare base.json bench.json --threshold 0.1
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import logging
+import platform
+import itertools
+import subprocess
+import multiprocessing
+from dataclasses import dataclass, asdict, fields, replace
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import C
+from core import kernels, profiler
+from core.controller import WaveBreakerBrain
+from core.vehicle import driver_params
+from simulation.road import Road
+from simulation.generator import TrafficGenerator
+from simulation.arrivals import prefill_road
+from simulation.checkpoint import TwinState
+
+logger = logging.getLogger("WaveBreaker.Benchmark")
+
+RESULTS_VERSION = 2
+# Accident des scénarios "incident" : tôt, pour tomber dans la fenêtre mesurée
+BENCH_INCIDENT_TIME = 60.0
+BENCH_INCIDENT_DURATION = 400.0
+# Indicateurs comparés : (clé, +1 si plus grand = mieux, -1 sinon)
+HEADLINE_METRICS = (("ticks_per_s", +1), ("vehicle_steps_per_s", +1), ("peak_rss_mb", -1))
+
+
+@dataclass(frozen=True)
+class BenchScenario:
+    """Scénario de mesure ; entièrement déterminé par ses champs (graine comprise)."""
+    nominal_flow: float = C.sim.nominal_flow
+    length_km: float = C.road.length_km
+    penetration_rate: float = 0.2
+    incident: bool = True
+    duration: float = 600.0
+    seed: int = 1
+
+    @property
+    def case_id(self) -> str:
+        """Clé de comparaison entre deux fichiers de résultats."""
+        return (f"flow{self.nominal_flow:g}_len{self.length_km:g}_rate{self.penetration_rate:g}"
+                f"_inc{int(self.incident)}_dur{self.duration:g}_seed{self.seed}")
+
+    @property
+    def label(self) -> str:
+        return (f"{self.nominal_flow:>5g} veh/h {self.length_km:>4g} km  taux {self.penetration_rate:<4g} "
+                f"accident {'oui' if self.incident else 'non'}")
+
+
+REFERENCE = BenchScenario()
+# Valeurs balayées par axe (un axe à la fois autour de REFERENCE)
+SUITES: Dict[str, Dict[str, Any]] = {
+    "quick": {
+        "duration": 300.0,
+        "axes": {"nominal_flow": (300.0, 1500.0, 6000.0), "length_km": (50.0, 200.0),
+                 "penetration_rate": (0.0, 1.0), "incident": (False, True)},
+    },
+    "full": {
+        "duration": 600.0,
+        "axes": {"nominal_flow": (300.0, 600.0, 1200.0, 2400.0, 4000.0, 6000.0),
+                 "length_km": (50.0, 100.0, 200.0, 500.0),
+                 "penetration_rate": (0.0, 0.2, 0.5, 1.0), "incident": (False, True)},
+    },
+}
+
+
+def one_at_a_time(reference: BenchScenario, axes: Dict[str, Sequence[Any]]) -> List[BenchScenario]:
+    """Référence, puis chaque valeur de chaque axe, les autres champs restant ceux de la référence."""
+    cases = [reference]
+    for name, values in axes.items():
+        for value in values:
+            case = replace(reference, **{name: value})
+            if case not in cases:
+                cases.append(case)
+    return cases
+
+
+def suite(name: str, seed: int = REFERENCE.seed) -> List[BenchScenario]:
+    spec = SUITES[name]
+    return one_at_a_time(replace(REFERENCE, duration=spec["duration"], seed=seed), spec["axes"])
+
+
+def grid(reference: BenchScenario = REFERENCE, **axes: Sequence[Any]) -> List[BenchScenario]:
+    """Produit cartésien des axes fournis (les autres champs : `reference`)."""
+    known = {f.name for f in fields(BenchScenario)}
+    unknown = set(axes) - known
+    if unknown:
+        raise ValueError(f"Axes de benchmark inconnus : {sorted(unknown)}")
+    names = list(axes)
+    return [replace(reference, **dict(zip(names, values))) for values in itertools.product(*(axes[n] for n in names))]
+
+
+# ======================================================================
+# EXÉCUTION D'UN SCÉNARIO
+# ======================================================================
+def _prefill(state: TwinState, scenario: BenchScenario) -> None:
+    """
+    Charge les deux routes (`arrivals.prefill_road`, comme le corridor) : mêmes
+    conducteurs sur les deux jumeaux, connectés sur WB selon le taux.
+    """
+    road_chaos, road_wb = state.road_chaos, state.road_wb
+    v0 = C.physics.desired_speed
+    load = prefill_road(scenario.seed, scenario.nominal_flow, road_chaos.exit_m, road_chaos.lanes)
+    for k in range(len(load.uid)):
+        entry = {'x': float(load.x[k]), 'v': v0, 'lane': int(load.lane[k]),
+                 'entry_time': float(load.entry_time[k])}
+        human = driver_params(v0, float(load.variability[k]))
+        connected = bool(load.connect_draw[k] < scenario.penetration_rate)
+        road_chaos.fleet.spawn(int(load.uid[k]), {**entry, 'is_connected': False, **human})
+        params = driver_params(v0, 1.0) if connected else human
+        road_wb.fleet.spawn(int(load.uid[k]), {**entry, 'is_connected': connected, **params})
+    for road in (road_chaos, road_wb):
+        road.refresh_sensors()
+
+
+def build_bench_twin(scenario: BenchScenario, backend: Optional[str] = None,
+                     integrator: Optional[str] = None) -> TwinState:
+    """Jumeau préchargé du scénario. Longueur hors config : route [0, L) ("fixed" seulement, voir Road)."""
+    extent = None if scenario.length_km == C.road.length_km else (0.0, scenario.length_km * 1000.0)
+    road_chaos = Road("Bench_Chaos", backend=backend, integrator=integrator, extent=extent)
+    road_wb = Road("Bench_WB", backend=backend, integrator=integrator, extent=extent)
+    brain = WaveBreakerBrain(active_scenario=True, num_segments=road_wb.sensors.num_segments)
+    incident_pos_km = min(C.sim.perturbation_pos, scenario.length_km / 2)
+    generator = TrafficGenerator(road_chaos, road_wb, brain, seed=scenario.seed,
+                                 nominal_flow=scenario.nominal_flow, incident_pos_km=incident_pos_km,
+                                 incident_time=BENCH_INCIDENT_TIME if scenario.incident else math.inf,
+                                 incident_duration=BENCH_INCIDENT_DURATION)
+    generator.set_penetration_rate(scenario.penetration_rate)
+    state = TwinState(road_chaos, road_wb, brain, generator)
+    _prefill(state, scenario)
+    return state
+
+
+def _drive(state: TwinState, duration: float) -> Dict[str, float]:
+    """
+    Boucle jumelle chronométrée ; pas de boucle, pas véhicule (somme des
+    deux routes, en pas `C.sim.dt` équivalents : un macro-pas "multirate"
+    compte pour `macro_dt / dt`) et temps mural.
+    """
+    road_chaos, road_wb, brain, generator = state
+    dt = road_chaos.step_dt
+    substeps = round(dt / C.sim.dt)
+    prof = profiler.active
+    ticks = vehicle_steps = 0
+    start = time.perf_counter()
+    while road_chaos.time < duration:
+        vehicle_steps += (len(road_chaos.fleet) + len(road_wb.fleet)) * substeps
+        generator.update(dt)
+        road_chaos.update(dt)
+        road_wb.update(dt)
+        brain.process(road_wb.sensors.snapshot, road_wb.fleet, road_wb.time)
+        ticks += 1
+        if prof is not None:
+            prof.tick()
+    return {"wall_s": time.perf_counter() - start, "ticks": ticks, "substeps": substeps,
+            "vehicle_steps": vehicle_steps}
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Pic de mémoire résidente du processus (Mo), None si la plateforme ne le fournit pas."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux : Ko ; macOS : octets
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def run_case(scenario: BenchScenario, repeat: int = 3, phases: bool = True,
+             backend: Optional[str] = None, integrator: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Mesure un scénario dans le processus courant : une mise en route courte
+    (compilation des noyaux), `repeat` passes chronométrées sans profileur,
+    puis une passe profilée si `phases`. Le pic RSS n'est propre au scénario
+    que dans un processus neuf (voir `run_suite`).
+    """
+    _drive(build_bench_twin(replace(scenario, duration=10 * C.sim.dt), backend, integrator), 10 * C.sim.dt)
+
+    passes = [_drive(build_bench_twin(scenario, backend, integrator), scenario.duration)
+              for _ in range(max(1, repeat))]
+    best = min(passes, key=lambda p: p["wall_s"])
+    if any(p["vehicle_steps"] != best["vehicle_steps"] for p in passes):
+        logger.warning(f"{scenario.case_id} : charge différente d'une passe à l'autre (run non déterministe ?)")
+    row = {
+        "case_id": scenario.case_id,
+        "scenario": asdict(scenario),
+        "ticks": best["ticks"],
+        "vehicle_steps": best["vehicle_steps"],
+        "mean_vehicles": best["vehicle_steps"] / max(1, best["ticks"] * best["substeps"]),
+        "wall_s": best["wall_s"],
+        "walls_s": [p["wall_s"] for p in passes],
+        "ticks_per_s": best["ticks"] / best["wall_s"] if best["wall_s"] > 0 else 0.0,
+        "vehicle_steps_per_s": best["vehicle_steps"] / best["wall_s"] if best["wall_s"] > 0 else 0.0,
+    }
+
+    if phases:
+        previous = profiler.disable()
+        prof = profiler.enable()
+        try:
+            _drive(build_bench_twin(scenario, backend, integrator), scenario.duration)
+        finally:
+            profiler.disable()
+            profiler.active = previous
+        data = prof.to_dict()
+        wall = data["wall_s"]
+        for stats in data["phases"].values():
+            stats.pop("histogram")
+            stats["share"] = stats["total_s"] / wall if wall > 0 else 0.0
+        row["phases"] = data["phases"]
+        row["counters"] = data["counters"]
+        row["profiled_wall_s"] = wall
+    row["peak_rss_mb"] = peak_rss_mb()
+    return row
+
+
+def _case_worker(scenario: BenchScenario, options: Dict[str, Any]) -> Dict[str, Any]:
+    logging.basicConfig(level=logging.ERROR, format='[%(name)s] %(levelname)s: %(message)s')
+    return run_case(scenario, **options)
+
+
+def environment(backend: Optional[str] = None, integrator: Optional[str] = None) -> Dict[str, Any]:
+    """Contexte de la mesure : deux fichiers ne se comparent bien qu'à environnement égal."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "backend": kernels.get_backend(backend).name,
+        "integrator": integrator or C.sim.integrator,
+        "dt": C.sim.dt,
+        "lanes": C.road.lanes,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "system": platform.system(),
+        "commit": commit,
+    }
+
+
+def run_suite(scenarios: Sequence[BenchScenario], repeat: int = 3, phases: bool = True,
+              backend: Optional[str] = None, integrator: Optional[str] = None,
+              isolate: bool = True) -> Dict[str, Any]:
+    """
+    Mesure les scénarios l'un après l'autre (jamais en parallèle : pas de
+    concurrence pour les cœurs ni la mémoire). `isolate` : un processus
+    "spawn" neuf par scénario (pic RSS propre).
+    """
+    options = {"repeat": repeat, "phases": phases, "backend": backend, "integrator": integrator}
+    for scenario in scenarios:
+        if scenario.length_km != C.road.length_km and (integrator or C.sim.integrator) != "fixed":
+            raise ValueError(f"{scenario.case_id} : longueur hors config, intégrateur 'fixed' seulement")
+    started = time.time()
+    results = []
+    pool = multiprocessing.get_context("spawn").Pool(1, maxtasksperchild=1) if isolate else None
+    try:
+        for scenario in scenarios:
+            row = pool.apply(_case_worker, (scenario, options)) if pool else run_case(scenario, **options)
+            logger.info(f"{scenario.label} : {row['ticks_per_s']:.0f} pas/s, "
+                        f"{row['vehicle_steps_per_s'] / 1e6:.2f} M pas véhicule/s")
+            results.append(row)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+        "options": {"repeat": repeat, "phases": phases, "isolate": isolate},
+        "environment": environment(backend, integrator),
+        "results": results,
+    }
+
+
+def save_results(results: Dict[str, Any], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=1)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        results = json.load(f)
+    if results.get("version") != RESULTS_VERSION:
+        raise ValueError(f"{path} : version de résultats {results.get('version')} (attendue {RESULTS_VERSION})")
+    return results
+
+
+# ======================================================================
+# COMPARAISON
+# ======================================================================
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.10,
+            rss_threshold: Optional[float] = None, phase_threshold: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Compare deux fichiers de résultats scénario par scénario (`case_id`).
+    Régression : débit en baisse ou pic RSS en hausse de plus de
+    `threshold` (`rss_threshold` pour la mémoire, défaut identique).
+    Les phases dont la durée moyenne augmente de plus de `phase_threshold`
+    (défaut : `threshold`) sont signalées à titre indicatif. Une charge
+    différente (pas véhicule) rend la ligne non comparable.
+    """
+    rss_threshold = threshold if rss_threshold is None else rss_threshold
+    phase_threshold = threshold if phase_threshold is None else phase_threshold
+    base_rows = {row["case_id"]: row for row in baseline["results"]}
+    rows, regressions = [], []
+    for row in current["results"]:
+        ref = base_rows.get(row["case_id"])
+        if ref is None:
+            continue
+        entry = {"case_id": row["case_id"], "metrics": {}, "phases": {},
+                 "workload_changed": ref["vehicle_steps"] != row["vehicle_steps"]}
+        for key, direction in HEADLINE_METRICS:
+            old, new = ref.get(key), row.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            limit = rss_threshold if key == "peak_rss_mb" else threshold
+            regressed = direction * change < -limit
+            entry["metrics"][key] = {"baseline": old, "current": new, "change": change, "regression": regressed}
+            if regressed:
+                regressions.append((row["case_id"], key, change))
+        for name, stats in row.get("phases", {}).items():
+            old = ref.get("phases", {}).get(name)
+            if old and old["mean_us"] > 0:
+                change = (stats["mean_us"] - old["mean_us"]) / old["mean_us"]
+                if change > phase_threshold:
+                    entry["phases"][name] = change
+        rows.append(entry)
+
+    keys = ("backend", "integrator", "dt", "lanes", "python", "numpy", "processor", "cpu_count")
+    env_diff = {key: (baseline["environment"].get(key), current["environment"].get(key)) for key in keys
+                if baseline["environment"].get(key) != current["environment"].get(key)}
+    return {
+        "rows": rows,
+        "regressions": regressions,
+        "missing": sorted(set(base_rows) - {row["case_id"] for row in current["results"]}),
+        "new": sorted({row["case_id"] for row in current["results"]} - set(base_rows)),
+        "environment_diff": env_diff,
+    }
+
+
+def format_comparison(report: Dict[str, Any]) -> str:
+    lines = []
+    for key, (old, new) in report["environment_diff"].items():
+        lines.append(f"⚠ environnement différent : {key} {old} -> {new}")
+    lines.append(f"{'scénario':<46} {'pas/s':>16} {'pas véhicule/s':>16} {'pic RSS':>16}")
+    for entry in report["rows"]:
+        cells = []
+        for key, _ in HEADLINE_METRICS:
+            metric = entry["metrics"].get(key)
+            cells.append(f"{'-':>16}" if metric is None else
+                         f"{metric['change'] * 100:+8.1f}% {'RÉGR.' if metric['regression'] else 'ok':>6}")
+        note = "  (charge différente : non comparable)" if entry["workload_changed"] else ""
+        lines.append(f"{entry['case_id']:<46} {' '.join(cells)}{note}")
+        for name, change in sorted(entry["phases"].items(), key=lambda item: -item[1]):
+            lines.append(f"    phase {name:<18} moyenne {change * 100:+.1f}%")
+    if report["missing"]:
+        lines.append(f"absents de la mesure : {', '.join(report['missing'])}")
+    if report["new"]:
+        lines.append(f"sans référence : {', '.join(report['new'])}")
+    n = len(report["regressions"])
+    lines.append(f"{n} régression(s)" if n else "aucune régression")
+    return "\n".join(lines)
+
+
+def format_results(results: Dict[str, Any]) -> str:
+    env = results["environment"]
+    lines = [f"backend {env['backend']}, intégrateur {env['integrator']}, commit {env['commit'] or '?'}",
+             f"{'scénario':<48} {'véh. moy':>9} {'pas/s':>9} {'M pas véh/s':>12} {'pic RSS Mo':>11}  phase dominante"]
+    for row in results["results"]:
+        scenario = BenchScenario(**row["scenario"])
+        top = max(row.get("phases", {}).items(), key=lambda item: item[1]["total_s"], default=None)
+        top_text = f"{top[0]} {top[1]['share'] * 100:.0f}%" if top else "-"
+        rss = f"{row['peak_rss_mb']:.0f}" if row["peak_rss_mb"] is not None else "-"
+        lines.append(f"{scenario.label:<48} {row['mean_vehicles']:>9.0f} {row['ticks_per_s']:>9.0f} "
+                     f"{row['vehicle_steps_per_s'] / 1e6:>12.2f} {rss:>11}  {top_text}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark reproductible du moteur headless")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Mesure une suite ou une grille de scénarios")
+    run_parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    run_parser.add_argument("--flows", type=float, nargs="+", help="Grille : flux nominaux (veh/h)")
+    run_parser.add_argument("--lengths", type=float, nargs="+", help="Grille : longueurs de route (km)")
+    run_parser.add_argument("--rates", type=float, nargs="+", help="Grille : taux de pénétration")
+    run_parser.add_argument("--incident", choices=("on", "off"), nargs="+", help="Grille : accident")
+    run_parser.add_argument("--duration", type=float, help="Durée simulée par scénario (s, défaut : celle de la suite)")
+    run_parser.add_argument("--seed", type=int, default=REFERENCE.seed)
+    run_parser.add_argument("--repeat", type=int, default=3, help="Passes chronométrées (la meilleure est retenue)")
+    run_parser.add_argument("--no-phases", action="store_true", help="Sans passe profilée")
+    run_parser.add_argument("--inline", action="store_true",
+                            help="Dans ce processus (pic RSS cumulé, non comparable)")
+    run_parser.add_argument("--backend", choices=["auto", *kernels.available_backends()], default=None)
+    run_parser.add_argument("--integrator", choices=["fixed", "multirate"], default=None)
+    run_parser.add_argument("-o", "--output", default="WaveBreaker_Benchmark.json")
+    run_parser.add_argument("--baseline", help="Compare aussitôt à ce fichier de référence")
+    run_parser.add_argument("--threshold", type=float, default=0.10, help="Écart relatif toléré (0.10 = 10%%)")
+
+    compare_parser = commands.add_parser("compare", help="Compare une mesure à une référence")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Écart relatif toléré (0.10 = 10%%)")
+    compare_parser.add_argument("--rss-threshold", type=float, default=None)
+    compare_parser.add_argument("--json", action="store_true", help="Rapport de comparaison en JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format='[%(name)s] %(levelname)s: %(message)s')
+    if args.command == "run":
+        axes = {name: values for name, values in (("nominal_flow", args.flows), ("length_km", args.lengths),
+                                                  ("penetration_rate", args.rates)) if values}
+        if args.incident:
+            axes["incident"] = [value == "on" for value in args.incident]
+        if axes:
+            reference = replace(REFERENCE, seed=args.seed, duration=args.duration or REFERENCE.duration)
+            scenarios = grid(reference, **axes)
+        else:
+            scenarios = suite(args.suite, args.seed)
+            if args.duration:
+                scenarios = [replace(s, duration=args.duration) for s in scenarios]
+        # Progression scénario par scénario (les modules simulés restent à ERROR)
+        logger.setLevel(logging.INFO)
+        results = run_suite(scenarios, args.repeat, not args.no_phases, args.backend, args.integrator,
+                            isolate=not args.inline)
+        save_results(results, args.output)
+        print(format_results(results))
+        print(f"Résultats : {args.output}")
+        if args.baseline:
+            report = compare(load_results(args.baseline), results, args.threshold)
+            print(format_comparison(report))
+            sys.exit(1 if report["regressions"] else 0)
+    else:
+        report = compare(load_results(args.baseline), load_results(args.current), args.threshold,
+                         args.rss_threshold)
+        print(json.dumps(report, indent=1) if args.json else format_comparison(report))
+        sys.exit(1 if report["regressions"] else 0)
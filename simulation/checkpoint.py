@@ -0,0 +1,62 @@
+"""
+WAVEBREAKER WARM-START CHECKPOINTS
+----------------------------------
+Capture complète d'un scénario jumeau (routes Chaos et WB avec leurs
+flottes et capteurs, Brain, Generator : compteurs, minuteries et états des
+générateurs aléatoires du calendrier d'arrivées) en un blob compact
+(pickle + zlib), en mémoire ou sur disque.
+
+Restaurer un blob puis poursuivre la boucle donne exactement la même
+suite que le run ininterrompu : c'est la base du démarrage à chaud de
+simulation.sweep (un remplissage 0 -> accident par graine, puis une
+bifurcation par variante post-accident).
+
+- Flotte : seule la fenêtre vivante est stockée, le backend de calcul
+  l'est par son nom (`VehicleFleet.__getstate__`).
+- Les références partagées (Generator -> routes et Brain) sont conservées.
+"""
+
+import pickle
+import zlib
+from typing import NamedTuple
+
+from core.controller import WaveBreakerBrain
+from simulation.road import Road
+from simulation.generator import TrafficGenerator
+
+FORMAT_VERSION = 1
+
+
+class TwinState(NamedTuple):
+    """Objets vivants d'un scénario jumeau (ceux de la boucle headless)."""
+    road_chaos: Road
+    road_wb: Road
+    brain: WaveBreakerBrain
+    generator: TrafficGenerator
+
+
+def capture(state: TwinState, level: int = 1) -> bytes:
+    """Blob compressé de l'état complet (l'état vivant n'est pas modifié)."""
+    payload = pickle.dumps((FORMAT_VERSION, tuple(state)), protocol=pickle.HIGHEST_PROTOCOL)
+    return zlib.compress(payload, level)
+
+
+def restore(blob: bytes) -> TwinState:
+    """Nouvel état indépendant (chaque appel donne une copie fraîche)."""
+    version, objects = pickle.loads(zlib.decompress(blob))
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Checkpoint au format {version}, attendu {FORMAT_VERSION}")
+    return TwinState(*objects)
+
+
+def save(state: TwinState, path: str) -> int:
+    """Écrit le checkpoint dans `path` ; retourne sa taille en octets."""
+    blob = capture(state)
+    with open(path, "wb") as f:
+        f.write(blob)
+    return len(blob)
+
+
+def load(path: str) -> TwinState:
+    with open(path, "rb") as f:
+        return restore(f.read())
@@ -0,0 +1,530 @@
+"""
+WAVEBREAKER CORRIDOR (DOMAIN DECOMPOSITION)
+-------------------------------------------
+Corridor autoroutier long (ex. 500 km, plusieurs sites d'accident) découpé
+en partitions spatiales contiguës (segments capteurs entiers), chacune
+avancée par son propre processus worker.
+
+Échanges par tick, dans un seul bloc de mémoire partagée (`CorridorBuffers`) :
+- halo : (x, v) du dernier véhicule de chaque voie, leader hors route du
+  premier véhicule de la partition amont. Une partition couvre au moins un
+  segment (>= LEADER_CUTOFF_M) : aucun leader n'est vu plus loin ;
+- transferts : véhicules ayant franchi la frontière aval, emballés (toutes
+  colonnes) dans la boîte de sortie de la partition, repris en aval ;
+- capteurs : chaque partition recopie ses segments dans le SensorSnapshot
+  global ; incidents : état de chaque site, tenu par sa partition.
+
+Cycle d'un tick (deux barrières, trois aux ticks de contrôle) :
+1. workers : reprise des transferts, incidents, capteurs et halo publiés
+                                                               -> barrière
+2. tick de contrôle (période C.wavebreaker.control_period) : vue globale,
+   un WaveBreakerBrain par site, carte diffusée = minimum des cartes des
+   sites                                                       -> barrière
+3. workers : consignes (`dispatch_orders`, ticks de contrôle), arrivées
+   (partition 0), pas physique, sortants vers la boîte de sortie -> barrière
+Le calendrier de contrôle (`ControlClock`) est rejoué à l'identique par
+chaque processus : aucune barrière ni échange hors des ticks de contrôle.
+Un incident modifie la victime avant la publication du halo (le suiveur
+amont la voit arrêtée dès ce tick) ; le coordinateur ne le prend en compte
+qu'au cycle suivant, comme le Brain d'une route unique.
+
+Équivalence : en voie unique, P partitions reproduisent le corridor non
+découpé (P=1) à l'arrondi des sommes près (même leader, mêmes capteurs,
+mêmes consignes). En multi-voies, MOBIL ne voit pas au-delà d'une frontière.
+Limites : intégrateur "fixed" uniquement, pas de malus de stress ; la
+victime d'un accident est le véhicule le plus proche du site (déconnecté).
+
+Usage : python -m simulation.corridor --length 500 --partitions 1 4 8 --duration 1800
+"""
+
+import math
+import time
+import logging
+import threading
+import multiprocessing
+from dataclasses import dataclass, replace
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import C
+from core.controller import WaveBreakerBrain, dispatch_orders
+from core.fleet import COLUMN_NAMES, VehicleFleet
+from core.infrastructure import SensorSnapshot
+from core.stats import StreamingStats
+from core.vehicle import driver_params
+from simulation.arrivals import ArrivalSchedule, prefill_road
+from simulation.road import Road
+
+logger = logging.getLogger("WaveBreaker.Corridor")
+
+# Au-delà, un worker bloqué (ou mort) casse la barrière pour tous
+BARRIER_TIMEOUT_S = 120.0
+
+
+@dataclass(frozen=True)
+class CorridorIncident:
+    pos_km: float
+    time_s: float
+    duration_s: float = 400.0
+
+
+@dataclass(frozen=True)
+class CorridorSpec:
+    length_km: float = 500.0
+    partitions: int = 8
+    lanes: int = 1
+    incidents: Tuple[CorridorIncident, ...] = (CorridorIncident(100.0, 1200.0), CorridorIncident(350.0, 1800.0))
+    seed: Optional[int] = None
+    penetration_rate: float = 0.2
+    wavebreaker: bool = True
+    # Corridor chargé à t=0 (densité d'équilibre du flux nominal), sinon vide
+    prefill: bool = True
+    nominal_flow: Optional[float] = None
+    backend: Optional[str] = None
+    # Véhicules transférables par partition et par tick
+    handoff_capacity: int = 64
+
+    @property
+    def length_m(self) -> float:
+        return self.length_km * 1000.0
+
+    @property
+    def num_segments(self) -> int:
+        return int(self.length_m / C.road.sensor_spacing)
+
+    @property
+    def flow(self) -> float:
+        return self.nominal_flow if self.nominal_flow is not None else C.sim.nominal_flow
+
+    def segment_range(self, index: int) -> Tuple[int, int]:
+        """Segments [début, fin) de la partition `index` (découpage en parts égales)."""
+        bounds = np.linspace(0, self.num_segments, self.partitions + 1).round().astype(int)
+        return int(bounds[index]), int(bounds[index + 1])
+
+
+class ControlClock:
+    """Cycles de contrôle (même règle que `WaveBreakerBrain._control_due`), déterministes."""
+
+    def __init__(self, period: float):
+        self.period = period
+        self.next_time = 0.0
+
+    def due(self, current_time: float) -> bool:
+        if current_time < self.next_time - 1e-9:
+            return False
+        self.next_time += self.period
+        if self.next_time <= current_time:
+            self.next_time = current_time + self.period
+        return True
+
+
+class CorridorBuffers:
+    """
+    Tableaux NumPy partagés, taillés dans un seul tampon (SharedMemory en
+    mode processus, bytearray en mode séquentiel). Un seul écrivain par
+    champ et par phase ; les barrières du cycle ordonnent lectures et écritures.
+    """
+
+    @staticmethod
+    def _layout(spec: CorridorSpec):
+        P, L, S = spec.partitions, spec.lanes, spec.num_segments
+        return (
+            ("halo", (P, L, 2), np.float64),
+            ("outbox", (P, spec.handoff_capacity, len(COLUMN_NAMES)), np.float64),
+            ("outbox_count", (P,), np.int64),
+            ("lane_occupancy", (L, S), np.int64),
+            ("lane_mean_speeds", (L, S), np.float64),
+            ("lane_densities", (L, S), np.float64),
+            ("occupancy", (S,), np.int64),
+            ("mean_speeds", (S,), np.float64),
+            ("densities", (S,), np.float64),
+            # Par site : (instant du déclenchement, instant de la libération), NaN : pas encore
+            ("incident_state", (max(1, len(spec.incidents)), 2), np.float64),
+            ("speed_map", (S,), np.float64),
+            ("dirty", (S,), np.bool_),
+        )
+
+    @classmethod
+    def nbytes(cls, spec: CorridorSpec) -> int:
+        total = 0
+        for _, shape, dtype in cls._layout(spec):
+            total += -(-math.prod(shape) * np.dtype(dtype).itemsize // 8) * 8
+        return total
+
+    def __init__(self, spec: CorridorSpec, buffer):
+        offset = 0
+        for name, shape, dtype in self._layout(spec):
+            setattr(self, name, np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset))
+            offset += -(-math.prod(shape) * np.dtype(dtype).itemsize // 8) * 8
+
+    def snapshot(self) -> SensorSnapshot:
+        """SensorSnapshot global adossé aux tableaux partagés (sans copie)."""
+        return SensorSnapshot(
+            densities=self.densities, mean_speeds=self.mean_speeds, occupancy=self.occupancy,
+            lane_densities=self.lane_densities, lane_mean_speeds=self.lane_mean_speeds,
+            lane_occupancy=self.lane_occupancy,
+        )
+
+
+class CorridorPartition:
+    """Une portion [début, fin) du corridor : une Road partielle et ses échanges."""
+
+    def __init__(self, spec: CorridorSpec, index: int, buffers: CorridorBuffers):
+        self.spec = spec
+        self.index = index
+        self.buffers = buffers
+        seg_lo, seg_hi = spec.segment_range(index)
+        self.segments = slice(seg_lo, seg_hi)
+        extent = (seg_lo * C.road.sensor_spacing, seg_hi * C.road.sensor_spacing)
+        self.road = Road(f"Corridor_P{index}", backend=spec.backend, integrator="fixed",
+                         lanes=spec.lanes, extent=extent)
+        self.is_last = index == spec.partitions - 1
+        if self.is_last:
+            # Temps de parcours du corridor entier (au-delà des 2 h par défaut)
+            high = max(7200.0, 3.0 * spec.length_m / C.physics.desired_speed)
+            self.road.travel_times = StreamingStats(high=math.ceil(high / 5.0) * 5.0)
+        else:
+            self.road.handoff = self._hand_off
+
+        self.arrivals = ArrivalSchedule(spec.seed, nominal_flow=spec.flow, lanes=spec.lanes) if index == 0 else None
+        self.sites = [(k, inc) for k, inc in enumerate(spec.incidents)
+                      if extent[0] <= inc.pos_km * 1000.0 < extent[1]]
+        self.victims: Dict[int, int] = {}
+        self.orders_sent = 0
+        self.handoffs_out = 0
+        if spec.prefill:
+            self._prefill(extent)
+        self.road.refresh_sensors()
+
+    # ------------------------------------------------------------------
+    # Phase 1 : reprise des transferts et publication
+    # ------------------------------------------------------------------
+    def publish(self) -> None:
+        b = self.buffers
+        fleet = self.road.fleet
+        if self.index > 0:
+            upstream = self.index - 1
+            count = int(b.outbox_count[upstream])
+            if count:
+                fleet.extend_packed(b.outbox[upstream, :count])
+                b.outbox_count[upstream] = 0
+                fleet.ensure_ordered()
+                self.road.refresh_sensors()
+        if self.sites:
+            # Après les capteurs : le snapshot publié reste celui de la fin du tick précédent
+            self._update_incidents(self.road.time)
+
+        snap = self.road.sensors.snapshot
+        seg = self.segments
+        b.lane_occupancy[:, seg] = snap.lane_occupancy
+        b.lane_mean_speeds[:, seg] = snap.lane_mean_speeds
+        b.lane_densities[:, seg] = snap.lane_densities
+        b.occupancy[seg] = snap.occupancy
+        b.mean_speeds[seg] = snap.mean_speeds
+        b.densities[seg] = snap.densities
+
+        # Halo : dernier véhicule de chaque voie (x=inf si voie vide)
+        fleet.lane_tails(out=b.halo[self.index])
+
+    # ------------------------------------------------------------------
+    # Phase 3 : consignes, arrivées, incidents, pas physique
+    # ------------------------------------------------------------------
+    def step(self, dt: float, control: bool) -> None:
+        b = self.buffers
+        road = self.road
+        if control:
+            self.orders_sent += dispatch_orders(road.fleet, b.speed_map, b.dirty)
+
+        now = road.time
+        if self.arrivals is not None and now >= self.arrivals.next_arrival_time:
+            self._spawn_arrivals(now)
+
+        road.boundary_leaders = None if self.is_last else b.halo[self.index + 1]
+        road.update(dt)
+
+    def _hand_off(self, fleet: VehicleFleet, count: int) -> None:
+        if count > self.spec.handoff_capacity:
+            raise RuntimeError(f"Partition {self.index} : {count} transferts en un tick "
+                               f"(capacité {self.spec.handoff_capacity})")
+        fleet.pack_front(count, self.buffers.outbox[self.index])
+        self.buffers.outbox_count[self.index] = count
+        self.handoffs_out += count
+
+    def _spawn_arrivals(self, now: float) -> None:
+        """Mêmes règles que TrafficGenerator (garde d'insertion comprise), sur une seule route (connectés = conduite nominale)."""
+        due = self.arrivals.pop_due(now, self.road.lane_tails())
+        v_init = C.physics.desired_speed
+        for k in range(len(due.variability)):
+            connected = bool(due.connect_draw[k] < self.spec.penetration_rate)
+            params = driver_params(v_init, 1.0 if connected else float(due.variability[k]))
+            self.road.spawn_vehicle(due.rank + k + 1, {
+                'x': float(due.x[k]), 'v': float(due.v[k]), 'lane': int(due.lane[k]), 'is_connected': connected,
+                'entry_time': float(due.entry_time[k]), **params,
+            })
+
+    def _prefill(self, extent: Tuple[float, float]) -> None:
+        """
+        Charge sa portion de la route (`arrivals.prefill_road`, partagé avec
+        le benchmark) : tirages communs à toutes les partitions, le
+        chargement ne dépend pas du découpage.
+        """
+        v0 = C.physics.desired_speed
+        load = prefill_road(self.spec.seed, self.spec.flow, self.spec.length_m, self.spec.lanes)
+        mine = np.flatnonzero((load.x >= extent[0]) & (load.x < extent[1]))
+        for k in mine:
+            connected = bool(load.connect_draw[k] < self.spec.penetration_rate)
+            params = driver_params(v0, 1.0 if connected else float(load.variability[k]))
+            self.road.fleet.spawn(int(load.uid[k]), {
+                'x': float(load.x[k]), 'v': v0, 'lane': int(load.lane[k]), 'is_connected': connected,
+                'entry_time': float(load.entry_time[k]), **params,
+            })
+
+    def _update_incidents(self, now: float) -> None:
+        state = self.buffers.incident_state
+        for site, incident in self.sites:
+            pos_m = incident.pos_km * 1000.0
+            trigger_time, release_time = state[site]
+            if np.isnan(trigger_time):
+                if now < incident.time_s:
+                    continue
+                victim = self.road.first_vehicle_past(pos_m, closest=True)
+                if victim is None:
+                    continue
+                victim.v = 0.0
+                victim.target_speed = 0.0
+                victim.x = pos_m
+                # Un véhicule accidenté n'obéit plus aux consignes V2X
+                victim.is_connected = False
+                self.victims[site] = victim.id
+                state[site, 0] = now
+                logger.warning(f"💥 IMPACT à T={now:.1f}s au Km {incident.pos_km:g} (partition {self.index})")
+            elif np.isnan(release_time) and now >= trigger_time + incident.duration_s:
+                victim = self.road.vehicle_by_id(self.victims.pop(site))
+                if victim is not None:
+                    victim.target_speed = victim.desired_speed
+                state[site, 1] = now
+                logger.info(f"✅ Km {incident.pos_km:g} libéré.")
+
+    def summary(self, compute_s: float, wait_s: float) -> Dict[str, object]:
+        road = self.road
+        return {
+            "partition": self.index,
+            "emitted_co2_kg": road.fleet.emitted_co2_kg,
+            "emitted_fuel_liters": road.fleet.emitted_fuel_liters,
+            # Véhicules en transit (boîte de sortie non encore reprise) comptés par l'émetteur
+            "alive": len(road.fleet) + (0 if self.is_last else int(self.buffers.outbox_count[self.index])),
+            "finished": road.stats_total_vehicles_finished,
+            "travel_times": road.travel_times if self.is_last else None,
+            "handoffs_out": self.handoffs_out,
+            "orders_sent": self.orders_sent,
+            "lane_changes": road.fleet.lane_changes,
+            "compute_s": compute_s,
+            "wait_s": wait_s,
+        }
+
+
+def _partition_worker(spec: CorridorSpec, index: int, shm_name: str, barrier, results, n_ticks: int) -> None:
+    """Boucle d'un worker : phase 1, barrière (+ barrière de contrôle), phase 3, barrière."""
+    shm = SharedMemory(name=shm_name)
+    buffers = partition = None
+    try:
+        buffers = CorridorBuffers(spec, shm.buf)
+        partition = CorridorPartition(spec, index, buffers)
+        clock = ControlClock(C.wavebreaker.control_period)
+        barrier.wait(BARRIER_TIMEOUT_S)
+        compute = wait = 0.0
+        for tick in range(n_ticks):
+            t0 = time.perf_counter()
+            partition.publish()
+            t1 = time.perf_counter()
+            barrier.wait(BARRIER_TIMEOUT_S)
+            control = clock.due(tick * C.sim.dt)
+            if control:
+                barrier.wait(BARRIER_TIMEOUT_S)
+            t2 = time.perf_counter()
+            partition.step(C.sim.dt, control)
+            t3 = time.perf_counter()
+            barrier.wait(BARRIER_TIMEOUT_S)
+            compute += (t1 - t0) + (t3 - t2)
+            wait += (t2 - t1) + (time.perf_counter() - t3)
+        results.put(partition.summary(compute, wait))
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        # Les vues NumPy doivent disparaître avant la fermeture du segment
+        del buffers, partition
+        shm.close()
+
+
+class CorridorRun:
+    """
+    Coordinateur : lance les partitions (processus ou séquentiel), assemble
+    la vue globale des capteurs et tient la loi de commande du corridor.
+    """
+
+    def __init__(self, spec: CorridorSpec):
+        if spec.seed is None:
+            # Graine commune explicite : toutes les partitions tirent les mêmes flux
+            spec = replace(spec, seed=int(np.random.SeedSequence().entropy % (2 ** 63)))
+        if not 1 <= spec.partitions <= spec.num_segments:
+            raise ValueError(f"{spec.partitions} partitions pour {spec.num_segments} segments")
+        if spec.lanes < 1:
+            raise ValueError("Au moins une voie")
+        self.spec = spec
+        self.dt = C.sim.dt
+        self.brains = [WaveBreakerBrain(spec.wavebreaker, num_segments=spec.num_segments) for _ in spec.incidents]
+        self._dispatched_map = np.full(spec.num_segments, np.nan)
+        self.control_cycles = 0
+
+    # ------------------------------------------------------------------
+    # Phase 2 : vue globale et loi de commande
+    # ------------------------------------------------------------------
+    def _control_step(self, buffers: CorridorBuffers, snapshot: SensorSnapshot, current_time: float, tick: int) -> None:
+        """Un cycle de contrôle sur la vue globale ; carte et segments modifiés écrits dans `buffers`."""
+        snapshot.mean_density = float(buffers.occupancy.sum()) / (C.road.sensor_spacing / 1000.0 * self.spec.num_segments)
+        snapshot.tick = tick
+        self.control_cycles += 1
+
+        speed_map = buffers.speed_map
+        speed_map.fill(C.physics.desired_speed)
+        for site, (brain, incident) in enumerate(zip(self.brains, self.spec.incidents)):
+            # Changements d'état vus au cycle suivant (NaN < t est faux)
+            trigger_time, release_time = buffers.incident_state[site]
+            active = trigger_time < current_time and not release_time < current_time
+            brain.set_incident_state(bool(active), 0.0, incident.pos_km * 1000.0)
+            brain.update_speed_map(snapshot, current_time)
+            np.minimum(speed_map, brain.speed_map, out=speed_map)
+        np.not_equal(speed_map, self._dispatched_map, out=buffers.dirty)
+        self._dispatched_map[:] = speed_map
+
+    def run(self, duration: float, processes: bool = True) -> Dict[str, object]:
+        """Simule `duration` secondes ; `processes=False` enchaîne les partitions dans ce processus."""
+        n_ticks = int(round(duration / self.dt))
+        start = time.perf_counter()
+        if processes:
+            summaries = self._run_processes(n_ticks)
+        else:
+            summaries = self._run_sequential(n_ticks)
+        wall = time.perf_counter() - start
+        return self._collect(summaries, wall, n_ticks)
+
+    def _run_sequential(self, n_ticks: int) -> List[Dict[str, object]]:
+        buffers = CorridorBuffers(self.spec, bytearray(CorridorBuffers.nbytes(self.spec)))
+        buffers.incident_state.fill(np.nan)
+        partitions = [CorridorPartition(self.spec, p, buffers) for p in range(self.spec.partitions)]
+        snapshot = buffers.snapshot()
+        clock = ControlClock(C.wavebreaker.control_period)
+        compute = [0.0] * len(partitions)
+        for tick in range(n_ticks):
+            for p in partitions:
+                t0 = time.perf_counter()
+                p.publish()
+                compute[p.index] += time.perf_counter() - t0
+            control = clock.due(tick * self.dt)
+            if control:
+                self._control_step(buffers, snapshot, tick * self.dt, tick)
+            for p in partitions:
+                t0 = time.perf_counter()
+                p.step(self.dt, control)
+                compute[p.index] += time.perf_counter() - t0
+        return [p.summary(compute[p.index], 0.0) for p in partitions]
+
+    def _run_processes(self, n_ticks: int) -> List[Dict[str, object]]:
+        ctx = multiprocessing.get_context()
+        P = self.spec.partitions
+        shm = SharedMemory(create=True, size=CorridorBuffers.nbytes(self.spec))
+        buffers = snapshot = None
+        workers = []
+        try:
+            buffers = CorridorBuffers(self.spec, shm.buf)
+            buffers.incident_state.fill(np.nan)
+            snapshot = buffers.snapshot()
+            barrier = ctx.Barrier(P + 1)
+            results = ctx.Queue()
+            workers = [ctx.Process(target=_partition_worker, name=f"corridor-p{p}", daemon=True,
+                                   args=(self.spec, p, shm.name, barrier, results, n_ticks))
+                       for p in range(P)]
+            for w in workers:
+                w.start()
+            clock = ControlClock(C.wavebreaker.control_period)
+            try:
+                barrier.wait(BARRIER_TIMEOUT_S)
+                for tick in range(n_ticks):
+                    barrier.wait(BARRIER_TIMEOUT_S)
+                    if clock.due(tick * self.dt):
+                        self._control_step(buffers, snapshot, tick * self.dt, tick)
+                        barrier.wait(BARRIER_TIMEOUT_S)
+                    barrier.wait(BARRIER_TIMEOUT_S)
+            except threading.BrokenBarrierError:
+                raise RuntimeError("Un worker du corridor a échoué (voir sa trace ci-dessus)") from None
+            summaries = [results.get(timeout=BARRIER_TIMEOUT_S) for _ in range(P)]
+            for w in workers:
+                w.join()
+            return sorted(summaries, key=lambda s: s["partition"])
+        finally:
+            for w in workers:
+                if w.is_alive():
+                    w.terminate()
+            del buffers, snapshot
+            shm.close()
+            shm.unlink()
+
+    def _collect(self, summaries: List[Dict[str, object]], wall: float, n_ticks: int) -> Dict[str, object]:
+        travel_times = summaries[-1]["travel_times"]
+        finished = summaries[-1]["finished"]
+        compute = [s["compute_s"] for s in summaries]
+        return {
+            "total_co2_kg": sum(s["emitted_co2_kg"] for s in summaries),
+            "total_fuel_liters": sum(s["emitted_fuel_liters"] for s in summaries),
+            "avg_travel_time": travel_times.mean,
+            "vehicle_count": sum(s["alive"] for s in summaries) + finished,
+            "finished": finished,
+            "travel_times": travel_times,
+            "handoffs": sum(s["handoffs_out"] for s in summaries),
+            "orders_sent": sum(s["orders_sent"] for s in summaries),
+            "lane_changes": sum(s["lane_changes"] for s in summaries),
+            "wall_s": wall,
+            "ticks": n_ticks,
+            # Équilibrage : temps de calcul par partition (l'attente = déséquilibre + synchronisation)
+            "partition_compute_s": compute,
+            "partition_wait_s": [s["wait_s"] for s in summaries],
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Corridor long découpé en partitions (un processus par partition)")
+    parser.add_argument("--length", type=float, default=500.0, help="Longueur du corridor (km)")
+    parser.add_argument("--partitions", type=int, nargs="+", default=[8],
+                        help="Nombres de partitions à comparer (ex. 1 2 4 8)")
+    parser.add_argument("--lanes", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=1800.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rate", type=float, default=0.2, help="Taux de pénétration WB")
+    parser.add_argument("--incident", action="append", default=None, metavar="KM:T[:DUREE]",
+                        help="Site d'accident (répétable), ex. 100:1200:400")
+    parser.add_argument("--no-prefill", action="store_true", help="Corridor vide à t=0")
+    parser.add_argument("--sequential", action="store_true", help="Partitions enchaînées dans un seul processus")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format='[%(name)s] %(levelname)s: %(message)s')
+    spec = CorridorSpec(length_km=args.length, lanes=args.lanes, seed=args.seed,
+                        penetration_rate=args.rate, prefill=not args.no_prefill)
+    if args.incident:
+        spec = replace(spec, incidents=tuple(CorridorIncident(*map(float, item.split(":"))) for item in args.incident))
+
+    print(f"Corridor {args.length:g} km, {args.lanes} voie(s), {args.duration:g}s simulées, "
+          f"{len(spec.incidents)} site(s) d'accident")
+    reference = None
+    for partitions in args.partitions:
+        result = CorridorRun(replace(spec, partitions=partitions)).run(args.duration, processes=not args.sequential)
+        reference = reference or result
+        compute = result["partition_compute_s"]
+        print(f"P={partitions:<3} {result['wall_s']:7.2f}s (x{reference['wall_s'] / result['wall_s']:.2f})  "
+              f"CO2 {result['total_co2_kg']:.1f} kg  temps moyen {result['avg_travel_time']:.1f}s  "
+              f"véhicules {result['vehicle_count']}  transferts {result['handoffs']}  "
+              f"calcul/partition max {max(compute):.2f}s moy {np.mean(compute):.2f}s")
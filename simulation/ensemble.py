@@ -0,0 +1,454 @@
+"""
+WAVEBREAKER ENSEMBLE ENGINE (MONTE-CARLO VECTORISÉ)
+---------------------------------------------------
+Avance R répliques du scénario jumeau (Chaos vs WaveBreaker) dans les
+mêmes tableaux NumPy (réplique × véhicule) à chaque tick.
+
+Principe :
+- Le calendrier d'injection est identique pour toutes les répliques
+  (arrivées "regular") : la colonne j est le j-ème véhicule injecté.
+  Les sorties sont masquées (`alive`), le tableau est donc "paddé".
+  La garde d'insertion (bouchon d'entrée) peut retarder une arrivée dans
+  une seule réplique : la colonne y est alors morte dès l'injection.
+- Chaque réplique garde sa graine (variabilité humaine, connectivité),
+  son propre déclenchement/libération d'accident et ses KPIs.
+- Chaque réplique lit le même `ArrivalSchedule(seed)` qu'un run unitaire
+  (`TrafficGenerator(..., seed=seed)`) : une réplique donne les mêmes gains
+  qu'une simulation isolée, aux arrondis près.
+
+Usage : `EnsembleTwinRun(seeds, rate).run(duration)` -> une ligne de KPIs
+par graine (`gain_co2_pct`, `gain_fuel_pct`, `gain_time_pct`, ...).
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+from numpy.typing import NDArray
+
+from config import C
+from core import profiler
+from core.fleet import FLOAT_COLUMNS, LEADER_CUTOFF_M
+from core.kernels import KernelBackend, get_backend
+from core.controller import find_back_of_queue, eco_glide_speed_map
+from core.stats import StreamingStats
+from core.vehicle import driver_params
+from simulation.arrivals import ArrivalSchedule, entry_gap
+
+_INITIAL_CAPACITY = 256
+
+
+class EnsembleRoad:
+    """
+    R répliques d'une route à une voie, colonnes de forme (R, capacité).
+    Les colonnes [head:tail) couvrent tous les véhicules encore vivants dans
+    au moins une réplique ; dans chaque ligne, l'ordre des colonnes est
+    l'ordre des positions (leader à gauche), véhicules sortis en tête.
+    """
+
+    def __init__(self, n_replicas: int, kernels: KernelBackend, capacity: int = _INITIAL_CAPACITY):
+        self.n_replicas = n_replicas
+        self.kernels = kernels
+        self.time = 0.0
+        self.head = 0
+        self.tail = 0
+        shape = (n_replicas, capacity)
+        self.columns: Dict[str, NDArray] = {name: np.zeros(shape) for name in FLOAT_COLUMNS}
+        self.columns['id'] = np.zeros(shape, dtype=np.int64)
+        self.columns['order_segment'] = np.full(shape, -1, dtype=np.int64)
+        self.columns['is_connected'] = np.zeros(shape, dtype=bool)
+        self.columns['alive'] = np.zeros(shape, dtype=bool)
+
+        self.penalty_active = np.zeros(n_replicas, dtype=bool)
+        self.stats_total_vehicles_finished = np.zeros(n_replicas, dtype=np.int64)
+        self.stats_total_co2_kg = np.zeros(n_replicas)
+        self.stats_total_fuel_liters = np.zeros(n_replicas)
+        self.stats_travel_time_sum = np.zeros(n_replicas)
+        self.travel_times = [StreamingStats() for _ in range(n_replicas)]
+
+    def col(self, name: str) -> NDArray:
+        return self.columns[name][:, self.head:self.tail]
+
+    # ------------------------------------------------------------------
+    # Entrées / sorties
+    # ------------------------------------------------------------------
+    def spawn(self, uid, values: Dict[str, NDArray], alive=True) -> None:
+        """
+        Ajoute une colonne : un véhicule par réplique où `alive` est vrai
+        (id `uid`, scalaire ou par réplique). Une colonne morte dans une
+        réplique est rangée en tête au tri suivant.
+        """
+        if self.tail == self.columns['x'].shape[1]:
+            self._make_room()
+        j = self.tail
+        for name, column in self.columns.items():
+            column[:, j] = values.get(name, 0)
+        self.columns['id'][:, j] = uid
+        self.columns['entry_time'][:, j] = values.get('entry_time', self.time)
+        self.columns['alive'][:, j] = alive
+        self.tail += 1
+
+    def tails(self) -> NDArray[np.float64]:
+        """(x, v) du dernier véhicule vivant de chaque réplique, forme (R, 2), (inf, 0) si vide."""
+        out = np.empty((self.n_replicas, 2))
+        out[:, 0] = np.inf
+        out[:, 1] = 0.0
+        if self.tail == self.head:
+            return out
+        key = np.where(self.col('alive'), self.col('x'), np.inf)
+        last = np.argmin(key, axis=1)[:, None]
+        out[:, 0] = np.take_along_axis(key, last, axis=1)[:, 0]
+        present = np.isfinite(out[:, 0])
+        out[present, 1] = np.take_along_axis(self.col('v'), last, axis=1)[present, 0]
+        return out
+
+    def _make_room(self):
+        width = self.tail - self.head
+        capacity = self.columns['x'].shape[1]
+        if width > capacity // 2:
+            capacity *= 2
+        for name, column in self.columns.items():
+            moved = np.zeros((self.n_replicas, capacity), dtype=column.dtype)
+            moved[:, :width] = column[:, self.head:self.tail]
+            self.columns[name] = moved
+        self.head = 0
+        self.tail = width
+
+    def _archive_exits(self):
+        x = self.col('x')
+        alive = self.col('alive')
+        exited = alive & (x >= C.road.length_m)
+        if not exited.any():
+            return
+        self.stats_total_vehicles_finished += exited.sum(axis=1)
+        self.stats_total_co2_kg += np.where(exited, self.col('co2_total'), 0.0).sum(axis=1)
+        self.stats_total_fuel_liters += np.where(exited, self.col('fuel_total'), 0.0).sum(axis=1)
+        durations = self.time - self.col('entry_time')
+        self.stats_travel_time_sum += np.where(exited, durations, 0.0).sum(axis=1)
+        for r in exited.any(axis=1).nonzero()[0]:
+            self.travel_times[r].push_many(durations[r, exited[r]])
+        alive &= ~exited
+
+        # Colonnes sorties dans toutes les répliques : on avance la fenêtre
+        dead_everywhere = ~alive.any(axis=0)
+        n_dead = int(np.argmin(dead_everywhere)) if not dead_everywhere.all() else len(dead_everywhere)
+        self.head += n_dead
+
+    # ------------------------------------------------------------------
+    # Invariant d'ordre (par réplique)
+    # ------------------------------------------------------------------
+    def _restore_order(self):
+        if self.tail - self.head < 2:
+            return
+        key = np.where(self.col('alive'), self.col('x'), np.inf)
+        broken = np.any(key[:, 1:] > key[:, :-1], axis=1)
+        if not broken.any():
+            return
+        rows = broken.nonzero()[0]
+        order = np.argsort(-key[rows], axis=1, kind='stable')
+        h, t = self.head, self.tail
+        for column in self.columns.values():
+            window = column[rows, h:t]
+            column[rows, h:t] = np.take_along_axis(window, order, axis=1)
+
+    # ------------------------------------------------------------------
+    # Physique
+    # ------------------------------------------------------------------
+    def update(self, dt: float) -> None:
+        self.time += dt
+        if self.tail == self.head:
+            return
+        self._restore_order()
+
+        x = self.col('x')
+        v = self.col('v')
+        alive = self.col('alive')
+
+        lead_x = np.full_like(x, np.inf)
+        lead_v = np.zeros_like(v)
+        lead_alive = np.zeros_like(alive)
+        lead_x[:, 1:] = x[:, :-1]
+        lead_v[:, 1:] = v[:, :-1]
+        lead_alive[:, 1:] = alive[:, :-1]
+        has_leader = lead_alive & ((lead_x - x) < LEADER_CUTOFF_M)
+
+        shape = x.shape
+        acc = self.kernels.idm_acceleration(
+            x.ravel(), v.ravel(), self.col('target_speed').ravel(),
+            self.col('params_T').ravel(), self.col('params_a').ravel(), self.col('params_b').ravel(),
+            lead_x.ravel(), lead_v.ravel(), has_leader.ravel(),
+        ).reshape(shape)
+
+        v_new = v + acc * dt
+        stopped = v_new < 0
+        v_new[stopped] = 0.0
+        acc[stopped] = 0.0
+        step_dist = v_new * dt + 0.5 * acc * dt * dt
+
+        # Facteur d'émission par réplique (malus Chaos), appliqué après le noyau
+        factor = np.where(self.penalty_active, 1.45, 1.0)[:, None]
+        co2_instant = self.kernels.emissions(v_new.ravel(), acc.ravel(), dt, 1.0).reshape(shape) * factor
+        fuel_instant = co2_instant * C.physics.fuel_conversion_factor
+
+        v[:] = np.where(alive, v_new, v)
+        self.col('a')[:] = np.where(alive, acc, self.col('a'))
+        step_dist = np.where(alive, step_dist, 0.0)
+        x += step_dist
+        self.col('distance_traveled')[:] += step_dist
+        self.col('co2_instant')[:] = np.where(alive, co2_instant, 0.0)
+        self.col('fuel_instant')[:] = np.where(alive, fuel_instant, 0.0)
+        self.col('co2_total')[:] += self.col('co2_instant')
+        self.col('fuel_total')[:] += self.col('fuel_instant')
+
+        self._archive_exits()
+
+    def mean_speeds(self) -> NDArray[np.float64]:
+        """Vitesse moyenne par segment et par réplique (équivalent SensorNetwork), forme (R, S)."""
+        n_segments = C.road.num_segments
+        idx = (self.col('x') // C.road.sensor_spacing).astype(np.int64)
+        valid = self.col('alive') & (idx >= 0) & (idx < n_segments)
+        flat = (np.arange(self.n_replicas)[:, None] * n_segments + idx)[valid]
+        counts = np.bincount(flat, minlength=self.n_replicas * n_segments)
+        sums = np.bincount(flat, weights=self.col('v')[valid], minlength=self.n_replicas * n_segments)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = np.where(counts > 0, sums / counts, C.vehicle.max_speed_ms)
+        return means.reshape(self.n_replicas, n_segments)
+
+    # ------------------------------------------------------------------
+    # KPIs (mêmes clés que Road.metrics, une valeur par réplique)
+    # ------------------------------------------------------------------
+    @property
+    def metrics(self) -> Dict[str, NDArray]:
+        alive = self.col('alive')
+        finished = self.stats_total_vehicles_finished
+        with np.errstate(divide='ignore', invalid='ignore'):
+            avg_time = np.where(finished > 0, self.stats_travel_time_sum / np.maximum(finished, 1), 0.0)
+        return {
+            "total_co2_kg": self.stats_total_co2_kg + np.where(alive, self.col('co2_total'), 0.0).sum(axis=1),
+            "total_fuel_liters": self.stats_total_fuel_liters + np.where(alive, self.col('fuel_total'), 0.0).sum(axis=1),
+            "avg_travel_time": avg_time,
+            "vehicle_count": alive.sum(axis=1) + finished,
+        }
+
+
+class EnsembleTwinRun:
+    """
+    R scénarios jumeaux complets (Generator + 2 Roads + Brain) vectorisés.
+    Reproduit la boucle headless de batch_run pour chaque graine.
+    """
+
+    def __init__(self, seeds: Sequence[int], penetration_rate: float, backend: Optional[str] = None,
+                 sim_ids: Optional[Sequence[int]] = None, nominal_flow: Optional[float] = None,
+                 incident_pos_km: Optional[float] = None, incident_time: Optional[float] = None,
+                 incident_duration: float = 400.0, preshot_duration: float = 400.0,
+                 time_headway: Optional[float] = None):
+        if C.road.lanes > 1:
+            raise ValueError("Le moteur d'ensemble ne simule qu'une voie (C.road.lanes = 1)")
+        self.seeds = list(seeds)
+        self.sim_ids = list(sim_ids) if sim_ids is not None else list(range(len(self.seeds)))
+        self.n_replicas = len(self.seeds)
+        self.wb_penetration_rate = penetration_rate
+        kernels = get_backend(backend)
+        self.road_chaos = EnsembleRoad(self.n_replicas, kernels)
+        self.road_wb = EnsembleRoad(self.n_replicas, kernels)
+        # Un calendrier par réplique, identique à celui d'un run unitaire de même graine
+        self.arrivals = [ArrivalSchedule(seed, nominal_flow=nominal_flow, gap=entry_gap(time_headway),
+                                         time_headway=time_headway)
+                         for seed in self.seeds]
+        if any(schedule.process != "regular" for schedule in self.arrivals):
+            raise ValueError("Le moteur d'ensemble suppose des arrivées 'regular' (calendrier commun)")
+
+        # --- État Generator ---
+        self.vehicle_id_counter = 0
+        self.time_headway = time_headway
+        self.incident_pos_m = (incident_pos_km if incident_pos_km is not None else C.sim.perturbation_pos) * 1000.0
+        self.incident_time = incident_time if incident_time is not None else C.sim.perturbation_time
+        self.incident_duration = incident_duration
+        self.incident_triggered = np.zeros(self.n_replicas, dtype=bool)
+        self.incident_active = np.zeros(self.n_replicas, dtype=bool)
+        self.crash_start_time = np.zeros(self.n_replicas)
+        self.victim_id = np.full(self.n_replicas, -1, dtype=np.int64)
+
+        # --- État Brain (route WB) ---
+        self.preshot_duration = preshot_duration
+        self.num_segments = C.road.num_segments
+        self.brain_trigger_time = np.zeros(self.n_replicas)
+        self.brain_incident_pos_m = np.zeros(self.n_replicas)
+        self.speed_maps = np.full((self.n_replicas, self.num_segments), C.physics.desired_speed)
+        self.control_period = C.wavebreaker.control_period
+        self.next_control_time = 0.0
+        self.dispatched_maps = np.full((self.n_replicas, self.num_segments), np.nan)
+
+    # ------------------------------------------------------------------
+    # Generator
+    # ------------------------------------------------------------------
+    def _spawn_twin_vehicles(self, current_time: float):
+        v_init = C.physics.desired_speed
+        # Garde d'insertion par réplique, sur sa route Chaos (comme le run unitaire)
+        tails = self.road_chaos.tails()
+        due = [schedule.pop_due(current_time, tails[r:r + 1])
+               for r, schedule in enumerate(self.arrivals)]
+        counts = np.array([len(d.x) for d in due])
+        width = int(counts.max())
+        if width == 0:
+            return
+
+        def padded(name: str, fill: float) -> NDArray:
+            out = np.full((self.n_replicas, width), fill)
+            for r, d in enumerate(due):
+                out[r, :counts[r]] = getattr(d, name)
+            return out
+
+        # Colonne k : k-ième admission de chaque réplique (morte là où il y en a moins)
+        admitted = np.arange(width)[None, :] < counts[:, None]
+        uid = np.array([d.rank for d in due])[:, None] + np.arange(width)[None, :] + 1
+        variability = padded('variability', 1.0)
+        connected = padded('connect_draw', 1.0) < self.wb_penetration_rate
+        entry_x, entry_v, entry_time = padded('x', 0.0), padded('v', v_init), padded('entry_time', current_time)
+
+        for k in range(width):
+            self.vehicle_id_counter = int(uid[admitted[:, k], k].max())
+            var_chaos = variability[:, k]
+            var_wb = np.where(connected[:, k], 1.0, var_chaos)
+            for road, var, is_connected in ((self.road_chaos, var_chaos, np.zeros(self.n_replicas, dtype=bool)),
+                                            (self.road_wb, var_wb, connected[:, k])):
+                road.spawn(np.where(admitted[:, k], uid[:, k], 0), {
+                    'x': entry_x[:, k], 'v': entry_v[:, k], 'entry_time': entry_time[:, k],
+                    **driver_params(v_init, var, self.time_headway),
+                    'is_connected': is_connected,
+                    'order_segment': -1,
+                }, alive=admitted[:, k])
+
+    def _update_generator(self):
+        current_time = self.road_chaos.time
+        if current_time >= min(schedule.next_arrival_time for schedule in self.arrivals):
+            self._spawn_twin_vehicles(current_time)
+
+        pos_m = self.incident_pos_m
+        if current_time >= self.incident_time and not self.incident_triggered.all():
+            candidates = self.road_chaos.col('alive') & (self.road_chaos.col('x') >= pos_m)
+            fire = ~self.incident_triggered & candidates.any(axis=1)
+            for r in fire.nonzero()[0]:
+                victim_id = self.road_chaos.col('id')[r, np.argmax(candidates[r])]
+                self._trigger_crash(r, victim_id, current_time)
+
+        release = self.incident_active & (current_time >= self.crash_start_time + self.incident_duration)
+        if release.any():
+            self._release_crash(release)
+
+    def _trigger_crash(self, r: int, victim_id: int, time: float):
+        self.incident_triggered[r] = True
+        self.incident_active[r] = True
+        self.crash_start_time[r] = time
+        self.victim_id[r] = victim_id
+        self.road_chaos.penalty_active[r] = True
+        self.brain_trigger_time[r] = 0.0
+        self.brain_incident_pos_m[r] = self.incident_pos_m
+        for road in (self.road_chaos, self.road_wb):
+            hit = road.col('alive')[r] & (road.col('id')[r] == victim_id)
+            road.col('v')[r, hit] = 0.0
+            road.col('target_speed')[r, hit] = 0.0
+            road.col('x')[r, hit] = self.incident_pos_m
+
+    def _release_crash(self, release: NDArray[np.bool_]):
+        self.incident_active &= ~release
+        self.brain_incident_pos_m[release] = 0.0
+        for road in (self.road_chaos, self.road_wb):
+            victims = road.col('alive') & (road.col('id') == self.victim_id[:, None]) & release[:, None]
+            target = road.col('target_speed')
+            target[victims] = road.col('desired_speed')[victims]
+        self.victim_id[release] = -1
+
+    # ------------------------------------------------------------------
+    # Brain (vectorisé sur les répliques)
+    # ------------------------------------------------------------------
+    def _control_due(self, current_time: float) -> bool:
+        """Même ordonnancement que `WaveBreakerBrain._control_due` (commun à toutes les répliques)."""
+        if current_time < self.next_control_time - 1e-9:
+            return False
+        self.next_control_time += self.control_period
+        if self.next_control_time <= current_time:
+            self.next_control_time = current_time + self.control_period
+        return True
+
+    def _update_brain(self):
+        current_time = self.road_wb.time
+        if not self._control_due(current_time):
+            return
+        active = self.incident_active
+        self.brain_trigger_time[~active] = 0.0
+        starting = active & (self.brain_trigger_time == 0.0)
+        self.brain_trigger_time[starting] = current_time
+
+        elapsed = current_time - self.brain_trigger_time
+        time_left = np.maximum(1.0, self.preshot_duration - elapsed)
+        if active.any():
+            boq_pos = find_back_of_queue(self.road_wb.mean_speeds(), self.brain_incident_pos_m)
+            self.speed_maps[:] = np.where(active[:, None], eco_glide_speed_map(boq_pos, time_left),
+                                          C.physics.desired_speed)
+        else:
+            self.speed_maps.fill(C.physics.desired_speed)
+
+        # Dispatch différentiel : segments modifiés + véhicules ayant changé de segment
+        dirty = self.speed_maps != self.dispatched_maps
+        self.dispatched_maps[:] = self.speed_maps
+        road = self.road_wb
+        idx = (road.col('x') / C.road.sensor_spacing).astype(np.int64)
+        in_range = road.col('alive') & road.col('is_connected') & (idx >= 0) & (idx < self.num_segments)
+        np.clip(idx, 0, self.num_segments - 1, out=idx)
+        rows = np.broadcast_to(np.arange(self.n_replicas)[:, None], idx.shape)
+        last_segment = road.col('order_segment')
+        orders = in_range & (dirty[rows, idx] | (idx != last_segment))
+        road.col('target_speed')[orders] = self.speed_maps[rows[orders], idx[orders]]
+        last_segment[orders] = idx[orders]
+
+    # ------------------------------------------------------------------
+    # Boucle
+    # ------------------------------------------------------------------
+    def step(self, dt: float) -> None:
+        prof = profiler.active
+        if prof is None:
+            self._update_generator()
+            self.road_chaos.update(dt)
+            self.road_wb.update(dt)
+            self._update_brain()
+            return
+        t = prof.clock()
+        prof.count("vehicle_steps", int(self.road_chaos.col('alive').sum() + self.road_wb.col('alive').sum())
+                   * round(dt / C.sim.dt))
+        self._update_generator()
+        t = prof.lap("ensemble.generator", t)
+        self.road_chaos.update(dt)
+        self.road_wb.update(dt)
+        t = prof.lap("ensemble.roads", t)
+        self._update_brain()
+        prof.lap("ensemble.brain", t)
+        prof.tick()
+
+    def run(self, duration: float, dt: float = C.sim.dt) -> List[Dict[str, float]]:
+        current_time = 0.0
+        while current_time < duration:
+            self.step(dt)
+            current_time += dt
+        return self.results()
+
+    def results(self) -> List[Dict[str, float]]:
+        """Une ligne de KPIs par réplique (même format que batch_run.run_single_simulation)."""
+        m_chaos = self.road_chaos.metrics
+        m_wb = self.road_wb.metrics
+        rows = []
+        for r, sim_id in enumerate(self.sim_ids):
+            gain_co2 = gain_fuel = gain_time = 0.0
+            if m_chaos['total_co2_kg'][r] > 0:
+                gain_co2 = (m_chaos['total_co2_kg'][r] - m_wb['total_co2_kg'][r]) / m_chaos['total_co2_kg'][r] * 100
+                gain_fuel = (m_chaos['total_fuel_liters'][r] - m_wb['total_fuel_liters'][r]) / m_chaos['total_fuel_liters'][r] * 100
+            if m_chaos['avg_travel_time'][r] > 0:
+                gain_time = (m_chaos['avg_travel_time'][r] - m_wb['avg_travel_time'][r]) / m_chaos['avg_travel_time'][r] * 100
+            rows.append({
+                "sim_id": sim_id,
+                "gain_co2_pct": float(gain_co2),
+                "gain_fuel_pct": float(gain_fuel),
+                "gain_time_pct": float(gain_time),
+                "vehicle_count": int(m_chaos['vehicle_count'][r]),
+                "travel_times_chaos": self.road_chaos.travel_times[r],
+                "travel_times_wb": self.road_wb.travel_times[r],
+            })
+        return rows
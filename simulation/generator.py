@@ -1,31 +1,76 @@
 """
 WAVEBREAKER GENERATOR V13 (STRESS FACTOR EDITION)
 -------------------------------------------------
-- Déclenchement : T >= 1200s au Km 30.
-- Durée du crash : 400s.
+- Déclenchement : T >= 1200s au Km 30 (défauts C.sim, réglables par instance).
+- Durée du crash : 400s (idem).
+- Arrivées et attributs pré-tirés par blocs (ArrivalSchedule, flux NumPy
+  indépendants par usage) : les jumeaux partagent le même conducteur et la
+  route Chaos ne dépend plus du taux de pénétration.
+- Entrée dosée (ArrivalSchedule) : chaque véhicule est placé selon son
+  instant d'entrée, à l'espacement d'équilibre du précédent de sa voie ;
+  garde d'insertion sur la queue de la route Chaos (bouchon d'entrée).
+- Recherche de la victime et libération par index (Road.first_vehicle_past,
+  Road.vehicle_by_id) : aucun parcours complet des routes.
+- Scénarios découplés : une seule des deux routes peut être fournie (l'autre
+  à None). La route Chaos ne dépend pas du taux de pénétration ; son
+  accident (victime, instant) est noté dans `incident_record`. Une route WB
+  seule rejoue cet accident (`replay_incident`) et les entrées admises sur
+  Chaos (`replay_entries`, notées dans `entry_log` par une route Chaos
+  seule) : même suite d'événements, donc même résultat qu'en jumeau (voir
+  simulation.baseline).
 """
 
-import random
 import logging
+from typing import NamedTuple, Optional
 from config import C
-from core.vehicle import Vehicle
+from core import profiler
+from core.vehicle import driver_params
+from simulation.arrivals import ArrivalSchedule, EntryLog, entry_gap
 
 logger = logging.getLogger("WaveBreaker.Generator")
 
+
+class IncidentRecord(NamedTuple):
+    """Accident tel qu'il s'est produit sur la route Chaos (victime choisie sur Chaos)."""
+    victim_id: int
+    time: float
+
+
 class TrafficGenerator:
-    def __init__(self, road_chaos, road_wb, brain):
+    def __init__(self, road_chaos, road_wb, brain, seed: Optional[int] = None,
+                 nominal_flow: Optional[float] = None, incident_pos_km: Optional[float] = None,
+                 incident_time: Optional[float] = None, incident_duration: float = 400.0,
+                 time_headway: Optional[float] = None, replay_incident: Optional[IncidentRecord] = None,
+                 replay_entries: Optional[EntryLog] = None):
+        if road_chaos is None and road_wb is None:
+            raise ValueError("Au moins une route (Chaos ou WB) est nécessaire")
         self.road_chaos = road_chaos
         self.road_wb = road_wb
         self.brain = brain
+        self.roads = [road for road in (road_chaos, road_wb) if road is not None]
+        # Horloge : les deux routes avancent du même pas, la première fait foi
+        self._clock = self.roads[0]
         
+        self.arrivals = ArrivalSchedule(seed, nominal_flow=nominal_flow, gap=entry_gap(time_headway),
+                                        time_headway=time_headway)
+        # Entrées : notées par une route Chaos seule, rejouées par une route WB seule
+        self.entry_log: Optional[EntryLog] = EntryLog() if road_wb is None else None
+        self.replay_entries = replay_entries if road_chaos is None else None
         self.vehicle_id_counter = 0
         self.wb_penetration_rate = 0.0
-        self.next_spawn_time = 0.0
+        self.time_headway = time_headway
         
+        # Scénario d'accident (défauts : C.sim)
+        self.incident_pos_km = incident_pos_km if incident_pos_km is not None else C.sim.perturbation_pos
+        self.incident_time = incident_time if incident_time is not None else C.sim.perturbation_time
         self.incident_triggered = False
         self.incident_active = False
         self.crash_start_time = 0.0
-        self.incident_duration = 400.0 
+        self.incident_duration = incident_duration
+        self.incident_victims = []
+        # Route Chaos : accident observé ; route WB seule : accident à rejouer (None = aucun)
+        self.incident_record: Optional[IncidentRecord] = None
+        self.replay_incident = replay_incident
 
     def set_penetration_rate(self, rate_decimal: float):
         """Définit le ratio de véhicules connectés (0.0 à 1.0)."""
@@ -33,43 +78,64 @@ class TrafficGenerator:
         logger.info(f"Taux d'IA activé : {self.wb_penetration_rate*100:.0f}%")
 
     def update(self, dt: float):
-        current_time = self.road_chaos.time
+        prof = profiler.active
+        if prof is not None:
+            t = prof.clock()
+        current_time = self._clock.time
         
         # 1. Injection de trafic constante (Flux aéré)
-        if current_time >= self.next_spawn_time:
-            self._spawn_twin_vehicles()
-            self.next_spawn_time = current_time + (3600.0 / C.sim.nominal_flow)
+        if self.replay_entries is not None:
+            next_entry = ArrivalSchedule.next_replay_time(self.replay_entries, self.arrivals.first_rank)
+        else:
+            next_entry = self.arrivals.next_arrival_time
+        if current_time >= next_entry:
+            self._spawn_twin_vehicles(current_time)
 
         # 2. Déclenchement spatial et temporel
-        if not self.incident_triggered and current_time >= C.sim.perturbation_time:
-            for v in self.road_chaos.vehicles:
-                if v.x >= C.sim.perturbation_pos * 1000.0:
-                    self._trigger_crash(v.id, current_time)
-                    self.incident_triggered = True
-                    self.incident_active = True
-                    self.crash_start_time = current_time
-                    break
+        if not self.incident_triggered and current_time >= self.incident_time:
+            victim_id = self._pick_victim(current_time)
+            if victim_id is not None:
+                self._trigger_crash(victim_id, current_time)
+                self.incident_triggered = True
+                self.incident_active = True
+                self.crash_start_time = current_time
 
         # 3. Libération automatique
         if self.incident_active and current_time >= (self.crash_start_time + self.incident_duration):
             self._release_crash()
+        if prof is not None:
+            prof.lap("generator", t)
+
+    def _pick_victim(self, current_time: float) -> Optional[int]:
+        """Victime choisie sur Chaos ; une route WB seule reprend celle de l'accident rejoué."""
+        if self.road_chaos is not None:
+            victim = self.road_chaos.first_vehicle_past(self.incident_pos_km * 1000.0)
+            return victim.id if victim is not None else None
+        record = self.replay_incident
+        if record is not None and current_time >= record.time:
+            return record.victim_id
+        return None
 
     def _trigger_crash(self, victim_id, time):
         """Active l'accident et le malus de stress sur Chaos."""
-        # Active le facteur x1,3 dans road_chaos.update()
-        self.road_chaos.penalty_active = True
+        self.incident_record = IncidentRecord(int(victim_id), time)
+        if self.road_chaos is not None:
+            # Active le facteur x1,3 dans road_chaos.update()
+            self.road_chaos.penalty_active = True
         
         # Informe le cerveau WB pour lancer l'Eco-Glide (Preshot)
-        self.brain.set_incident_state(True, time + self.incident_duration, C.sim.perturbation_pos * 1000.0)
+        if self.brain is not None:
+            self.brain.set_incident_state(True, time + self.incident_duration, self.incident_pos_km * 1000.0)
         
-        for road in [self.road_chaos, self.road_wb]:
-            for v in road.vehicles:
-                if v.id == victim_id:
-                    v.v = 0.0
-                    v.target_speed = 0.0
-                    v.x = C.sim.perturbation_pos * 1000.0
+        self.incident_victims.append(victim_id)
+        for road in self.roads:
+            v = road.vehicle_by_id(victim_id)
+            if v is not None:
+                v.v = 0.0
+                v.target_speed = 0.0
+                v.x = self.incident_pos_km * 1000.0
         
-        logger.warning(f"💥 IMPACT à T={time:.1f}s au Km {C.sim.perturbation_pos}")
+        logger.warning(f"💥 IMPACT à T={time:.1f}s au Km {self.incident_pos_km}")
 
     def _release_crash(self):
         """Libère la route mais maintient le stress sur Chaos."""
@@ -79,21 +145,42 @@ class TrafficGenerator:
         # sur Chaos même après la fin de l'accident (effet psychologique)
         # self.road_chaos.penalty_active = False 
         
-        self.brain.set_incident_state(False, 0, 0)
+        if self.brain is not None:
+            self.brain.set_incident_state(False, 0, 0)
         
-        for road in [self.road_chaos, self.road_wb]:
-            for v in road.vehicles:
-                if v.v < 1.0: 
+        # Seules les victimes ont une consigne forcée à 0 ; les véhicules connectés
+        # bloqués derrière reçoivent la vitesse libre au cycle suivant du Brain.
+        for road in self.roads:
+            for victim_id in self.incident_victims:
+                v = road.vehicle_by_id(victim_id)
+                if v is not None:
                     v.target_speed = v.desired_speed
+        self.incident_victims.clear()
                     
         logger.info(f"✅ Route libérée.")
 
-    def _spawn_twin_vehicles(self):
-        """Génère des véhicules identiques (Jumeaux numériques)."""
-        self.vehicle_id_counter += 1
+    def _spawn_twin_vehicles(self, current_time: float):
+        """Génère des véhicules identiques (Jumeaux numériques) pour les arrivées échues."""
+        if self.replay_entries is not None:
+            due = self.arrivals.replay_due(self.replay_entries, current_time)
+        else:
+            # Garde d'insertion sur la route Chaos (la route WB seule, à défaut de journal)
+            due = self.arrivals.pop_due(current_time, self.roads[0].lane_tails())
+        if self.entry_log is not None:
+            self.entry_log.record(current_time, due)
         v_init = C.physics.desired_speed
         
-        self.road_chaos.add_vehicle(Vehicle(self.vehicle_id_counter, 0.0, v_init, v_init, False))
-        
-        is_wb = random.random() < self.wb_penetration_rate
-        self.road_wb.add_vehicle(Vehicle(self.vehicle_id_counter, 0.0, v_init, v_init, is_wb))
+        for k in range(len(due.variability)):
+            self.vehicle_id_counter = due.rank + k + 1
+            human = driver_params(v_init, float(due.variability[k]), self.time_headway)
+            entry = {'x': float(due.x[k]), 'v': float(due.v[k]), 'lane': int(due.lane[k]),
+                     'entry_time': float(due.entry_time[k])}
+            if self.road_chaos is not None:
+                self.road_chaos.spawn_vehicle(self.vehicle_id_counter, {**entry, **human})
+            if self.road_wb is None:
+                continue
+
+            # Même conducteur sur la route WB, sauf s'il est connecté (conduite nominale)
+            is_wb = bool(due.connect_draw[k] < self.wb_penetration_rate)
+            params = driver_params(v_init, 1.0, self.time_headway) if is_wb else human
+            self.road_wb.spawn_vehicle(self.vehicle_id_counter, {**entry, 'is_connected': is_wb, **params})
@@ -0,0 +1,364 @@
+"""
+WAVEBREAKER LIVE TWIN (PHYSICS PROCESS)
+---------------------------------------
+Le run interactif sépare la physique de l'affichage : la boucle jumelle
+(Generator, routes, Brain, enregistreur, télémétrie) tourne dans son propre
+processus, à son propre rythme, et publie son état dans un bloc de mémoire
+partagée doublement tamponné (`SharedFrameBuffer`). La fenêtre pygame ne
+fait que relire la dernière trame complète : une frame lente ne ralentit
+plus la physique, une physique lente ne fige plus la fenêtre.
+
+Trame (par route) : temps, nombre de voies, KPIs (METRIC_KEYS), et colonnes
+véhicules x (float64), v, target_speed (float32), is_connected, lane (uint8).
+
+Protocole (un écrivain, un lecteur) :
+- l'écrivain remplit l'emplacement qui n'est pas le dernier publié, encadré
+  par son compteur de séquence (impair pendant l'écriture, pair ensuite),
+  puis publie son indice ;
+- le lecteur copie le dernier emplacement publié et vérifie que son
+  compteur n'a pas bougé (pair et identique avant/après la copie) ; sinon
+  l'écrivain l'a réutilisé entre-temps et la copie est refaite. Une trame
+  déchirée n'est jamais affichée.
+
+Cadence : la physique vise `warp` secondes simulées par seconde réelle
+(0 : au plus vite) et publie au plus `publish_hz` trames par seconde.
+Arrêt : la fenêtre lève le drapeau `stop` ; la physique finit sa trame,
+génère le rapport et lève `done` (également à la fin de la durée prévue).
+"""
+
+import math
+import time
+import logging
+import multiprocessing
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from config import C
+from simulation.telemetry import METRIC_KEYS
+
+logger = logging.getLogger("WaveBreaker.Live")
+
+ROADS = ("chaos", "wb")
+# Colonnes véhicules publiées (nom, dtype)
+FRAME_COLUMNS = (("x", np.float64), ("v", np.float32), ("target_speed", np.float32),
+                 ("is_connected", np.uint8), ("lane", np.uint8))
+# En-tête : emplacement publié (-1 : aucun), séquence de chaque emplacement, drapeaux
+_LATEST, _SEQ0, _STOP, _DONE = 0, 1, 3, 4
+_HEADER_LEN = 8
+# Scalaires par route : n° de trame, temps, véhicules publiés, voies, puis KPIs
+_SCALARS = ("frame", "time", "count", "lanes") + METRIC_KEYS
+
+
+def _aligned(nbytes: int) -> int:
+    return -(-nbytes // 8) * 8
+
+
+def default_capacity() -> int:
+    """Véhicules par route au plus (route saturée pare-chocs contre pare-chocs)."""
+    return math.ceil(C.road.length_m / C.vehicle.length) * C.road.lanes
+
+
+class RoadFrame:
+    """Copie locale d'une route publiée (tableaux tronqués à `count`)."""
+
+    def __init__(self, capacity: int):
+        self.time = 0.0
+        self.lanes = 1
+        self.count = 0
+        self.metrics: Dict[str, float] = {key: 0.0 for key in METRIC_KEYS}
+        self._columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in FRAME_COLUMNS}
+
+    def __getattr__(self, name):
+        # Colonnes véhicules : x, v, target_speed, is_connected, lane
+        columns = self.__dict__.get("_columns")
+        if columns is None or name not in columns:
+            raise AttributeError(name)
+        return columns[name][:self.count]
+
+
+class TwinFrame:
+    """Dernière trame lue : une RoadFrame par route, n° de trame et temps simulé."""
+
+    def __init__(self, capacity: int):
+        self.frame = -1
+        self.chaos = RoadFrame(capacity)
+        self.wb = RoadFrame(capacity)
+
+    @property
+    def time(self) -> float:
+        return self.chaos.time
+
+
+class SharedFrameBuffer:
+    """
+    Double tampon de trames dans un seul bloc SharedMemory. Un écrivain
+    (`write`, processus physique) et un lecteur (`read`, processus UI).
+    """
+
+    def __init__(self, capacity: Optional[int] = None, name: Optional[str] = None):
+        create = name is None
+        if create:
+            capacity = capacity or default_capacity()
+        else:
+            self._shm = SharedMemory(name=name)
+            capacity = int(np.ndarray((1,), dtype=np.int64, buffer=self._shm.buf)[0])
+        road_bytes = _aligned(len(_SCALARS) * 8) + sum(
+            _aligned(capacity * np.dtype(dtype).itemsize) for _, dtype in FRAME_COLUMNS)
+        nbytes = 8 + _HEADER_LEN * 8 + 2 * len(ROADS) * road_bytes
+        if create:
+            self._shm = SharedMemory(create=True, size=nbytes)
+            np.ndarray((1,), dtype=np.int64, buffer=self._shm.buf)[0] = capacity
+        self.capacity = capacity
+        self.name = self._shm.name
+        self._owner = create
+
+        buf = self._shm.buf
+        self.header = np.ndarray((_HEADER_LEN,), dtype=np.int64, buffer=buf, offset=8)
+        offset = 8 + _HEADER_LEN * 8
+        # slots[emplacement][route] = (scalaires, {colonne: tableau})
+        self.slots = []
+        for _ in range(2):
+            roads = {}
+            for road in ROADS:
+                scalars = np.ndarray((len(_SCALARS),), dtype=np.float64, buffer=buf, offset=offset)
+                offset += _aligned(scalars.nbytes)
+                columns = {}
+                for column, dtype in FRAME_COLUMNS:
+                    columns[column] = np.ndarray((capacity,), dtype=dtype, buffer=buf, offset=offset)
+                    offset += _aligned(columns[column].nbytes)
+                roads[road] = (scalars, columns)
+            self.slots.append(roads)
+        if create:
+            self.header[:] = 0
+            self.header[_LATEST] = -1
+        self.frames_written = 0
+        self.torn_reads = 0
+        self._scratch: Optional[TwinFrame] = None
+
+    # --- Écrivain (processus physique) ---
+
+    def write(self, roads: Sequence) -> int:
+        """Publie l'état des routes (chaos, wb) ; retourne le n° de la trame."""
+        latest = int(self.header[_LATEST])
+        slot = 0 if latest < 0 else 1 - latest
+        seq = _SEQ0 + slot
+        self.header[seq] += 1                       # impair : écriture en cours
+        frame = self.frames_written
+        for key, road in zip(ROADS, roads):
+            scalars, columns = self.slots[slot][key]
+            fleet = road.fleet
+            n = len(fleet)
+            # Au-delà de la capacité : sous-échantillonnage régulier (comme la télémétrie)
+            stride = max(1, math.ceil(n / self.capacity))
+            count = len(range(0, n, stride))
+            for column, _ in FRAME_COLUMNS:
+                columns[column][:count] = fleet.col(column)[::stride]
+            metrics = road.metrics
+            scalars[:4] = (frame, road.time, count, road.lanes)
+            scalars[4:] = [metrics[key] for key in METRIC_KEYS]
+        self.header[seq] += 1                       # pair : emplacement complet
+        self.header[_LATEST] = slot
+        self.frames_written += 1
+        return frame
+
+    # --- Lecteur (processus UI) ---
+
+    def read(self, out: TwinFrame, retries: int = 8) -> bool:
+        """
+        Copie la dernière trame complète dans `out`. Retourne False si rien
+        de nouveau (ou aucune copie cohérente) : `out` garde alors la précédente.
+        """
+        if self._scratch is None:
+            self._scratch = TwinFrame(self.capacity)
+        scratch = self._scratch
+        for _ in range(retries):
+            slot = int(self.header[_LATEST])
+            if slot < 0:
+                return False
+            seq = _SEQ0 + slot
+            before = int(self.header[seq])
+            if before & 1:
+                continue
+            frame = int(self.slots[slot][ROADS[0]][0][0])
+            if frame == out.frame:
+                return False
+            values = {}
+            for key in ROADS:
+                scalars, columns = self.slots[slot][key]
+                target = getattr(scratch, key)
+                values[key] = scalars.tolist()
+                count = min(int(values[key][2]), self.capacity)
+                for column, _ in FRAME_COLUMNS:
+                    target._columns[column][:count] = columns[column][:count]
+            if int(self.header[seq]) != before:
+                self.torn_reads += 1   # emplacement réécrit pendant la copie
+                continue
+            for key in ROADS:
+                target = getattr(scratch, key)
+                _, sim_time, count, lanes, *metrics = values[key]
+                target.time = sim_time
+                target.count = int(count)
+                target.lanes = int(lanes)
+                target.metrics = dict(zip(METRIC_KEYS, metrics))
+                target.metrics["vehicle_count"] = int(target.metrics["vehicle_count"])
+            # Échange : `out` reçoit la copie cohérente, l'ancienne sert de brouillon
+            out.chaos, scratch.chaos = scratch.chaos, out.chaos
+            out.wb, scratch.wb = scratch.wb, out.wb
+            out.frame = frame
+            return True
+        return False
+
+    # --- Drapeaux de contrôle ---
+
+    def request_stop(self):
+        self.header[_STOP] = 1
+
+    @property
+    def stop_requested(self) -> bool:
+        return bool(self.header[_STOP])
+
+    def mark_done(self):
+        self.header[_DONE] = 1
+
+    @property
+    def done(self) -> bool:
+        return bool(self.header[_DONE])
+
+    def close(self):
+        """Détache le bloc ; le créateur le détruit."""
+        self.header = self.slots = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+@dataclass(frozen=True)
+class LiveConfig:
+    """Paramètres du run interactif transmis au processus physique."""
+    penetration_rate: float
+    duration: float = 3000.0
+    seed: Optional[int] = None
+    backend: str = C.sim.kernel_backend
+    integrator: str = C.sim.integrator
+    trajectory: Optional[str] = None
+    telemetry_port: Optional[int] = None
+    warp: float = C.sim.time_scale_default
+    publish_hz: float = 2.0 * C.sim.fps
+    report: Optional[str] = "WaveBreaker_Final_Report.png"
+    # Chronométrage par phase (core.profiler) : None désactivé, 0 rapport final, > 0 période (s)
+    profile: Optional[float] = None
+
+
+def run_physics(config: LiveConfig, buffer_name: str) -> None:
+    """Boucle jumelle du processus physique (cible de `LiveTwin`)."""
+    logging.basicConfig(level=logging.INFO, format='[%(name)s] %(levelname)s: %(message)s')
+    from core import kernels, profiler
+    from core.controller import WaveBreakerBrain
+    from simulation.road import Road
+    from simulation.generator import TrafficGenerator
+    from simulation.telemetry import TelemetryServer
+    from analysis.metrics import TwinTrafficRecorder
+    from analysis.trajectory_file import TrajectoryWriter
+
+    kernels.set_default_backend(config.backend)
+    prof = profiler.enable(config.profile or None) if config.profile is not None else None
+    frames = SharedFrameBuffer(name=buffer_name)
+    road_chaos = Road("Scenario_Chaos", integrator=config.integrator)
+    road_wb = Road("Scenario_WaveBreaker", integrator=config.integrator)
+    brain = WaveBreakerBrain(active_scenario=True)
+    generator = TrafficGenerator(road_chaos, road_wb, brain, seed=config.seed)
+    generator.set_penetration_rate(config.penetration_rate)
+    writer = (TrajectoryWriter(config.trajectory, seed=config.seed, incident_time=generator.incident_time,
+                               incident_pos_km=generator.incident_pos_km)
+              if config.trajectory else None)
+    recorder = TwinTrafficRecorder(writer=writer, keep_in_memory=writer is None)
+    telemetry = (TelemetryServer(port=config.telemetry_port, vehicles=True).start()
+                 if config.telemetry_port else None)
+    roads = (road_chaos, road_wb)
+    sim_step = road_chaos.step_dt
+    period = 1.0 / config.publish_hz
+    try:
+        frames.write(roads)
+        start = time.perf_counter()
+        next_publish = start + period
+        while road_chaos.time < config.duration and not frames.stop_requested:
+            generator.update(sim_step)
+            road_chaos.update(sim_step)
+            road_wb.update(sim_step)
+            brain.process(road_wb.sensors.snapshot, road_wb.fleet, road_wb.time)
+            recorder.record_step(road_chaos.time, road_chaos, road_wb)
+            if prof is not None:
+                t = prof.clock()
+            if telemetry is not None:
+                telemetry.publish(road_chaos.time, roads)
+
+            now = time.perf_counter()
+            if now >= next_publish:
+                frames.write(roads)
+                next_publish = now + period
+            if prof is not None:
+                t = prof.lap("live.publish", t)
+            if config.warp > 0:
+                # En avance sur l'horloge murale : attendre (jamais plus d'une période)
+                ahead = road_chaos.time / config.warp - (now - start)
+                if ahead > 0:
+                    time.sleep(min(ahead, period))
+                if prof is not None:
+                    prof.lap("live.pacing", t)
+            if prof is not None:
+                prof.tick()
+        frames.write(roads)
+        if writer is not None and generator.incident_record is not None:
+            writer.record_incident(generator.incident_record.time, generator.incident_record.victim_id)
+        logger.info(f"Physique arrêtée à t={road_chaos.time:.0f}s "
+                    f"({frames.frames_written} trames publiées)")
+        if prof is not None:
+            prof.save("WaveBreaker_Profile_physics.json")
+            logger.info("Profil du processus physique :\n" + prof.report())
+        if config.report:
+            logger.info("Génération du rapport...")
+            try:
+                recorder.generate_comparison_report(road_chaos, road_wb, filename=config.report)
+                logger.info(f"✅ RAPPORT GÉNÉRÉ : '{config.report}'")
+            except Exception as e:
+                logger.error(f"Erreur rapport: {e}")
+    finally:
+        if writer is not None:
+            writer.close()
+        if telemetry is not None:
+            telemetry.stop()
+        frames.mark_done()
+        frames.close()
+
+
+class LiveTwin:
+    """Côté UI : crée le double tampon et lance le processus physique."""
+
+    def __init__(self, config: LiveConfig, capacity: Optional[int] = None):
+        self.config = config
+        self.frames = SharedFrameBuffer(capacity)
+        self.frame = TwinFrame(self.frames.capacity)
+        self.process = multiprocessing.Process(target=run_physics, args=(config, self.frames.name),
+                                               name="WaveBreakerPhysics", daemon=True)
+
+    def start(self) -> 'LiveTwin':
+        self.process.start()
+        return self
+
+    def poll(self) -> bool:
+        """Rafraîchit `self.frame` avec la dernière trame complète ; True si nouvelle."""
+        return self.frames.read(self.frame)
+
+    @property
+    def done(self) -> bool:
+        return self.frames.done or not self.process.is_alive()
+
+    def stop(self, timeout: Optional[float] = None) -> int:
+        """Demande l'arrêt, attend la fin du processus (rapport inclus) ; retourne son code."""
+        self.frames.request_stop()
+        self.process.join(timeout)
+        self.frames.close()
+        return self.process.exitcode
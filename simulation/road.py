@@ -2,101 +2,216 @@
 WAVEBREAKER ROAD MANAGER
 ------------------------
 Gère les véhicules et l'état de 'Crise' (Pénalité conso).
+Les véhicules sont stockés en colonnes NumPy (`VehicleFleet`) et avancés
+en bloc à chaque tick ; `vehicles` expose des vues compatibles `Vehicle`.
+
+Intégrateur (`C.sim.integrator`) :
+- "fixed"     : pas unique `C.sim.dt` pour tous (référence),
+- "multirate" : macro-pas `C.sim.macro_dt`, forme close pour les véhicules
+                à l'équilibre et sous-pas `C.sim.dt` pour les autres
+                (voir `VehicleFleet.advance_multirate`). La boucle appelante
+                avance alors de `road.step_dt` par appel à `update`.
+
+Multi-voies (`C.road.lanes`) : la file reste triée par position sur toute
+la chaussée ; chaque voie est indexée à la volée (tri stable par voie) pour
+les leaders et les changements de voie MOBIL, un sens par tick en alternance.
+
+Route partielle (`extent`, corridor découpé, voir simulation.corridor) :
+la route ne couvre que [début, fin) ; ses capteurs ne voient que ces
+segments, les sortants passent à `handoff` au lieu d'être archivés, et
+`boundary_leaders` donne le leader (hors route) du premier de chaque voie.
 """
 
 import logging
-from operator import attrgetter
-from typing import List, Optional, Dict
+import math
+from itertools import islice
+from typing import Callable, Deque, Dict, Optional, Tuple
 
 from config import C
+from core import profiler
 from core.vehicle import Vehicle
+from core.fleet import VehicleFleet, VehicleView
 from core.infrastructure import SensorNetwork
+from core.stats import StreamingStats
+
+INTEGRATORS = ("fixed", "multirate")
 
 class Road:
-    def __init__(self, name: str):
+    def __init__(self, name: str, backend: Optional[str] = None, integrator: Optional[str] = None,
+                 lanes: Optional[int] = None, extent: Optional[Tuple[float, float]] = None):
         self.name = name
         self.logger = logging.getLogger(f"WaveBreaker.Road.{name}")
+
+        self.integrator = integrator or C.sim.integrator
+        if self.integrator not in INTEGRATORS:
+            raise ValueError(f"Intégrateur inconnu : {self.integrator!r} (choix : {', '.join(INTEGRATORS)})")
+        # Véhicules sous-échantillonnés au dernier macro-pas (diagnostic multirate)
+        self.substepped_count = 0
         
-        self.vehicles: List[Vehicle] = []
-        self.sensors = SensorNetwork()
+        self.lanes = lanes if lanes is not None else C.road.lanes
+        self.fleet = VehicleFleet(backend=backend, lanes=self.lanes)
+
+        # Portion couverte : toute la route par défaut
+        self.start_m, self.exit_m = extent if extent is not None else (0.0, C.road.length_m)
+        first_segment = int(round(self.start_m / C.road.sensor_spacing))
+        num_segments = int(round((self.exit_m - self.start_m) / C.road.sensor_spacing))
+        self.sensors = SensorNetwork(self.lanes, num_segments, first_segment)
+        # Route partielle : reçoit (fleet, nombre de sortants) avant leur retrait
+        self.handoff: Optional[Callable[[VehicleFleet, int], None]] = None
+        # Route partielle : (voies, 2) = (x, v) du leader aval de chaque voie (x=inf si aucun)
+        self.boundary_leaders = None
+        if extent is not None and self.integrator != "fixed":
+            raise ValueError("Une route partielle n'accepte que l'intégrateur 'fixed'")
         self.time: float = 0.0
         self.frame_count: int = 0
         
         self.stats_total_vehicles_finished: int = 0
         self.stats_total_co2_kg: float = 0.0
         self.stats_total_fuel_liters: float = 0.0
+        self.stats_total_travel_time: float = 0.0
         
-        self.finished_travel_times: List[float] = []
-        self._x_getter = attrgetter('x')
+        # Temps de parcours en flux (mémoire bornée, fusionnable entre workers)
+        self.travel_times = StreamingStats()
         
         # Flag activé par le Generator au moment de l'accident
         self.penalty_active = False 
 
-    def add_vehicle(self, vehicle: Vehicle) -> None:
+        # Vérification croisée des accumulateurs de `metrics` (coûteux)
+        self.debug_metrics = C.sim.debug_metrics
+
+    @property
+    def step_dt(self) -> float:
+        """Pas de temps attendu par `update` pour l'intégrateur choisi."""
+        return C.sim.macro_dt if self.integrator == "multirate" else C.sim.dt
+
+    @property
+    def vehicles(self) -> Deque[VehicleView]:
+        """Vues des véhicules présents, triées du leader au dernier."""
+        return self.fleet.views
+
+    def add_vehicle(self, vehicle: Vehicle) -> VehicleView:
         vehicle.entry_time = self.time
-        self.vehicles.append(vehicle)
+        return self.fleet.append(vehicle)
+
+    def spawn_vehicle(self, uid: int, values: Dict[str, float]) -> VehicleView:
+        """Injection directe en colonnes (voir `VehicleFleet.spawn`), horodatée à l'entrée (sauf `entry_time` fourni)."""
+        values.setdefault('entry_time', self.time)
+        return self.fleet.spawn(uid, values)
+
+    def lane_tails(self):
+        """(x, v) du dernier véhicule de chaque voie, forme (voies, 2) (garde d'insertion de l'ArrivalSchedule)."""
+        return self.fleet.lane_tails()
+
+    def vehicle_by_id(self, uid: int) -> Optional[VehicleView]:
+        """Véhicule `uid` s'il est encore sur la route (index id -> ligne, O(1))."""
+        return self.fleet.get(uid)
+
+    def first_vehicle_past(self, pos_m: float, closest: bool = False) -> Optional[VehicleView]:
+        """
+        Premier véhicule (ordre de la file, leader d'abord) ayant franchi `pos_m`.
+        `closest=True` renvoie plutôt le plus proche de `pos_m`. O(log n).
+        """
+        count = self.fleet.count_past(pos_m)
+        if count == 0:
+            return None
+        return self.fleet.view_at(count - 1 if closest else 0)
 
     def update(self, dt: float) -> None:
+        # Chronométrage par phase (core.profiler), désactivé par défaut
+        prof = profiler.active
+        if prof is not None:
+            t = prof.clock()
+            # En pas `C.sim.dt` équivalents : un macro-pas "multirate" compte pour plusieurs
+            prof.count("vehicle_steps", len(self.fleet) * round(dt / C.sim.dt))
         self.time += dt
         self.frame_count += 1
         
-        self.vehicles.sort(key=self._x_getter, reverse=True)
+        # L'ordre est maintenu par construction : on ne fait que le vérifier
+        if not self.fleet.is_ordered():
+            self.logger.debug("Violation d'ordre détectée (T=%.1fs), réordonnancement.", self.time)
+            self.fleet.restore_order()
+        if prof is not None:
+            t = prof.lap("road.order", t)
+
+        if self.lanes > 1:
+            # Gauche et droite en alternance : jamais deux véhicules croisés dans le même trou
+            self.fleet.change_lanes(1 if self.frame_count % 2 else -1, self.time,
+                                    start_m=self.start_m, boundary=self.boundary_leaders)
+            if prof is not None:
+                t = prof.lap("road.lanes", t)
 
         # === DÉCISION DU FACTEUR ===
         # Une fois activé, ce facteur restera à 1.3 tant que penalty_active est True
         current_factor = 1.45 if self.penalty_active else 1.0
 
-        limit_m = C.road.length_m
-        next_vehicles: List[Vehicle] = []
-        
-        count = len(self.vehicles)
-        for i in range(count):
-            veh = self.vehicles[i]
-            
-            lead_vehicle: Optional[Vehicle] = None
-            if i > 0:
-                potential_leader = self.vehicles[i-1]
-                if (potential_leader.x - veh.x) < 1000.0:
-                    lead_vehicle = potential_leader
-
-            # Transmission du facteur au véhicule
-            veh.update_dynamics(dt, lead_vehicle, emission_factor=current_factor)
-            
-            if veh.x < limit_m:
-                next_vehicles.append(veh)
+        # Transmission du facteur à toute la flotte (pas vectoriel)
+        if self.integrator == "multirate":
+            self.substepped_count = self.fleet.advance_multirate(dt, C.sim.dt, emission_factor=current_factor)
+        else:
+            self.fleet.advance(dt, emission_factor=current_factor, boundary=self.boundary_leaders)
+        if prof is not None:
+            t = prof.lap("road.dynamics", t)
+
+        n_exited = self.fleet.count_exited(self.exit_m)
+        if n_exited:
+            if self.handoff is not None:
+                self.handoff(self.fleet, n_exited)
             else:
-                self._archive_vehicle_stats(veh)
+                for veh in islice(self.fleet.views, n_exited):
+                    self._archive_vehicle_stats(veh)
+            self.fleet.pop_front(n_exited)
+        if prof is not None:
+            t = prof.lap("road.archive", t)
+            prof.count("vehicles_exited", n_exited)
+
+        self.refresh_sensors()
+        if prof is not None:
+            prof.lap("road.sensors", t)
 
-        self.vehicles = next_vehicles
-        self.sensors.update(self.vehicles)
+    def refresh_sensors(self) -> None:
+        """Publie un snapshot des capteurs pour l'état courant de la flotte."""
+        self.sensors.update_from_arrays(self.fleet.x, self.fleet.v, self.fleet.col('lane'))
 
-    def _archive_vehicle_stats(self, veh: Vehicle):
+    def _archive_vehicle_stats(self, veh: VehicleView):
         self.stats_total_vehicles_finished += 1
         self.stats_total_co2_kg += veh.co2_total
         self.stats_total_fuel_liters += veh.fuel_total
         
         duration = self.time - veh.entry_time
-        self.finished_travel_times.append(duration)
+        self.stats_total_travel_time += duration
+        self.travel_times.push(duration)
 
     @property
     def metrics(self) -> Dict[str, float]:
-        current_active_co2 = sum(v.co2_total for v in self.vehicles)
-        current_active_fuel = sum(v.fuel_total for v in self.vehicles)
-        
-        total_co2 = self.stats_total_co2_kg + current_active_co2
-        total_fuel = self.stats_total_fuel_liters + current_active_fuel
+        """KPIs en O(1) : lus depuis les accumulateurs tenus par le pas physique et l'archivage."""
+        finished = self.stats_total_vehicles_finished
+
+        metrics = {
+            "total_co2_kg": self.fleet.emitted_co2_kg,
+            "total_fuel_liters": self.fleet.emitted_fuel_liters,
+            "avg_travel_time": self.travel_times.mean,
+            "avg_density": self.sensors.snapshot.mean_density,
+            "vehicle_count": len(self.fleet) + finished
+        }
+        if self.debug_metrics:
+            self._check_metrics(metrics)
+        return metrics
+
+    def _check_metrics(self, metrics: Dict[str, float]) -> None:
+        """Recalcul complet (ancienne méthode) et comparaison aux accumulateurs."""
+        current_active_co2 = float(self.fleet.col('co2_total').sum())
+        current_active_fuel = float(self.fleet.col('fuel_total').sum())
         
-        if self.finished_travel_times:
-            avg_time = sum(self.finished_travel_times) / len(self.finished_travel_times)
-        else:
-            avg_time = 0.0
-            
-        avg_density = self.sensors.snapshot.densities.mean()
+        finished = self.stats_total_vehicles_finished
+        avg_time = self.stats_total_travel_time / finished if finished else 0.0
 
-        return {
-            "total_co2_kg": total_co2,
-            "total_fuel_liters": total_fuel,
+        expected = {
+            "total_co2_kg": self.stats_total_co2_kg + current_active_co2,
+            "total_fuel_liters": self.stats_total_fuel_liters + current_active_fuel,
             "avg_travel_time": avg_time,
-            "avg_density": avg_density,
-            "vehicle_count": len(self.vehicles) + self.stats_total_vehicles_finished
-        }
\ No newline at end of file
+            "avg_density": float(self.sensors.snapshot.densities.mean()),
+            "vehicle_count": len(self.fleet) + self.stats_total_vehicles_finished
+        }
+        for key, value in expected.items():
+            if not math.isclose(metrics[key], value, rel_tol=1e-6, abs_tol=1e-9):
+                raise AssertionError(f"[{self.name}] Accumulateur '{key}' = {metrics[key]!r}, recalcul = {value!r}")
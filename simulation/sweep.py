@@ -0,0 +1,508 @@
+"""
+WAVEBREAKER PARAMETER SWEEP
+---------------------------
+Balayage de scénarios (grille ou liste) × graines, exécuté comme une seule
+file de tâches sur un pool de processus.
+
+- `Scenario`     : paramètres d'une étude (taux de pénétration, flux nominal,
+                   position/instant/durée de l'accident, durée PRESHOT,
+                   temps inter-véhiculaire, durée simulée). Défauts = config.
+- `scenario_grid`: produit cartésien des axes fournis.
+- `ResultsTable` : table JSON Lines, une ligne par run terminé, écrite dès
+                   réception (flush + fsync). Une ligne tronquée par une
+                   interruption est ignorée puis écrasée.
+- `run_sweep`    : reprise automatique, les runs déjà présents dans la
+                   table (scénario, intégrateur, moteur, graine) sont sautés.
+
+Démarrage à chaud (moteurs "warm*", voir simulation.checkpoint) : le
+remplissage 0 -> instant de l'accident ne dépend que de PREFIX_FIELDS.
+Chaque tâche simule ce préfixe une fois par graine, le capture, puis
+bifurque toutes les variantes post-accident (position et durée de
+l'accident, PRESHOT, durée) depuis une copie du checkpoint :
+- "warm"        : préfixe par taux de pénétration, résultats identiques
+                  aux runs complets,
+- "warm-shared" : un seul préfixe pour tous les taux. Il est simulé à
+                  taux nul (route WB = route Chaos), puis les véhicules
+                  présents dont le tirage de connectivité passe sous le taux
+                  deviennent connectés (conduite nominale) à la bifurcation.
+                  Route Chaos exacte ; route WB statistiquement équivalente
+                  (pré-accident, le Brain ne diffuse que la vitesse libre).
+
+Référence Chaos en cache (moteur "cached", voir simulation.baseline) : la
+route Chaos est simulée une fois par clé (graine, config, demande,
+accident) et relue du cache disque ; seule la route WB est simulée par
+variante, avec des gains identiques au run jumeau.
+
+Graine d'un run : `sim_id * 12345` (comme le batch historique) ; le
+résultat ne dépend ni du worker ni de l'ordre d'exécution.
+"""
+
+import os
+import json
+import time
+import hashlib
+import itertools
+import logging
+import multiprocessing
+from dataclasses import dataclass, asdict, fields, replace
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from config import C
+from core import kernels, profiler
+from core.controller import WaveBreakerBrain
+from core.stats import StreamingStats
+from core.vehicle import driver_params
+from simulation.road import Road
+from simulation.generator import TrafficGenerator
+from simulation.ensemble import EnsembleTwinRun
+from simulation.arrivals import ArrivalSchedule
+from simulation import checkpoint
+from simulation.checkpoint import TwinState
+from simulation.baseline import SEED_STRIDE, BASELINE_FIELDS, BaselineCache, ChaosBaseline
+from simulation.telemetry import TelemetryServer
+
+logger = logging.getLogger("WaveBreaker.Sweep")
+
+# Valeurs StreamingStats d'une ligne (sérialisées via to_dict/from_dict)
+STATS_KEYS = ("travel_times_chaos", "travel_times_wb")
+# Paramètres qui façonnent le remplissage pré-accident (clé du démarrage à chaud)
+PREFIX_FIELDS = ("nominal_flow", "time_headway", "incident_time")
+ENGINES = ("single", "ensemble", "warm", "warm-shared", "cached")
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """Paramètres d'un scénario jumeau ; les graines sont fournies à part."""
+    penetration_rate: float = 0.20
+    nominal_flow: float = C.sim.nominal_flow
+    incident_pos_km: float = C.sim.perturbation_pos
+    incident_time: float = C.sim.perturbation_time
+    incident_duration: float = 400.0
+    preshot_duration: float = 400.0
+    time_headway: float = C.physics.time_headway
+    duration: float = 2500.0
+
+    def __post_init__(self):
+        # Tout en float : 1800 et 1800.0 donnent la même empreinte (JSON "1800" != "1800.0")
+        for f in fields(self):
+            object.__setattr__(self, f.name, float(getattr(self, f.name)))
+
+    @property
+    def scenario_id(self) -> str:
+        """Empreinte stable des paramètres (clé de reprise)."""
+        blob = json.dumps(asdict(self), sort_keys=True)
+        return hashlib.sha1(blob.encode()).hexdigest()[:12]
+
+    @property
+    def label(self) -> str:
+        """Libellé court : seulement les paramètres différents des défauts."""
+        changed = [f"{f.name}={getattr(self, f.name):g}" for f in fields(self)
+                   if getattr(self, f.name) != f.default]
+        return ", ".join(changed) or "défaut"
+
+
+def scenario_grid(**axes: Sequence[float]) -> List[Scenario]:
+    """Produit cartésien : `scenario_grid(penetration_rate=[0.1, 0.2], nominal_flow=[600, 900])`."""
+    known = {f.name for f in fields(Scenario)}
+    unknown = set(axes) - known
+    if unknown:
+        raise ValueError(f"Paramètres de scénario inconnus : {sorted(unknown)}")
+    names = list(axes)
+    return [Scenario(**dict(zip(names, values))) for values in itertools.product(*(axes[n] for n in names))]
+
+
+def load_scenarios(path: str) -> List[Scenario]:
+    """Liste explicite de scénarios : fichier JSON (liste d'objets, champs omis = défauts)."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [Scenario(**entry) for entry in json.load(f)]
+
+
+def build_twin(scenario: Scenario, sim_id: int, integrator: str = C.sim.integrator) -> TwinState:
+    """Scénario jumeau prêt à tourner (Generator + 2 Roads + Brain), graine `sim_id * SEED_STRIDE`."""
+    seed = sim_id * SEED_STRIDE
+    road_chaos = Road(f"Sim{sim_id}_Chaos", integrator=integrator)
+    road_wb = Road(f"Sim{sim_id}_WB", integrator=integrator)
+    brain = WaveBreakerBrain(active_scenario=True, preshot_duration=scenario.preshot_duration)
+    generator = TrafficGenerator(road_chaos, road_wb, brain, seed=seed,
+                                 nominal_flow=scenario.nominal_flow,
+                                 incident_pos_km=scenario.incident_pos_km,
+                                 incident_time=scenario.incident_time,
+                                 incident_duration=scenario.incident_duration,
+                                 time_headway=scenario.time_headway)
+    generator.set_penetration_rate(scenario.penetration_rate)
+    return TwinState(road_chaos, road_wb, brain, generator)
+
+
+def advance_twin(state: TwinState, until: float, telemetry: Optional[TelemetryServer] = None) -> None:
+    """
+    Boucle headless jusqu'à `until` (temps simulé) ; reprend là où l'état
+    s'est arrêté. `telemetry` : diffusion en direct (sans effet sans client).
+    """
+    road_chaos, road_wb, brain, generator = state
+    roads = (road_chaos, road_wb)
+    dt = road_chaos.step_dt
+    prof = profiler.active
+    while road_chaos.time < until:
+        generator.update(dt)
+        road_chaos.update(dt)
+        road_wb.update(dt)
+        brain.process(road_wb.sensors.snapshot, road_wb.fleet, road_wb.time)
+        if telemetry is not None:
+            telemetry.publish(road_chaos.time, roads)
+        if prof is not None:
+            prof.tick()
+
+
+def twin_row(state: TwinState, sim_id: int) -> Dict[str, Any]:
+    """Gains relatifs (%) Chaos vs WB et distributions de temps de parcours."""
+    return gain_row(sim_id, state.road_chaos.metrics, state.road_wb.metrics,
+                    state.road_chaos.travel_times, state.road_wb.travel_times)
+
+
+def gain_row(sim_id: int, m_chaos: Dict[str, float], m_wb: Dict[str, float],
+             travel_chaos: StreamingStats, travel_wb: StreamingStats) -> Dict[str, Any]:
+    gain_co2 = gain_fuel = gain_time = 0.0
+    if m_chaos['total_co2_kg'] > 0:
+        gain_co2 = (m_chaos['total_co2_kg'] - m_wb['total_co2_kg']) / m_chaos['total_co2_kg'] * 100
+        gain_fuel = (m_chaos['total_fuel_liters'] - m_wb['total_fuel_liters']) / m_chaos['total_fuel_liters'] * 100
+    if m_chaos['avg_travel_time'] > 0:
+        gain_time = (m_chaos['avg_travel_time'] - m_wb['avg_travel_time']) / m_chaos['avg_travel_time'] * 100
+
+    return {
+        "sim_id": sim_id,
+        "gain_co2_pct": gain_co2,
+        "gain_fuel_pct": gain_fuel,
+        "gain_time_pct": gain_time,
+        "vehicle_count": m_chaos['vehicle_count'],
+        "travel_times_chaos": travel_chaos,
+        "travel_times_wb": travel_wb,
+    }
+
+
+def run_scenario(scenario: Scenario, sim_id: int, integrator: str = C.sim.integrator,
+                 telemetry: Optional[TelemetryServer] = None) -> Dict[str, Any]:
+    """Un run jumeau headless complet (Chaos vs WB) du scénario pour la graine `sim_id`."""
+    state = build_twin(scenario, sim_id, integrator)
+    advance_twin(state, scenario.duration, telemetry)
+    return twin_row(state, sim_id)
+
+
+def run_ensemble(scenario: Scenario, sim_ids: Sequence[int]) -> List[Dict[str, Any]]:
+    """Même chose pour un paquet de graines avancées ensemble (`EnsembleTwinRun`, pas fixe)."""
+    ensemble = EnsembleTwinRun([sim_id * SEED_STRIDE for sim_id in sim_ids], scenario.penetration_rate,
+                               sim_ids=sim_ids, nominal_flow=scenario.nominal_flow,
+                               incident_pos_km=scenario.incident_pos_km,
+                               incident_time=scenario.incident_time,
+                               incident_duration=scenario.incident_duration,
+                               preshot_duration=scenario.preshot_duration,
+                               time_headway=scenario.time_headway)
+    return ensemble.run(scenario.duration)
+
+
+def run_against_baseline(scenario: Scenario, sim_id: int, baseline: ChaosBaseline,
+                         integrator: str = C.sim.integrator,
+                         telemetry: Optional[TelemetryServer] = None) -> Dict[str, Any]:
+    """Route WB seule (accident et entrées de la référence rejoués), gains contre la référence Chaos."""
+    road_wb = Road(f"Sim{sim_id}_WB", integrator=integrator)
+    brain = WaveBreakerBrain(active_scenario=True, preshot_duration=scenario.preshot_duration)
+    generator = TrafficGenerator(None, road_wb, brain, seed=sim_id * SEED_STRIDE,
+                                 nominal_flow=scenario.nominal_flow,
+                                 incident_pos_km=scenario.incident_pos_km,
+                                 incident_time=scenario.incident_time,
+                                 incident_duration=scenario.incident_duration,
+                                 time_headway=scenario.time_headway,
+                                 replay_incident=baseline.incident, replay_entries=baseline.entries)
+    generator.set_penetration_rate(scenario.penetration_rate)
+    dt = road_wb.step_dt
+    prof = profiler.active
+    while road_wb.time < scenario.duration:
+        generator.update(dt)
+        road_wb.update(dt)
+        brain.process(road_wb.sensors.snapshot, road_wb.fleet, road_wb.time)
+        if telemetry is not None:
+            telemetry.publish(road_wb.time, (road_wb,))
+        if prof is not None:
+            prof.tick()
+    return gain_row(sim_id, baseline.metrics, road_wb.metrics, baseline.travel_times, road_wb.travel_times)
+
+
+# État du worker (fixé par l'initialiseur du pool) : cache des références
+# Chaos et serveur de télémétrie (un port par worker)
+_baseline_cache: Optional[BaselineCache] = None
+_baseline_trajectories = False
+_telemetry: Optional[TelemetryServer] = None
+
+
+def _init_worker(backend: str, cache: Optional[BaselineCache], trajectories: bool,
+                 telemetry_port: Optional[int] = None, workers: int = 1, profile: bool = False) -> None:
+    global _baseline_cache, _baseline_trajectories, _telemetry
+    kernels.set_default_backend(backend)
+    if profile:
+        profiler.enable()
+    _baseline_cache = cache
+    _baseline_trajectories = trajectories
+    if telemetry_port is not None:
+        try:
+            _telemetry = TelemetryServer(port=telemetry_port).start(port_search=workers)
+        except OSError as exc:
+            logger.warning(f"Télémétrie indisponible dans ce worker : {exc}")
+
+
+def run_cached(scenarios: Sequence[Scenario], sim_id: int, integrator: str = C.sim.integrator,
+               cache: Optional[BaselineCache] = None, trajectories: bool = False) -> List[Dict[str, Any]]:
+    """Une référence Chaos (cache ou simulée) pour des scénarios de même clé, puis une route WB par scénario."""
+    cache = cache if cache is not None else _baseline_cache
+    if cache is None:
+        raise RuntimeError("Moteur 'cached' sans cache de références Chaos")
+    baseline = cache.get_or_run(scenarios[0], sim_id, integrator,
+                                trajectories=trajectories or _baseline_trajectories)
+    return [run_against_baseline(scenario, sim_id, baseline, integrator, _telemetry) for scenario in scenarios]
+
+
+# ----------------------------------------------------------------------
+# Démarrage à chaud
+# ----------------------------------------------------------------------
+def prefix_key(scenario: Scenario, share_rates: bool) -> Tuple[float, ...]:
+    """Scénarios de même clé partagent le remplissage pré-accident."""
+    key = tuple(getattr(scenario, name) for name in PREFIX_FIELDS)
+    return key if share_rates else key + (scenario.penetration_rate,)
+
+
+def warm_up(scenario: Scenario, sim_id: int, integrator: str = C.sim.integrator,
+            share_rates: bool = False, until: Optional[float] = None) -> bytes:
+    """
+    Simule le préfixe commun jusqu'à l'instant de l'accident (exclu : le
+    déclenchement a lieu au premier pas de la variante) et le capture.
+    """
+    if share_rates:
+        scenario = replace(scenario, penetration_rate=0.0)
+    state = build_twin(scenario, sim_id, integrator)
+    advance_twin(state, scenario.incident_time if until is None else until)
+    return checkpoint.capture(state)
+
+
+def _connect_fleet(state: TwinState, scenario: Scenario) -> None:
+    """
+    Préfixe partagé (simulé à taux nul) : applique le taux de la variante
+    aux véhicules déjà présents sur la route WB, avec leurs propres tirages
+    de connectivité (rejoués depuis la graine, rang = id - 1).
+    """
+    generator = state.generator
+    # Sans dosage (gap nul) : toutes les arrivées échues, au moins celles déjà entrées
+    replay = ArrivalSchedule(generator.arrivals.seed, nominal_flow=generator.arrivals.nominal_flow, gap=0.0)
+    draws = replay.pop_due(state.road_chaos.time).connect_draw
+    fleet = state.road_wb.fleet
+    connected = draws[fleet.col('id') - 1] < scenario.penetration_rate
+    nominal = driver_params(C.physics.desired_speed, 1.0, generator.time_headway)
+    for name, value in nominal.items():
+        fleet.col(name)[connected] = value
+    fleet.col('is_connected')[:] = connected
+    generator.set_penetration_rate(scenario.penetration_rate)
+
+
+def fork(blob: bytes, scenario: Scenario, share_rates: bool = False) -> TwinState:
+    """Copie fraîche du préfixe, paramétrée pour la variante post-accident `scenario`."""
+    state = checkpoint.restore(blob)
+    state.brain.preshot_duration = scenario.preshot_duration
+    generator = state.generator
+    generator.incident_pos_km = scenario.incident_pos_km
+    generator.incident_duration = scenario.incident_duration
+    if share_rates:
+        _connect_fleet(state, scenario)
+    return state
+
+
+def run_warm(scenarios: Sequence[Scenario], sim_id: int, integrator: str = C.sim.integrator,
+             share_rates: bool = False) -> List[Dict[str, Any]]:
+    """Un préfixe pour la graine `sim_id`, puis une bifurcation par scénario (même clé de préfixe)."""
+    until = min(scenarios[0].incident_time, min(s.duration for s in scenarios))
+    blob = warm_up(scenarios[0], sim_id, integrator, share_rates, until)
+    rows = []
+    for scenario in scenarios:
+        state = fork(blob, scenario, share_rates)
+        advance_twin(state, scenario.duration, _telemetry)
+        rows.append(twin_row(state, sim_id))
+    return rows
+
+
+# ----------------------------------------------------------------------
+# Table de résultats
+# ----------------------------------------------------------------------
+RunKey = Tuple[str, str, str, int]   # (scenario_id, integrator, engine, sim_id)
+
+
+def run_key(row: Dict[str, Any]) -> RunKey:
+    return row["scenario_id"], row["integrator"], row["engine"], int(row["sim_id"])
+
+
+class ResultsTable:
+    """Table JSON Lines en ajout seul ; une ligne = un run terminé."""
+
+    def __init__(self, path: str, fresh: bool = False):
+        self.path = path
+        self.rows: List[Dict[str, Any]] = []
+        if fresh and os.path.exists(path):
+            os.remove(path)
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        valid_bytes = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break   # dernière ligne tronquée (interruption pendant l'écriture)
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    break
+                self.rows.append(self._decode(row))
+                valid_bytes += len(line)
+        if valid_bytes != os.path.getsize(self.path):
+            logger.warning(f"{self.path} : fin de fichier invalide ignorée ({len(self.rows)} runs conservés)")
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_bytes)
+
+    @staticmethod
+    def _decode(row: Dict[str, Any]) -> Dict[str, Any]:
+        for key in STATS_KEYS:
+            if key in row:
+                row[key] = StreamingStats.from_dict(row[key])
+        return row
+
+    @staticmethod
+    def _encode(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value.to_dict() if isinstance(value, StreamingStats) else value
+                for key, value in row.items()}
+
+    @property
+    def done(self) -> Set[RunKey]:
+        return {run_key(row) for row in self.rows}
+
+    def append(self, row: Dict[str, Any]) -> None:
+        """Écrit une ligne et la force sur disque avant de rendre la main."""
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self._encode(row)) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.rows.append(row)
+
+
+# ----------------------------------------------------------------------
+# File de tâches
+# ----------------------------------------------------------------------
+Job = Tuple[Tuple[Scenario, ...], Tuple[int, ...], str, str]   # (scénarios, sim_ids, intégrateur, moteur)
+
+
+def _run_job(job: Job) -> Tuple[List[Dict[str, Any]], Optional[profiler.PhaseProfiler]]:
+    """
+    Exécute une tâche dans un worker : un run, un paquet de graines (ensemble)
+    ou un préfixe et ses variantes (démarrage à chaud). Retourne ses lignes
+    et, si le worker est profilé, les mesures de la tâche (agrégées par le parent).
+    """
+    scenarios, sim_ids, integrator, engine = job
+    start = time.perf_counter()
+    if engine == "ensemble":
+        rows = run_ensemble(scenarios[0], sim_ids)
+        owners = [scenarios[0]] * len(rows)
+    elif engine in ("warm", "warm-shared"):
+        rows = run_warm(scenarios, sim_ids[0], integrator, share_rates=engine == "warm-shared")
+        owners = list(scenarios)
+    elif engine == "cached":
+        rows = run_cached(scenarios, sim_ids[0], integrator)
+        owners = list(scenarios)
+    else:
+        rows = [run_scenario(scenarios[0], sim_ids[0], integrator, _telemetry)]
+        owners = [scenarios[0]]
+    wall = (time.perf_counter() - start) / len(rows)
+    for row, scenario in zip(rows, owners):
+        row.update(asdict(scenario), scenario_id=scenario.scenario_id, integrator=integrator,
+                   engine=engine, seed=row["sim_id"] * SEED_STRIDE, wall_s=wall)
+    return rows, profiler.active.snapshot() if profiler.active is not None else None
+
+
+def plan_jobs(scenarios: Sequence[Scenario], sim_ids: Sequence[int], done: Set[RunKey] = frozenset(),
+              integrator: str = C.sim.integrator, engine: str = "single", ensemble: int = 1) -> List[Job]:
+    """
+    Tâches restantes. En mode ensemble, les graines restantes d'un même
+    scénario sont groupées par paquets de `ensemble` ; à chaud (ou avec
+    référence en cache), une tâche regroupe par graine les variantes
+    restantes d'une même clé de préfixe (ou de référence Chaos).
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Moteur inconnu : {engine!r} (choix : {', '.join(ENGINES)})")
+    if engine == "ensemble":
+        integrator = "fixed"
+    pending = lambda scenario, sim_id: (scenario.scenario_id, integrator, engine, sim_id) not in done
+
+    jobs: List[Job] = []
+    if engine in ("warm", "warm-shared", "cached"):
+        groups: Dict[Tuple[float, ...], List[Scenario]] = {}
+        for scenario in scenarios:
+            if engine == "cached":
+                key = tuple(getattr(scenario, name) for name in BASELINE_FIELDS)
+            else:
+                key = prefix_key(scenario, engine == "warm-shared")
+            groups.setdefault(key, []).append(scenario)
+        for group in groups.values():
+            for sim_id in sim_ids:
+                todo = tuple(s for s in group if pending(s, sim_id))
+                if todo:
+                    jobs.append((todo, (sim_id,), integrator, engine))
+        return jobs
+
+    size = ensemble if engine == "ensemble" else 1
+    for scenario in scenarios:
+        todo = [s for s in sim_ids if pending(scenario, s)]
+        for i in range(0, len(todo), size):
+            jobs.append(((scenario,), tuple(todo[i:i + size]), integrator, engine))
+    return jobs
+
+
+def run_sweep(scenarios: Sequence[Scenario], sim_ids: Sequence[int], table: ResultsTable,
+              integrator: str = C.sim.integrator, engine: str = "single", ensemble: int = 1,
+              processes: Optional[int] = None,
+              backend: str = C.sim.kernel_backend, baseline_cache: Optional[BaselineCache] = None,
+              baseline_trajectories: bool = False, telemetry_port: Optional[int] = None,
+              progress: Optional[Callable[[Iterable], Iterator]] = None,
+              profile: Optional[profiler.PhaseProfiler] = None) -> int:
+    """
+    Lance les runs absents de `table` sur un pool et écrit chaque run à sa
+    réception. Retourne le nombre de runs exécutés. `progress` enveloppe
+    l'itérateur de résultats (ex. tqdm), appelé avec `total=` nombre de tâches.
+    Moteur "cached" : `baseline_cache` (références Chaos), partagé par les workers.
+    `telemetry_port` : chaque worker diffuse son run en cours sur le premier
+    port libre de [telemetry_port, telemetry_port + workers).
+    `profile` : les workers chronomètrent leurs phases (core.profiler), les
+    mesures de chaque tâche y sont fusionnées à réception.
+    """
+    jobs = plan_jobs(scenarios, sim_ids, table.done, integrator, engine, ensemble)
+    if not jobs:
+        return 0
+    skipped = len(scenarios) * len(sim_ids) - sum(len(job[0]) * len(job[1]) for job in jobs)
+    if skipped:
+        logger.info(f"Reprise : {skipped} runs déjà présents dans {table.path}")
+
+    workers = processes or max(1, multiprocessing.cpu_count() - 1)
+    workers = min(workers, len(jobs))
+    # Runs de plusieurs secondes : paquets courts pour garder l'équilibrage
+    # en fin de file et une écriture régulière de la table
+    chunksize = max(1, min(4, len(jobs) // (workers * 8)))
+    executed = 0
+    if engine == "cached" and baseline_cache is None:
+        raise ValueError("Le moteur 'cached' nécessite un baseline_cache")
+    # Backend et cache propagés aux workers (indispensable en mode 'spawn')
+    with multiprocessing.Pool(processes=workers, initializer=_init_worker,
+                              initargs=(backend, baseline_cache, baseline_trajectories,
+                                        telemetry_port, workers, profile is not None)) as pool:
+        results = pool.imap_unordered(_run_job, jobs, chunksize=chunksize)
+        if progress is not None:
+            results = progress(results, total=len(jobs))
+        for rows, part in results:
+            for row in rows:
+                table.append(row)
+            executed += len(rows)
+            if profile is not None and part is not None:
+                profile.merge(part)
+                profile.tick()
+    return executed
@@ -0,0 +1,286 @@
+"""
+WAVEBREAKER LIVE TELEMETRY
+--------------------------
+Serveur local optionnel (TCP, asyncio) qui diffuse l'état d'un run en
+cours : capteurs (`SensorSnapshot`), KPIs (`Road.metrics`) et, en option,
+positions décimées des véhicules. Observer un run headless ou batch ne
+passe plus par la fenêtre pygame.
+
+- La boucle asyncio tourne dans un thread démon : la simulation ne fait
+  qu'appeler `publish()` entre deux pas.
+- Sans client connecté, `publish()` se limite à un test : coût nul.
+- Cadence bornée (`rate_hz`, horloge murale) : une trame au plus par période.
+- Contre-pression : chaque client a une file de `queue_frames` trames. Si
+  elle est pleine (client lent), la plus ancienne est jetée : le client
+  saute des trames, la simulation n'attend jamais.
+
+Trame (petit-boutiste), précédée de sa longueur (uint32) :
+    b"WBTM" | uint16 version | uint16 n_routes | float64 temps | uint32 n°
+    puis par route :
+        uint8 len | nom utf-8 | uint16 segments | uint16 flags | uint32 n_véhicules
+        float64[5] KPIs (METRIC_KEYS)
+        float32[S] densité (veh/km) | float32[S] vitesse moyenne (km/h) | uint16[S] occupation
+        si flags & VEHICLES : float32[n] pos_km | float32[n] vitesse km/h
+                              uint8[n] connecté | uint8[n] voie
+
+Usage :
+    python -m simulation.telemetry serve --seed 1 --rate 0.2 [--vehicles]
+    python -m simulation.telemetry watch [--port 8765]
+"""
+
+import math
+import time
+import socket
+import struct
+import asyncio
+import logging
+import threading
+import numpy as np
+from typing import Dict, Iterator, Optional, Sequence, Set
+
+logger = logging.getLogger("WaveBreaker.Telemetry")
+
+DEFAULT_PORT = 8765
+MAGIC = b"WBTM"
+VERSION = 1
+METRIC_KEYS = ("total_co2_kg", "total_fuel_liters", "avg_travel_time", "avg_density", "vehicle_count")
+FLAG_VEHICLES = 1
+
+_LEN = struct.Struct("<I")
+_HEADER = struct.Struct("<4sHHdI")
+_ROAD = struct.Struct("<HHI")
+_METRICS = struct.Struct(f"<{len(METRIC_KEYS)}d")
+
+
+def encode_frame(seq: int, sim_time: float, roads: Sequence, max_vehicles: int = 0) -> bytes:
+    """Trame binaire des routes ; `max_vehicles` > 0 ajoute au plus autant de véhicules (pas régulier)."""
+    parts = [_HEADER.pack(MAGIC, VERSION, len(roads), sim_time, seq)]
+    for road in roads:
+        name = road.name.encode("utf-8")[:255]
+        snap = road.sensors.snapshot
+        fleet = road.fleet
+        n_segments = len(snap.densities)
+        stride = max(1, math.ceil(len(fleet) / max_vehicles)) if max_vehicles > 0 else 0
+        n_vehicles = len(range(0, len(fleet), stride)) if stride else 0
+        metrics = road.metrics
+        parts += [
+            bytes((len(name),)), name,
+            _ROAD.pack(n_segments, FLAG_VEHICLES if stride else 0, n_vehicles),
+            _METRICS.pack(*(float(metrics[key]) for key in METRIC_KEYS)),
+            snap.densities.astype("<f4").tobytes(),
+            (snap.mean_speeds * 3.6).astype("<f4").tobytes(),
+            np.minimum(snap.occupancy, 65535).astype("<u2").tobytes(),
+        ]
+        if stride:
+            parts += [
+                (fleet.x[::stride] / 1000.0).astype("<f4").tobytes(),
+                (fleet.v[::stride] * 3.6).astype("<f4").tobytes(),
+                fleet.col('is_connected')[::stride].astype("<u1").tobytes(),
+                fleet.col('lane')[::stride].astype("<u1").tobytes(),
+            ]
+    return b"".join(parts)
+
+
+def decode_frame(frame: bytes) -> Dict:
+    """Inverse de `encode_frame` : {'seq', 'time', 'roads': [{'name', 'metrics', ...}]}."""
+    magic, version, n_roads, sim_time, seq = _HEADER.unpack_from(frame, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Trame de télémétrie invalide ({magic!r}, v{version})")
+    offset = _HEADER.size
+    roads = []
+    for _ in range(n_roads):
+        name_len = frame[offset]
+        name = frame[offset + 1:offset + 1 + name_len].decode("utf-8")
+        offset += 1 + name_len
+        n_segments, flags, n_vehicles = _ROAD.unpack_from(frame, offset)
+        offset += _ROAD.size
+        road = {"name": name, "metrics": dict(zip(METRIC_KEYS, _METRICS.unpack_from(frame, offset)))}
+        offset += _METRICS.size
+        for key, dtype, count in (("densities", "<f4", n_segments), ("mean_speeds_kmh", "<f4", n_segments),
+                                  ("occupancy", "<u2", n_segments)):
+            road[key] = np.frombuffer(frame, dtype=dtype, count=count, offset=offset)
+            offset += road[key].nbytes
+        if flags & FLAG_VEHICLES:
+            for key, dtype in (("pos_km", "<f4"), ("speed_kmh", "<f4"), ("is_connected", "<u1"), ("lane", "<u1")):
+                road[key] = np.frombuffer(frame, dtype=dtype, count=n_vehicles, offset=offset)
+                offset += road[key].nbytes
+        roads.append(road)
+    return {"seq": seq, "time": sim_time, "roads": roads}
+
+
+class TelemetryServer:
+    """
+    Diffuseur TCP local. `start()` lance la boucle asyncio dans un thread
+    démon ; la simulation appelle `publish(temps, routes)` à chaque pas.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, rate_hz: float = 5.0,
+                 vehicles: bool = False, max_vehicles: int = 2000, queue_frames: int = 2):
+        self.host = host
+        self.port = port
+        self.period = 1.0 / rate_hz
+        self.max_vehicles = max_vehicles if vehicles else 0
+        self.queue_frames = queue_frames
+        self.frames_built = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self._clients: Set[asyncio.Queue] = set()
+        self._next_frame = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._server = None
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    # ------------------------------------------------------------------
+    # Cycle de vie (thread de la simulation)
+    # ------------------------------------------------------------------
+    def start(self, port_search: int = 1) -> 'TelemetryServer':
+        """Démarre l'écoute sur le premier port libre de [port, port + port_search)."""
+        self._thread = threading.Thread(target=self._run, args=(port_search,),
+                                        name="WaveBreaker-Telemetry", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        logger.info(f"Télémétrie : tcp://{self.host}:{self.port} ({1.0 / self.period:g} trames/s max)")
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None and self._thread is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5.0)
+
+    def __enter__(self) -> 'TelemetryServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    @property
+    def clients(self) -> int:
+        return len(self._clients)
+
+    def publish(self, sim_time: float, roads: Sequence) -> bool:
+        """Envoie une trame si un client écoute et si la période est écoulée ; ne bloque jamais."""
+        if not self._clients:
+            return False
+        now = time.monotonic()
+        if now < self._next_frame:
+            return False
+        self._next_frame = now + self.period
+        frame = encode_frame(self.frames_built, sim_time, roads, self.max_vehicles)
+        self.frames_built += 1
+        self._loop.call_soon_threadsafe(self._broadcast, _LEN.pack(len(frame)) + frame)
+        return True
+
+    # ------------------------------------------------------------------
+    # Boucle asyncio (thread de télémétrie)
+    # ------------------------------------------------------------------
+    def _run(self, port_search: int) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        try:
+            for port in range(self.port, self.port + max(1, port_search)):
+                try:
+                    self._server = loop.run_until_complete(asyncio.start_server(self._serve_client, self.host, port))
+                    break
+                except OSError as exc:
+                    self._error = exc
+            else:
+                return
+            self._error = None
+            self.port = self._server.sockets[0].getsockname()[1]
+        finally:
+            self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self._server.close()
+            for task in asyncio.all_tasks(loop):
+                task.cancel()
+            loop.run_until_complete(asyncio.sleep(0))
+            loop.close()
+
+    def _broadcast(self, frame: bytes) -> None:
+        for queue in self._clients:
+            if queue.full():
+                # Client lent : on jette la plus ancienne trame en attente
+                queue.get_nowait()
+                self.frames_dropped += 1
+            queue.put_nowait(frame)
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_frames)
+        self._clients.add(queue)
+        peer = writer.get_extra_info("peername")
+        logger.info(f"Télémétrie : client {peer} connecté")
+        try:
+            while True:
+                frame = await queue.get()
+                writer.write(frame)
+                await writer.drain()
+                self.frames_sent += 1
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.discard(queue)
+            writer.close()
+            logger.info(f"Télémétrie : client {peer} déconnecté")
+
+
+def read_frames(host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> Iterator[Dict]:
+    """Client bloquant minimal : itère sur les trames décodées jusqu'à la fermeture du serveur."""
+    with socket.create_connection((host, port)) as sock:
+        stream = sock.makefile("rb")
+        while True:
+            size = stream.read(_LEN.size)
+            if len(size) < _LEN.size:
+                return
+            frame = stream.read(_LEN.unpack(size)[0])
+            yield decode_frame(frame)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Télémétrie WaveBreaker en direct")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Run jumeau headless diffusé en direct")
+    serve.add_argument("--seed", type=int, default=1, help="sim_id (graine = sim_id * 12345)")
+    serve.add_argument("--rate", type=float, default=0.2, help="Taux de pénétration WB")
+    serve.add_argument("--duration", type=float, default=2500.0)
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--hz", type=float, default=5.0, help="Trames par seconde (max)")
+    serve.add_argument("--vehicles", action="store_true", help="Ajoute les positions décimées des véhicules")
+    serve.add_argument("--realtime", type=float, default=0.0, metavar="X",
+                       help="Ralentit le run à X fois le temps réel (0 = au plus vite)")
+    watch = sub.add_parser("watch", help="Affiche les trames reçues")
+    watch.add_argument("--host", default="127.0.0.1")
+    watch.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='[%(name)s] %(levelname)s: %(message)s')
+    if args.command == "serve":
+        from simulation.sweep import Scenario, build_twin, advance_twin
+
+        state = build_twin(Scenario(penetration_rate=args.rate, duration=args.duration), args.seed)
+        with TelemetryServer(port=args.port, rate_hz=args.hz, vehicles=args.vehicles) as server:
+            start = time.perf_counter()
+            step = state.road_chaos.step_dt
+            while state.road_chaos.time < args.duration:
+                advance_twin(state, state.road_chaos.time + step, telemetry=server)
+                if args.realtime > 0:
+                    lag = state.road_chaos.time / args.realtime - (time.perf_counter() - start)
+                    if lag > 0:
+                        time.sleep(lag)
+            print(f"Run terminé : {server.frames_built} trames construites, {server.frames_sent} envoyées, "
+                  f"{server.frames_dropped} jetées (clients lents)")
+    else:
+        for frame in read_frames(args.host, args.port):
+            summary = "  ".join(
+                f"{road['name']}: CO2 {road['metrics']['total_co2_kg']:8.1f} kg, "
+                f"{road['metrics']['vehicle_count']:5.0f} veh, v_min {road['mean_speeds_kmh'].min():5.1f} km/h"
+                for road in frame["roads"])
+            print(f"#{frame['seq']:<6} T={frame['time']:7.1f}s  {summary}")
@@ -4,6 +4,8 @@ WAVEBREAKER DASHBOARD (DELL G16 OPTIMIZED)
 - Résolution cible : 2560x1600.
 - Widgets agrandis pour la lisibilité haute résolution.
 - Polices proportionnelles pour éviter l'effet "texte minuscule".
+- Coût par frame constant : chrome, textes et courbes en cache, défilement
+  incrémental des courbes (voir ComparativeChart).
 """
 
 import pygame
@@ -17,6 +19,22 @@ COLOR_TEXT_V_DIM = (120, 120, 120)
 COLOR_TEXT_DIM = (180, 180, 180)
 
 class ComparativeChart:
+    """
+    Courbe comparative Chaos / WB. Tout ce qui ne change pas est mis en cache :
+    - chrome (fond, bordure, titre) rendu une fois ;
+    - textes rendus seulement quand leur valeur affichée change ;
+    - courbes tracées dans une surface dédiée, décalée de `step_x` px à
+      chaque point une fois l'historique plein, seul le nouveau segment est
+      dessiné. Retracé complet uniquement quand l'échelle (max_val_seen) change ;
+      elle est prise avec une marge (RESCALE_HEADROOM) : les cumuls croissants
+      ne la font changer que rarement, pas à chaque point.
+    """
+
+    LINE_WIDTH = 3
+    RESCALE_HEADROOM = 1.25
+    COLOR_CHAOS = (231, 76, 60)
+    COLOR_WB = (46, 204, 113)
+
     def __init__(self, title, unit, x, y, w, h):
         self.rect = pygame.Rect(x, y, w, h)
         self.title = title
@@ -32,19 +50,75 @@ class ComparativeChart:
         self.font_val = pygame.font.SysFont("Consolas", 18)
         self.font_delta = pygame.font.SysFont("Segoe UI", 28, bold=True)
 
+        # Chrome : fond opaque, bordure plus épaisse (2px) et titre
+        self.chrome = pygame.Surface((w, h), pygame.SRCALPHA)
+        self.chrome.fill(COLOR_BG_WIDGET)
+        pygame.draw.rect(self.chrome, COLOR_BORDER, self.chrome.get_rect(), 2)
+        self.chrome.blit(self.font_title.render(self.title, True, COLOR_TEXT_DIM), (20, 15))
+        if pygame.display.get_surface() is not None:
+            self.chrome = self.chrome.convert_alpha()   # format de l'écran : blit plus rapide
+
+        # Zone des courbes : on laisse de la place pour les textes en haut (offset 80px)
+        self.step_x = w / self.history_len
+        self.plot_h = h - 90
+        margin = self.LINE_WIDTH
+        self.plot_rect = pygame.Rect(x, y + h - 15 - self.plot_h - margin, w, self.plot_h + 2 * margin)
+        self.base_y = self.plot_h + margin          # ordonnée de la valeur 0 dans la surface
+        self.plot = pygame.Surface(self.plot_rect.size, pygame.SRCALPHA)
+        self._pushed = 0            # points reçus depuis le début
+        self._drawn = 0             # points déjà tracés dans `plot`
+        self._scale_y = None        # échelle de `plot` (None : retracé complet requis)
+        self._texts = {}            # emplacement -> (texte, surface)
+
     def push(self, val_chaos, val_wb):
         self.data_chaos.append(val_chaos)
         self.data_wb.append(val_wb)
+        self._pushed += 1
         current_max = max(val_chaos, val_wb)
         if current_max > self.max_val_seen:
-            self.max_val_seen = current_max
+            self.max_val_seen = current_max * self.RESCALE_HEADROOM
+            self._scale_y = None
+
+    def _text(self, slot, font, text, color):
+        """Surface du texte, rendue à nouveau seulement si sa valeur change."""
+        cached = self._texts.get(slot)
+        if cached is None or cached[0] != (text, color):
+            cached = ((text, color), font.render(text, True, color))
+            self._texts[slot] = cached
+        return cached[1]
+
+    def _point(self, i, val):
+        return (i * self.step_x, self.base_y - val * self._scale_y)
+
+    def _redraw_plot(self):
+        """Retracé complet (changement d'échelle ou retard supérieur à l'historique)."""
+        self._scale_y = self.plot_h / (self.max_val_seen if self.max_val_seen > 0 else 1)
+        self.plot.fill((0, 0, 0, 0))
+        for data, color in ((self.data_chaos, self.COLOR_CHAOS), (self.data_wb, self.COLOR_WB)):
+            if len(data) > 1:
+                pts = [self._point(i, val) for i, val in enumerate(data)]
+                pygame.draw.lines(self.plot, color, False, pts, self.LINE_WIDTH)
+        self._drawn = self._pushed
+
+    def _advance_plot(self):
+        """Trace les points en attente : décalage si l'historique était plein, puis nouveau segment."""
+        first = self._pushed - len(self.data_chaos)      # n° du plus ancien point de l'historique
+        for p in range(self._drawn, self._pushed):
+            i = p - first                                # indice dans l'historique
+            pos = min(p, self.history_len - 1)           # colonne du point dans `plot`
+            if p >= self.history_len:
+                # Historique plein : tout glisse d'un pas vers la gauche
+                self.plot.scroll(-round(self.step_x), 0)
+                x_prev = int(self._point(pos - 1, 0)[0])
+                self.plot.fill((0, 0, 0, 0), (x_prev + 1, 0, self.plot_rect.w - x_prev - 1, self.plot_rect.h))
+            if p >= 1:
+                for data, color in ((self.data_chaos, self.COLOR_CHAOS), (self.data_wb, self.COLOR_WB)):
+                    pygame.draw.line(self.plot, color, self._point(pos - 1, data[i - 1]),
+                                     self._point(pos, data[i]), self.LINE_WIDTH)
+        self._drawn = self._pushed
 
     def draw(self, surface):
-        # Fond Opaque
-        bg_surf = pygame.Surface((self.rect.w, self.rect.h), pygame.SRCALPHA)
-        bg_surf.fill(COLOR_BG_WIDGET)
-        surface.blit(bg_surf, self.rect.topleft)
-        pygame.draw.rect(surface, COLOR_BORDER, self.rect, 2) # Bordure plus épaisse (2px)
+        surface.blit(self.chrome, self.rect.topleft)
 
         # Textes et KPI
         if self.data_chaos:
@@ -54,43 +128,28 @@ class ComparativeChart:
             saving = 0.0
             if last_c > 0.1: saving = ((last_c - last_w) / last_c) * 100.0
                 
-            header = f"{self.title}"
             vals = f"CHAOS: {last_c:.1f}{self.unit}  vs  WB: {last_w:.1f}{self.unit}"
             delta = f"SAVING: {saving:+.1f}%"
             
-            t_surf = self.font_title.render(header, True, COLOR_TEXT_DIM)
-            v_surf = self.font_val.render(vals, True, COLOR_TEXT_V_DIM)
+            v_surf = self._text("vals", self.font_val, vals, COLOR_TEXT_V_DIM)
             
             # Couleur dynamique du gain
             col_save = (46, 204, 113) if saving >= 0 else (231, 76, 60)
-            d_surf = self.font_delta.render(delta, True, col_save)
+            d_surf = self._text("delta", self.font_delta, delta, col_save)
             
             # Positionnement sur G16 (Margins augmentées)
-            surface.blit(t_surf, (self.rect.x + 20, self.rect.y + 15))
             surface.blit(v_surf, (self.rect.x + 20, self.rect.y + 50))
             surface.blit(d_surf, (self.rect.right - d_surf.get_width() - 20, self.rect.y + 20))
 
         # Graphiques
         if len(self.data_chaos) < 2: return
 
-        # On laisse de la place pour les textes en haut (offset 80px)
-        scale_x = self.rect.w / self.history_len
-        scale_y = (self.rect.h - 90) / (self.max_val_seen if self.max_val_seen > 0 else 1)
-        base_y = self.rect.bottom - 15
-
-        pts_chaos = []
-        for i, val in enumerate(self.data_chaos):
-            pts_chaos.append((self.rect.x + i*scale_x, base_y - val*scale_y))
-            
-        pts_wb = []
-        for i, val in enumerate(self.data_wb):
-            pts_wb.append((self.rect.x + i*scale_x, base_y - val*scale_y))
-
-        # Courbes plus épaisses pour la haute résolution
-        if len(pts_chaos) > 1:
-            pygame.draw.lines(surface, (231, 76, 60), False, pts_chaos, 3)
-        if len(pts_wb) > 1:
-            pygame.draw.lines(surface, (46, 204, 113), False, pts_wb, 3)
+        pending = self._pushed - self._drawn
+        if self._scale_y is None or pending >= self.history_len:
+            self._redraw_plot()
+        elif pending:
+            self._advance_plot()
+        surface.blit(self.plot, self.plot_rect.topleft)
 
 class Dashboard:
     def __init__(self, screen_size):
@@ -0,0 +1,124 @@
+"""
+WAVEBREAKER VEHICLE RASTERIZER
+------------------------------
+Couche véhicules dessinée directement dans un tableau de pixels (x, y) de
+couleurs déjà converties au format de la surface cible (`Palette`, uint32),
+destiné à `pygame.surfarray.blit_array` : couleurs, positions et barres
+calculées en NumPy, sans appel pygame ni branche Python par véhicule.
+
+Deux niveaux de détail :
+- exact (véhicules <= colonnes de pixels) : une barre par véhicule, comme
+  l'ancien tracé (humains 2 px colorés par vitesse, IA 8 px néon) ;
+- agrégé (plus de véhicules que de colonnes) : une barre par colonne et par
+  voie. Hauteur = densité (pleine hauteur à la densité de bouchon), couleur
+  = vitesse minimale de la colonne, repères néon aux extrémités si la
+  colonne contient un véhicule connecté.
+Le coût reste ainsi borné par la taille de l'écran, pas par la flotte.
+"""
+
+import numpy as np
+from typing import NamedTuple, Sequence, Tuple
+
+from config import C
+
+# Seuils de vitesse (m/s) et couleurs associées : bouchon, ralenti, fluide
+SPEED_THRESHOLDS = np.array([15.0 / 3.6, 70.0 / 3.6])
+SPEED_COLORS = (C.display.COLOR_SCENARIO_1, (241, 196, 15), (200, 200, 200))
+
+HUMAN_WIDTH = 2
+CONNECTED_WIDTH = 8
+# Hauteur des repères néon du mode agrégé (px, à chaque extrémité)
+CONNECTED_TICK = 3
+
+
+class Palette(NamedTuple):
+    """Couleurs au format de la surface : une par classe de vitesse, et le néon IA."""
+    speed: np.ndarray
+    neon: np.uint32
+
+
+def pack_rgb(rgb: Tuple[int, int, int], shifts: Sequence[int] = (16, 8, 0)) -> np.uint32:
+    """Couleur (r, g, b) convertie selon les décalages de canaux de la surface (`get_shifts()`)."""
+    return np.uint32(sum(int(c) << int(shift) for c, shift in zip(rgb, shifts)))
+
+
+def make_palette(shifts: Sequence[int] = (16, 8, 0)) -> Palette:
+    speed = np.array([pack_rgb(rgb, shifts) for rgb in SPEED_COLORS], dtype=np.uint32)
+    return Palette(speed, pack_rgb(C.display.COLOR_IA_NEON, shifts))
+
+
+def speed_colors(v: np.ndarray, palette: Palette) -> np.ndarray:
+    """Couleur de chaque vitesse selon SPEED_THRESHOLDS."""
+    return palette.speed[np.searchsorted(SPEED_THRESHOLDS, v, side="right")]
+
+
+def paint_spans(layer: np.ndarray, xs: np.ndarray, cy: np.ndarray, half, colors: np.ndarray,
+                inner: int = -1) -> None:
+    """
+    Segments verticaux d'un pixel de large : colonne `xs`, lignes `cy` ± d
+    pour `inner` < d <= `half` (scalaire ou par segment, borné au cadre).
+    Parcours ligne par ligne : seuls les pixels couverts sont écrits, et à
+    colonne égale le dernier segment l'emporte (ordre du tracé d'origine).
+    """
+    height = layer.shape[1]
+    half = np.minimum(np.broadcast_to(half, xs.shape), np.minimum(cy, height - 1 - cy))
+    order = np.argsort(-half, kind="stable")
+    xs, cy, half, colors = xs[order], cy[order], half[order], colors[order]
+    # active[d] : nombre de segments (préfixe trié) de demi-hauteur >= d
+    active = np.searchsorted(-half, -np.arange(int(half.max(initial=-1)) + 1), side="right")
+    for d in range(max(inner + 1, 0), len(active)):
+        k = active[d]
+        layer[xs[:k], cy[:k] + d] = colors[:k]
+        if d:
+            layer[xs[:k], cy[:k] - d] = colors[:k]
+
+
+def paint_bars(layer: np.ndarray, px: np.ndarray, cy: np.ndarray, half: int, width: int,
+               colors: np.ndarray) -> None:
+    """Barres verticales de `width` px centrées en (px, cy), demi-hauteur `half` (découpées au cadre)."""
+    xs = (px[:, None] + (np.arange(width) - width // 2)[None, :]).ravel()
+    inside = (xs >= 0) & (xs < layer.shape[0])
+    paint_spans(layer, xs[inside], np.repeat(cy, width)[inside], half,
+                np.repeat(np.broadcast_to(colors, px.shape), width)[inside])
+
+
+def rasterize_vehicles(layer: np.ndarray, x: np.ndarray, v: np.ndarray, is_connected: np.ndarray,
+                       lane: np.ndarray, lane_centers: np.ndarray, scale_x: float,
+                       half_human: int, half_connected: int, jam_per_column: float,
+                       palette: Palette) -> bool:
+    """
+    Dessine les véhicules dans `layer` (largeur, hauteur). `lane_centers`
+    donne l'ordonnée de chaque voie dans la couche. Retourne True si le mode
+    agrégé a été utilisé.
+    """
+    width = layer.shape[0]
+    px = np.clip((x * scale_x).astype(np.int64), 0, width - 1)
+    if len(px) <= width:
+        cy = lane_centers[lane]
+        connected = is_connected.astype(bool)
+        human = ~connected
+        paint_bars(layer, px[human], cy[human], half_human, HUMAN_WIDTH, speed_colors(v[human], palette))
+        # IA dessinées par-dessus les humains
+        paint_bars(layer, px[connected], cy[connected], half_connected, CONNECTED_WIDTH, palette.neon)
+        return False
+
+    lanes = len(lane_centers)
+    key = lane.astype(np.int64) * width + px
+    count = np.bincount(key, minlength=lanes * width).reshape(lanes, width)
+    v_min = np.full(lanes * width, np.inf, dtype=v.dtype)   # même dtype : chemin rapide de minimum.at
+    np.minimum.at(v_min, key, v)
+    v_min = v_min.reshape(lanes, width)
+    has_connected = np.bincount(key, weights=is_connected.astype(np.float64),
+                                minlength=lanes * width).reshape(lanes, width) > 0
+
+    # Demi-hauteur proportionnelle à la densité de la colonne
+    half = np.clip(np.rint(half_connected * count / jam_per_column), 1, half_connected).astype(np.int64)
+    columns = np.arange(width)
+    for k in range(lanes):
+        filled = count[k] > 0
+        cy = np.full(int(filled.sum()), lane_centers[k])
+        paint_spans(layer, columns[filled], cy, half[k][filled], speed_colors(v_min[k][filled], palette))
+        ticks = has_connected[k]
+        paint_spans(layer, columns[ticks], np.full(int(ticks.sum()), lane_centers[k]), half_connected,
+                    np.full(int(ticks.sum()), palette.neon), inner=half_connected - CONNECTED_TICK)
+    return True
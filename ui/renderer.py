@@ -5,13 +5,17 @@ Optimisé pour Dell G16 (2560x1600).
 - IA WB : Barres ultra-épaisses (8px) Vert Néon + Halo.
 - Humains : Traits fins (2px) standards.
 - Dashboard : Polices agrandies et métriques lisibles.
+- Véhicules rasterisés en NumPy (ui.raster) puis blittés via surfarray ;
+  agrégation par colonne de pixels au-delà d'un véhicule par colonne.
+- `render` ne présente pas la frame : un seul flip, par l'appelant.
 """
 
+import numpy as np
 import pygame
-from typing import Tuple
+from typing import Dict, Tuple
 from config import C
-from simulation.road import Road
-from core.vehicle import Vehicle
+from ui import raster
+from simulation.live import RoadFrame, TwinFrame
 
 # Palette de couleurs synchronisée avec DisplayConfig et Analytics
 COLOR_BG = (15, 17, 21)
@@ -20,12 +24,10 @@ COLOR_LANE_MARKER = (60, 65, 70)
 COLOR_ACCIDENT_CAR = (255, 0, 255)
 
 class TwinRenderer:
-    def __init__(self, road_chaos: Road, road_wb: Road):
+    def __init__(self):
         pygame.init()
         # On utilise la taille native configurée (2560x1500 recommandé pour G16)
         self.width, self.height = C.display.screen_size
-        self.road_chaos = road_chaos
-        self.road_wb = road_wb
         
         # Mode matériel pour la fluidité en haute résolution
         self.screen = pygame.display.set_mode((self.width, self.height), pygame.HWSURFACE | pygame.DOUBLEBUF)
@@ -51,68 +53,84 @@ class TwinRenderer:
         
         # Échelle : 40km étalés sur toute la largeur de l'écran (ex: 2560px)
         self.scale_x = self.width / C.road.length_m
+        # Densité de bouchon par colonne de pixels (pleine hauteur en mode agrégé)
+        self.jam_per_column = (1.0 / self.scale_x) / (C.vehicle.length + C.physics.min_spacing)
 
-    def render(self, fps: float, sim_speed: float):
+        # Bande de roulement : surface 32 bits réutilisée, pixels au format de la surface,
+        # fond (voies) mis en cache par nombre de voies
+        self.road_vis_h = 130
+        self.band = pygame.Surface((self.width, self.road_vis_h), 0, 32)
+        self._shifts = self.band.get_shifts()
+        self.palette = raster.make_palette(self._shifts)
+        self._band_bg: Dict[int, np.ndarray] = {}
+        self.lod_active = False
+
+    def _band_background(self, lanes: int) -> np.ndarray:
+        """Pixels (x, y) de la bande vide : fond et marquages de voies."""
+        if lanes not in self._band_bg:
+            bg = np.full((self.width, self.road_vis_h), raster.pack_rgb(COLOR_ROAD_BG, self._shifts), dtype=np.uint32)
+            # Une bande par voie (voie 0 en haut) ; voie unique : marquage central
+            lane_h = self.road_vis_h / lanes
+            markers = [self.road_vis_h // 2] if lanes == 1 else [int(k * lane_h) for k in range(1, lanes)]
+            bg[:, markers] = raster.pack_rgb(COLOR_LANE_MARKER, self._shifts)
+            self._band_bg[lanes] = bg
+        return self._band_bg[lanes]
+
+    def render(self, frame: TwinFrame, fps: float, sim_speed: float):
+        """Dessine la dernière trame publiée par le processus physique (simulation.live)."""
         self.screen.fill(COLOR_BG)
-        self._draw_header(fps, sim_speed)
+        self._draw_header(frame.time, fps, sim_speed)
         
         # Dessin des deux scénarios (Couleurs liées à DisplayConfig pour Analytics)
-        self._draw_road_viewport(self.road_chaos, self.rect_chaos, "SCENARIO A : HUMANS (CHAOS)", C.display.COLOR_SCENARIO_1)
-        self._draw_road_viewport(self.road_wb, self.rect_wb, "SCENARIO B : WAVEBREAKER (AI)", C.display.COLOR_SCENARIO_2)
-        
-        pygame.display.flip()
+        self._draw_road_viewport(frame.chaos, self.rect_chaos, "SCENARIO A : HUMANS (CHAOS)", C.display.COLOR_SCENARIO_1)
+        self._draw_road_viewport(frame.wb, self.rect_wb, "SCENARIO B : WAVEBREAKER (AI)", C.display.COLOR_SCENARIO_2)
 
-    def _draw_header(self, fps: float, sim_speed: float):
+    def _draw_header(self, sim_time: float, fps: float, sim_speed: float):
         # Utilisation de COLOR_TEXT de la config
-        title = self.font_title.render(f"SIMULATION TIME: {self.road_chaos.time:.1f}s", True, C.display.COLOR_TEXT)
+        title = self.font_title.render(f"SIMULATION TIME: {sim_time:.1f}s", True, C.display.COLOR_TEXT)
         self.screen.blit(title, (50, 40))
         
         info_txt = f"WARP: x{sim_speed:.0f} | FPS: {fps:.0f}"
         info = self.font_label.render(info_txt, True, (127, 140, 141))
         self.screen.blit(info, (self.width - info.get_width() - 50, 45))
 
-    def _draw_road_viewport(self, road: Road, rect: pygame.Rect, label: str, accent_color: Tuple[int,int,int]):
+    def _draw_road_viewport(self, road: RoadFrame, rect: pygame.Rect, label: str, accent_color: Tuple[int,int,int]):
         # Fond du viewport
         pygame.draw.rect(self.screen, (25, 27, 31), rect)
         
-        # Bande de roulement
-        road_vis_h = 130
+        # Bande de roulement (fond, marquages et véhicules rasterisés hors pygame)
+        road_vis_h = self.road_vis_h
         road_y = rect.centery - (road_vis_h // 2)
-        pygame.draw.rect(self.screen, COLOR_ROAD_BG, (0, road_y, self.width, road_vis_h))
-        pygame.draw.line(self.screen, COLOR_LANE_MARKER, (0, rect.centery), (self.width, rect.centery), 1)
+        lane_h = road_vis_h / road.lanes
+        if road.lanes == 1:
+            lane_centers = np.array([rect.centery - road_y])
+        else:
+            lane_centers = ((np.arange(road.lanes) + 0.5) * lane_h).astype(np.int64)
+        lane_scale = 1.0 / road.lanes
 
         # --- VÉHICULES ---
-        accident_detected = False
-        
-        for v in road.vehicles:
-            sx = int(v.x * self.scale_x)
-            
-            # Cas du véhicule accidenté (Immobile au Km 30)
-            if v.target_speed == 0.0 and v.v == 0.0:
-                accident_detected = True
-                pygame.draw.circle(self.screen, COLOR_ACCIDENT_CAR, (sx, rect.centery), 22)
-                pygame.draw.circle(self.screen, (255, 255, 255), (sx, rect.centery), 22, 3)
-                continue
+        x, v = road.x, road.v
+        # Véhicule accidenté (consigne et vitesse nulles) : dessiné à part, par-dessus
+        accident = (road.target_speed == 0.0) & (v == 0.0)
+        accident_detected = bool(accident.any())
+        moving = ~accident
 
-            if v.is_connected:
-                # --- EFFET IA WAVEBREAKER : SOBRE ET PUISSANT ---
-                color = C.display.COLOR_IA_NEON # Vert brillant
-                width = 8            # Épaisseur maximale pour G16
-                height_mod = 45      # Dépasse largement de la route
-                # Le rond central a été supprimé ici
-            else:
-                # --- HUMAINS STANDARDS (Traits fins) ---
-                width = 2
-                height_mod = 18
-                if v.v < (15.0 / 3.6): 
-                    color = C.display.COLOR_SCENARIO_1 # Rouge Chaos
-                elif v.v < (70.0 / 3.6): 
-                    color = (241, 196, 15) # Jaune/Orange lent
-                else: 
-                    color = (200, 200, 200) # Blanc flux
+        layer = self._band_background(road.lanes).copy()
+        self.lod_active = raster.rasterize_vehicles(
+            layer, x[moving], v[moving], road.is_connected[moving], road.lane[moving],
+            lane_centers, self.scale_x,
+            half_human=int(18 * lane_scale),        # humains : traits fins
+            half_connected=int(45 * lane_scale),    # IA : dépasse largement de la route
+            jam_per_column=self.jam_per_column, palette=self.palette,
+        )
+        pygame.surfarray.blit_array(self.band, layer)
+        self.screen.blit(self.band, (0, road_y))
 
-            # Dessin de la barre verticale
-            pygame.draw.line(self.screen, color, (sx, rect.centery - height_mod), (sx, rect.centery + height_mod), width)
+        for x_acc, lane in zip(x[accident].tolist(), road.lane[accident].tolist()):
+            sx = int(x_acc * self.scale_x)
+            cy = int(road_y + lane_centers[min(lane, road.lanes - 1)])
+            pygame.draw.circle(self.screen, COLOR_ACCIDENT_CAR, (sx, cy), 22)
+            pygame.draw.circle(self.screen, (255, 255, 255), (sx, cy), 22, 3)
 
         # Overlay Alerte Clignotante
         if accident_detected and int(road.time * 2) % 2 == 0: